@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import DailyRollup, RollupWatermark
+
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['day', 'metric', 'dimension', 'count', 'amount']
+    list_filter = ['metric']
+    date_hierarchy = 'day'
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['source', 'last_id', 'last_time', 'updatedat']
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rebuild_rollups, update_rollups
+
+
+class Command(BaseCommand):
+    help = 'Add rows created since the last run to the daily rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Delete all rollups and watermarks and count every row again',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.stdout.write('Rebuilding daily rollups from scratch...')
+            added = rebuild_rollups()
+        else:
+            added = update_rollups()
+
+        for source, count in added.items():
+            self.stdout.write(f'  {source}: {count} rows')
+        self.stdout.write(self.style.SUCCESS('✓ Daily rollups up to date'))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('source', models.CharField(db_column='SOURCE', max_length=30, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(blank=True, db_column='LAST_ID', null=True)),
+                ('last_time', models.DateTimeField(blank=True, db_column='LAST_TIME', null=True)),
+                ('updatedat', models.DateTimeField(auto_now=True, db_column='UPDATEDAT')),
+            ],
+            options={
+                'db_table': 'ROLLUP_WATERMARKS',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('rollup_id', models.AutoField(db_column='ROLLUP_ID', primary_key=True, serialize=False)),
+                ('day', models.DateField(db_column='DAY')),
+                ('metric', models.CharField(choices=[('new_users', 'New users'), ('new_listings', 'New listings'), ('messages', 'Messages'), ('favorites', 'Favorites'), ('payments', 'Successful payments')], db_column='METRIC', max_length=20)),
+                ('dimension', models.CharField(blank=True, db_column='DIMENSION', default='', max_length=50)),
+                ('count', models.BigIntegerField(db_column='COUNT', default=0)),
+                ('amount', models.DecimalField(db_column='AMOUNT', decimal_places=2, default=0, max_digits=14)),
+                ('updatedat', models.DateTimeField(auto_now=True, db_column='UPDATEDAT')),
+            ],
+            options={
+                'db_table': 'DAILY_ROLLUPS',
+                'constraints': [models.UniqueConstraint(fields=('metric', 'day', 'dimension'), name='daily_rollups_metric_day_dim_uniq')],
+            },
+        ),
+    ]
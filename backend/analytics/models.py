@@ -0,0 +1,53 @@
+from django.db import models
+
+
+# ============================================================================
+# DAILY ROLLUPS
+# ============================================================================
+
+class DailyRollup(models.Model):
+    """
+    One counter per day, metric and dimension, maintained incrementally by
+    analytics/rollups.py. Charts read these instead of the source tables.
+    """
+    METRICS = [
+        ('new_users', 'New users'),
+        ('new_listings', 'New listings'),  # dimension: category id
+        ('messages', 'Messages'),
+        ('favorites', 'Favorites'),
+        ('payments', 'Successful payments'),  # amount: revenue
+    ]
+
+    rollup_id = models.AutoField(primary_key=True, db_column='ROLLUP_ID')
+    day = models.DateField(db_column='DAY')
+    metric = models.CharField(max_length=20, choices=METRICS, db_column='METRIC')
+    # '' when the metric isn't broken down
+    dimension = models.CharField(max_length=50, default='', blank=True, db_column='DIMENSION')
+    count = models.BigIntegerField(default=0, db_column='COUNT')
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, db_column='AMOUNT')
+    updatedat = models.DateTimeField(auto_now=True, db_column='UPDATEDAT')
+
+    class Meta:
+        db_table = 'DAILY_ROLLUPS'
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'day', 'dimension'], name='daily_rollups_metric_day_dim_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.metric} {self.dimension}: {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """How far each source table has been rolled up"""
+    source = models.CharField(max_length=30, primary_key=True, db_column='SOURCE')
+    # Sources read in primary key order keep the last id; payments, which
+    # become successful after they are created, keep the last confirmed_at
+    last_id = models.BigIntegerField(null=True, blank=True, db_column='LAST_ID')
+    last_time = models.DateTimeField(null=True, blank=True, db_column='LAST_TIME')
+    updatedat = models.DateTimeField(auto_now=True, db_column='UPDATEDAT')
+
+    class Meta:
+        db_table = 'ROLLUP_WATERMARKS'
+
+    def __str__(self):
+        return f"{self.source}: {self.last_id or self.last_time}"
@@ -0,0 +1,175 @@
+"""
+Daily rollups.
+
+update_rollups() reads only the rows added to each source table since its
+watermark, groups them by day in the database and adds the results to
+DAILY_ROLLUPS. It runs every few minutes from Celery beat
+(analytics.tasks.update_rollups_task), or with `manage.py update_rollups`.
+
+Rows younger than ROLLUP_LAG_SECONDS are left for the next run, so a row
+whose transaction commits a little after a newer one isn't skipped.
+Days follow settings.TIME_ZONE.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Min, Sum, Value
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from listings.models import Category, Favorite, Listing
+from messaging.models import Message
+from payments.models import Payment
+from users.models import User
+from .models import DailyRollup, RollupWatermark
+
+
+class Source:
+    """
+    A table rolled up into one metric.
+    by_time=False: rows are read in primary key order from the last id.
+    by_time=True: rows are read by time_field from the last timestamp, for
+    rows that qualify after they are created (payments confirmed later).
+    """
+
+    def __init__(self, name, metric, get_queryset, time_field, dimension=None, amount=None, by_time=False):
+        self.name = name
+        self.metric = metric
+        self.get_queryset = get_queryset
+        self.time_field = time_field
+        self.dimension = dimension
+        self.amount = amount
+        self.by_time = by_time
+
+
+SOURCES = [
+    Source('users', 'new_users', lambda: User.objects.all(), 'date_joined'),
+    Source('listings', 'new_listings', lambda: Listing.objects.all(), 'createdat', dimension='cat_id'),
+    Source('messages', 'messages', lambda: Message.objects.all(), 'sentat'),
+    Source('favorites', 'favorites', lambda: Favorite.objects.all(), 'createdat'),
+    Source(
+        'payments', 'payments',
+        lambda: Payment.objects.filter(payment_status='successful', confirmed_at__isnull=False),
+        'confirmed_at', amount='payment_amount', by_time=True
+    ),
+]
+
+
+def pending_rows(source, watermark, upper):
+    """Rows not rolled up yet and old enough to be final"""
+    queryset = source.get_queryset()
+    if source.by_time:
+        if watermark.last_time:
+            queryset = queryset.filter(**{f'{source.time_field}__gt': watermark.last_time})
+        return queryset.filter(**{f'{source.time_field}__lte': upper})
+
+    if watermark.last_id is not None:
+        queryset = queryset.filter(pk__gt=watermark.last_id)
+    # Stop before the first row that is still too young, so ids are never skipped
+    first_young = queryset.filter(**{f'{source.time_field}__gt': upper}).aggregate(first=Min('pk'))['first']
+    if first_young is not None:
+        queryset = queryset.filter(pk__lt=first_young)
+    return queryset
+
+
+def add_to_rollup(day, metric, dimension, count, amount):
+    key = {'day': day, 'metric': metric, 'dimension': dimension}
+    updated = DailyRollup.objects.filter(**key).update(
+        count=F('count') + count,
+        amount=F('amount') + amount,
+        updatedat=timezone.now()
+    )
+    if not updated:
+        DailyRollup.objects.create(**key, count=count, amount=amount)
+
+
+def update_source(source, upper):
+    """Roll up one source. Returns the number of rows added"""
+    with transaction.atomic():
+        # The row lock keeps two runs from counting the same rows
+        RollupWatermark.objects.get_or_create(source=source.name)
+        watermark = RollupWatermark.objects.select_for_update().get(source=source.name)
+
+        fields = ['day'] + ([source.dimension] if source.dimension else [])
+        aggregates = {
+            'count': Count('pk'),
+            'amount': Sum(source.amount) if source.amount else Value(0, output_field=DecimalField()),
+        }
+        if not source.by_time:
+            aggregates['last_id'] = Max('pk')
+
+        groups = list(
+            pending_rows(source, watermark, upper)
+            .annotate(day=TruncDate(source.time_field))
+            .values(*fields)
+            .annotate(**aggregates)
+            .order_by()
+        )
+
+        for group in groups:
+            dimension = str(group[source.dimension]) if source.dimension and group[source.dimension] is not None else ''
+            add_to_rollup(group['day'], source.metric, dimension, group['count'], group['amount'] or 0)
+
+        if source.by_time:
+            watermark.last_time = upper
+        elif groups:
+            watermark.last_id = max(group['last_id'] for group in groups)
+        watermark.save()
+
+    return sum(group['count'] for group in groups)
+
+
+def update_rollups():
+    """Roll up every source. Returns {source name: rows added}"""
+    upper = timezone.now() - timedelta(seconds=settings.ROLLUP_LAG_SECONDS)
+    return {source.name: update_source(source, upper) for source in SOURCES}
+
+
+def rebuild_rollups():
+    """Forget all rollups and watermarks and count everything again"""
+    with transaction.atomic():
+        DailyRollup.objects.all().delete()
+        RollupWatermark.objects.all().delete()
+    return update_rollups()
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def get_timeseries(start, end):
+    """
+    Daily series between two dates (inclusive), zero-filled:
+    {'days': [...], 'series': {metric: [...], 'revenue': [...]},
+     'new_listings_by_category': {cat_id: {'cat_name', 'values'}}}
+    """
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    index = {day: position for position, day in enumerate(days)}
+
+    series = {metric: [0] * len(days) for metric, _ in DailyRollup.METRICS}
+    series['revenue'] = [0.0] * len(days)
+    by_category = {}
+
+    rollups = DailyRollup.objects.filter(day__gte=start, day__lte=end).values_list(
+        'day', 'metric', 'dimension', 'count', 'amount'
+    )
+    for day, metric, dimension, count, amount in rollups:
+        position = index[day]
+        series[metric][position] += count
+        if metric == 'payments':
+            series['revenue'][position] += float(amount)
+        if metric == 'new_listings' and dimension:
+            values = by_category.setdefault(dimension, [0] * len(days))
+            values[position] += count
+
+    names = dict(Category.objects.filter(pk__in=by_category.keys()).values_list('cat_id', 'cat_name'))
+    return {
+        'days': days,
+        'series': series,
+        'new_listings_by_category': {
+            dimension: {'cat_name': names.get(int(dimension)), 'values': values}
+            for dimension, values in by_category.items()
+        },
+    }
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .rollups import update_rollups
+
+
+@shared_task
+def update_rollups_task():
+    """Add new rows to the daily rollups (scheduled in CELERY_BEAT_SCHEDULE)"""
+    return update_rollups()
@@ -0,0 +1,118 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from listings.models import Category, Listing, PricingPlan
+from payments.models import Payment
+from users.models import User
+from .models import DailyRollup
+from .rollups import get_timeseries, rebuild_rollups, update_rollups
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+@override_settings(ROLLUP_LAG_SECONDS=0, TIME_ZONE='Africa/Bujumbura')
+class DailyRollupTests(TestCase):
+    """Incremental daily rollups (analytics/rollups.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        cls.homes = Category.objects.create(cat_name='Houses', slug='houses')
+        cls.cars = Category.objects.create(cat_name='Cars', slug='cars')
+
+    def create_listing(self, category, createdat):
+        listing = Listing.objects.create(
+            userid=self.seller, cat_id=category, listing_title='Listing', list_description='-',
+            listing_price=1000, list_location='Bujumbura', listing_status='active'
+        )
+        # createdat is auto_now_add
+        Listing.objects.filter(pk=listing.pk).update(createdat=createdat)
+        return listing
+
+    def listing_counts(self):
+        return {
+            (day, dimension): count
+            for day, dimension, count in DailyRollup.objects.filter(metric='new_listings')
+            .values_list('day', 'dimension', 'count')
+        }
+
+    def test_rerun_is_idempotent(self):
+        self.create_listing(self.homes, utc(2025, 3, 1, 9))
+        self.create_listing(self.homes, utc(2025, 3, 1, 15))
+        self.create_listing(self.cars, utc(2025, 3, 2, 9))
+
+        self.assertEqual(update_rollups()['listings'], 3)
+        expected = {
+            (date(2025, 3, 1), str(self.homes.cat_id)): 2,
+            (date(2025, 3, 2), str(self.cars.cat_id)): 1,
+        }
+        self.assertEqual(self.listing_counts(), expected)
+
+        self.assertEqual(update_rollups()['listings'], 0)
+        self.assertEqual(self.listing_counts(), expected)
+
+        # Only the new row is added on the next run
+        self.create_listing(self.cars, utc(2025, 3, 2, 10))
+        self.assertEqual(update_rollups()['listings'], 1)
+        expected[(date(2025, 3, 2), str(self.cars.cat_id))] = 2
+        self.assertEqual(self.listing_counts(), expected)
+
+        # A full rebuild agrees with the incremental runs
+        rebuild_rollups()
+        self.assertEqual(self.listing_counts(), expected)
+
+    def test_days_follow_the_local_time_zone(self):
+        # Bujumbura is UTC+2: 21:59 UTC is still March 1st, 22:00 UTC is March 2nd
+        self.create_listing(self.homes, utc(2025, 3, 1, 21, 59))
+        self.create_listing(self.homes, utc(2025, 3, 1, 22, 0))
+        self.create_listing(self.homes, utc(2025, 3, 2, 21, 59, 59))
+        update_rollups()
+
+        dimension = str(self.homes.cat_id)
+        self.assertEqual(self.listing_counts(), {
+            (date(2025, 3, 1), dimension): 1,
+            (date(2025, 3, 2), dimension): 2,
+        })
+
+        timeseries = get_timeseries(date(2025, 2, 28), date(2025, 3, 3))
+        self.assertEqual(timeseries['series']['new_listings'], [0, 1, 2, 0])
+        self.assertEqual(timeseries['new_listings_by_category'][dimension]['cat_name'], 'Houses')
+
+    @override_settings(ROLLUP_LAG_SECONDS=600)
+    def test_recent_rows_wait_for_the_next_run(self):
+        self.create_listing(self.homes, timezone.now() - timedelta(hours=1))
+        recent = self.create_listing(self.homes, timezone.now())
+        # A later id that is old enough still waits behind the young row
+        self.create_listing(self.homes, timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(update_rollups()['listings'], 1)
+
+        Listing.objects.filter(pk=recent.pk).update(createdat=timezone.now() - timedelta(hours=1))
+        self.assertEqual(update_rollups()['listings'], 2)
+        self.assertEqual(sum(self.listing_counts().values()), 3)
+
+    def test_payments_count_on_the_day_they_are_confirmed(self):
+        payment = Payment.objects.create(
+            payment_id='PAY-1', userid=self.seller, pricing_id=PricingPlan.objects.first(),
+            payment_amount=Decimal('5000.00'), payment_method='mobile_money', payment_ref='REF-1'
+        )
+        update_rollups()
+        self.assertFalse(DailyRollup.objects.filter(metric='payments').exists())
+
+        Payment.objects.filter(pk=payment.pk).update(
+            payment_status='successful', confirmed_at=timezone.now()
+        )
+        update_rollups()
+        update_rollups()
+
+        rollup = DailyRollup.objects.get(metric='payments')
+        self.assertEqual(rollup.day, timezone.localdate())
+        self.assertEqual((rollup.count, rollup.amount), (1, Decimal('5000.00')))
@@ -0,0 +1,114 @@
+"""
+Response cache for anonymous listing reads.
+
+Anonymous visitors all get the same payload from category_list,
+featured_listings, pricing_plans_list, listing_detail and the first pages of
+ListingListView, so the serialized data is cached per endpoint and normalized
+query string.
+
+Invalidation is generational: every cache key embeds the current token of the
+model groups it depends on, and listings/signals.py replaces a group's token
+when one of its models is saved or deleted. Stale entries are never read again
+and simply age out (TTL) or get evicted (LRU).
+"""
+
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+# Cache groups and the models whose changes invalidate them
+CATEGORIES = 'categories'
+LISTINGS = 'listings'
+LOCATIONS = 'locations'
+PRICING_PLANS = 'pricing_plans'
+
+
+def _group_key(group):
+    return f'respcache:group:{group}'
+
+
+def get_group_tokens(groups):
+    """Current token for each group, creating missing ones"""
+    keys = {_group_key(group): group for group in groups}
+    tokens = cache.get_many(keys.keys())
+
+    for key in keys:
+        if key not in tokens:
+            # add() is a no-op if another worker created the token first
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            tokens[key] = cache.get(key)
+
+    return [tokens[_group_key(group)] for group in groups]
+
+
+def invalidate(*groups):
+    """Drop every cached response that depends on any of `groups`"""
+    cache.set_many({_group_key(group): uuid.uuid4().hex for group in groups}, timeout=None)
+
+
+def normalize_query(query_params):
+    """Stable representation of a QueryDict: sorted keys and values, blanks dropped"""
+    items = []
+    for key in sorted(query_params.keys()):
+        values = sorted(value for value in query_params.getlist(key) if value != '')
+        if values:
+            items.append((key, values))
+    return items
+
+
+def make_cache_key(request, groups):
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        repr(normalize_query(request.query_params)),
+        *get_group_tokens(groups),
+    ])
+    return 'respcache:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def is_cacheable(request):
+    return (
+        settings.LISTING_CACHE_ENABLED
+        and request.method == 'GET'
+        and not request.user.is_authenticated
+    )
+
+
+def get_cached_response(request, groups):
+    """Returns (cache key, cached Response or None). Key is None when caching doesn't apply"""
+    if not is_cacheable(request):
+        return None, None
+
+    key = make_cache_key(request, groups)
+    data = cache.get(key)
+    if data is None:
+        return key, None
+    return key, Response(data)
+
+
+def store_response(key, response):
+    if key and response.status_code == 200:
+        cache.set(key, response.data, timeout=settings.LISTING_CACHE_TIMEOUT)
+
+
+def cache_anonymous_response(*groups):
+    """
+    Cache a function-based view's data for anonymous GET requests.
+    Goes below @api_view so request.user is the authenticated DRF user.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key, cached = get_cached_response(request, groups)
+            if cached is not None:
+                return cached
+
+            response = view_func(request, *args, **kwargs)
+            store_response(key, response)
+            return response
+        return wrapper
+    return decorator
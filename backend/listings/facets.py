@@ -0,0 +1,168 @@
+"""
+Facet counts for the listing browser's filter chips.
+
+GET /api/listings/facets/ takes the same filters as ListingListView and
+returns, for the matching listings, the number per category, location,
+property/vehicle type, fuel, transmission and price bucket.
+
+All facets come from a single query: the filtered listings are grouped with
+PostgreSQL GROUPING SETS, one set per facet plus the grand total, so the
+table is scanned once instead of once per facet.
+
+Results don't depend on the user and are cached per normalized filter
+signature (pagination and ordering parameters are ignored). Keys embed the
+LISTINGS/CATEGORIES generation tokens from listings/cache.py, so any listing
+or category change (listings/signals.py) invalidates them.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+
+from .cache import CATEGORIES, LISTINGS, get_group_tokens, normalize_query
+from .models import Category, Listing
+
+# Lower bounds of the price buckets (BIF); the last bucket is open-ended
+PRICE_BUCKETS = [0, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000, 100_000_000]
+
+# Facet name -> Listing field
+FACET_FIELDS = {
+    'category': 'cat_id',
+    'location': 'list_location',
+    'property_type': 'property_type',
+    'vehicle_type': 'vehicle_type',
+    'fuel_type': 'fuel_type',
+    'transmission': 'transmission',
+    'price': 'price_bucket',
+}
+
+# Query parameters that don't change which listings match
+IGNORED_PARAMS = {'page', 'page_size', 'ordering', 'pagination', 'cursor'}
+
+
+def price_bucket():
+    """Index into PRICE_BUCKETS of the listing's price"""
+    return Case(
+        *[
+            When(listing_price__gte=lower, then=Value(i))
+            for i, lower in reversed(list(enumerate(PRICE_BUCKETS)))
+        ],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def filter_signature(query_params):
+    return [(key, values) for key, values in normalize_query(query_params) if key not in IGNORED_PARAMS]
+
+
+def make_facets_key(query_params):
+    raw = '|'.join([
+        'facets',
+        repr(filter_signature(query_params)),
+        *get_group_tokens([LISTINGS, CATEGORIES]),
+    ])
+    return 'facets:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def count_facets(queryset):
+    """
+    ({facet: {value: count}}, total) for the listings in `queryset`, in one
+    grouped query
+    """
+    names = list(FACET_FIELDS)
+    filtered = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket())
+        .values_list(*FACET_FIELDS.values())
+    )
+    inner_sql, params = filtered.query.sql_with_params()
+
+    columns = ', '.join(names)
+    sets = ', '.join(f'({name})' for name in names)
+    sql = (
+        f'SELECT GROUPING({columns}), {columns}, COUNT(*) '
+        f'FROM ({inner_sql}) AS filtered ({columns}) '
+        f'GROUP BY GROUPING SETS ({sets}, ())'
+    )
+
+    # GROUPING() has a bit set for each column the row is *not* grouped by
+    # (first column = most significant bit)
+    everything = (1 << len(names)) - 1
+    facet_for_mask = {everything & ~(1 << (len(names) - 1 - i)): name for i, name in enumerate(names)}
+
+    counts = {name: {} for name in names}
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for mask, *values, count in cursor.fetchall():
+            if mask == everything:
+                total = count
+                continue
+            name = facet_for_mask[mask]
+            value = values[names.index(name)]
+            if value is not None:
+                counts[name][value] = count
+    return counts, total
+
+
+def choice_labels(field_name):
+    return dict(Listing._meta.get_field(field_name).choices)
+
+
+def format_facets(counts, total):
+    def ordered(values):
+        # Most common first
+        return sorted(values.items(), key=lambda item: (-item[1], str(item[0])))
+
+    category_names = dict(
+        Category.objects.filter(pk__in=counts['category']).values_list('cat_id', 'cat_name')
+    )
+    facets = {
+        'category': [
+            {'value': cat_id, 'label': category_names.get(cat_id, ''), 'count': count}
+            for cat_id, count in ordered(counts['category'])
+        ],
+        'location': [
+            {'value': location, 'label': location, 'count': count}
+            for location, count in ordered(counts['location'])
+        ],
+    }
+    for name in ('property_type', 'vehicle_type', 'fuel_type', 'transmission'):
+        labels = choice_labels(FACET_FIELDS[name])
+        facets[name] = [
+            {'value': value, 'label': labels.get(value, value), 'count': count}
+            for value, count in ordered(counts[name])
+        ]
+
+    # Price buckets stay in price order
+    facets['price'] = []
+    for i, lower in enumerate(PRICE_BUCKETS):
+        if i not in counts['price']:
+            continue
+        upper = PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None
+        facets['price'].append({
+            'value': i, 'min_price': lower, 'max_price': upper, 'count': counts['price'][i]
+        })
+
+    return {'total': total, 'facets': facets}
+
+
+def get_facets(query_params, get_queryset):
+    """
+    Facet payload for the listings matching `query_params`, cached per filter
+    signature. get_queryset() builds the filtered queryset and is only called
+    on a cache miss (filter validation queries the database too).
+    """
+    if not settings.LISTING_CACHE_ENABLED:
+        return format_facets(*count_facets(get_queryset()))
+
+    key = make_facets_key(query_params)
+    data = cache.get(key)
+    if data is None:
+        data = format_facets(*count_facets(get_queryset()))
+        cache.set(key, data, timeout=settings.LISTING_FACETS_CACHE_TIMEOUT)
+    return data
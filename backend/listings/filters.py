@@ -0,0 +1,102 @@
+import re
+
+import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+
+from .locations import LEVEL_FIELDS
+from .models import SEARCH_CONFIG, Listing, Location
+
+
+# ============================================================================
+# ATTRIBUTE FILTERS
+# ============================================================================
+
+class ListingFilter(django_filters.FilterSet):
+    """
+    Structured filters for ListingListView (and the facets endpoint)
+    GET /api/listings/?cat_id=1&property_type=house&min_bedrooms=3&max_price=90000000
+    GET /api/listings/?vehicle_type=car&fuel_type=diesel&fuel_type=hybrid&min_year=2015&max_mileage=80000
+    GET /api/listings/?location=12  (any gazetteer level, see /api/locations/?q=)
+
+    Ranges are inclusive; choice filters accept several values (OR). The common
+    real-estate and vehicle shapes are backed by partial indexes on active
+    listings (see Listing.Meta.indexes); `python manage.py
+    benchmark_listing_filters` shows the plans.
+    """
+    min_price = django_filters.NumberFilter(field_name='listing_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='listing_price', lookup_expr='lte')
+
+    # Location: gazetteer id at any level (province, commune or quarter)
+    location = django_filters.NumberFilter(method='filter_location')
+
+    # Real estate
+    property_type = django_filters.MultipleChoiceFilter(choices=Listing.PROPERTY_TYPES)
+    min_bedrooms = django_filters.NumberFilter(field_name='bedrooms', lookup_expr='gte')
+    max_bedrooms = django_filters.NumberFilter(field_name='bedrooms', lookup_expr='lte')
+    min_bathrooms = django_filters.NumberFilter(field_name='bathrooms', lookup_expr='gte')
+    max_bathrooms = django_filters.NumberFilter(field_name='bathrooms', lookup_expr='lte')
+    min_area = django_filters.NumberFilter(field_name='area_size', lookup_expr='gte')
+    max_area = django_filters.NumberFilter(field_name='area_size', lookup_expr='lte')
+
+    # Vehicles
+    vehicle_type = django_filters.MultipleChoiceFilter(choices=Listing.VEHICLE_TYPES)
+    min_year = django_filters.NumberFilter(field_name='year_built', lookup_expr='gte')
+    max_year = django_filters.NumberFilter(field_name='year_built', lookup_expr='lte')
+    min_mileage = django_filters.NumberFilter(field_name='mileage', lookup_expr='gte')
+    max_mileage = django_filters.NumberFilter(field_name='mileage', lookup_expr='lte')
+    fuel_type = django_filters.MultipleChoiceFilter(choices=Listing.FUEL_TYPES)
+    transmission = django_filters.MultipleChoiceFilter(choices=Listing.TRANSMISSION_TYPES)
+    condition = django_filters.MultipleChoiceFilter(choices=Listing.CONDITION_TYPES)
+
+    class Meta:
+        model = Listing
+        fields = ['cat_id', 'listing_status', 'is_featured', 'list_location']
+
+    def filter_location(self, queryset, name, value):
+        level = Location.objects.filter(pk=value).values_list('location_level', flat=True).first()
+        if level is None:
+            return queryset.none()
+        # One indexed column per level (see listings/locations.py)
+        return queryset.filter(**{LEVEL_FIELDS[level]: value})
+
+
+# ============================================================================
+# FULL-TEXT SEARCH
+# ============================================================================
+
+class ListingSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text search over Listing.search_vector (GIN indexed)
+    GET /api/listings/?search=house rohero
+
+    Every term must match; the last term is matched as a prefix so results
+    update while the user is still typing. Results are ranked by relevance
+    unless the client asks for an explicit ?ordering=.
+    """
+    search_param = 'search'
+    term_pattern = re.compile(r'\w+', re.UNICODE)
+    max_terms = 8
+
+    def get_search_query(self, request):
+        terms = self.term_pattern.findall(request.query_params.get(self.search_param, ''))
+        terms = terms[:self.max_terms]
+        if not terms:
+            return None
+
+        terms[-1] = f'{terms[-1]}:*'
+        return SearchQuery(' & '.join(terms), search_type='raw', config=SEARCH_CONFIG)
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+
+        if request.query_params.get(filters.OrderingFilter.ordering_param):
+            return queryset
+        return queryset.order_by('-search_rank', '-createdat')
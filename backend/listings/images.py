@@ -0,0 +1,507 @@
+"""
+Listing image uploads.
+
+Uploads are validated and stored as-is during the request, named after the
+format Pillow detected in the file (never the client's filename), then resized
+and re-encoded by a background job (listings/tasks.py) into thumbnail, card and
+full renditions, each as JPEG and WebP. ListingImage.processing_status tells
+the client where each image is in that pipeline.
+
+Processed files are content-addressed: they are named after the hash of the
+full JPEG and recorded once in StoredImage, which every ListingImage showing
+the same picture references. The raw upload's hash is checked first, so a
+photo that was already processed (a dealer reposting inventory, a retried
+upload) skips Pillow entirely. Taking the first reference to a picture and
+deleting its files both lock its hash (lock_content_hash), and files found
+missing when a reference is taken are rendered again.
+"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.deletion import ProtectedError
+from PIL import Image, UnidentifiedImageError
+
+from umuhuza_api.uploads import spooled_file, store_upload
+
+from .models import ListingImage, StoredImage
+
+ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/jpg', 'image/png', 'image/webp']
+ALLOWED_IMAGE_FORMATS = ['JPEG', 'PNG', 'WEBP']
+# Pillow format -> extension the raw upload is stored under
+UPLOAD_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_IMAGE_WIDTH = 1920
+
+# Rendition name -> max width. Feed cards and chat previews don't need the
+# full 1920px image.
+RENDITION_WIDTHS = {
+    'thumbnail': 320,
+    'card': 800,
+    'full': MAX_IMAGE_WIDTH,
+}
+
+# Format -> (Pillow format, file extension, save options)
+RENDITION_FORMATS = {
+    'jpeg': ('JPEG', '.jpg', {'quality': 85, 'optimize': True}),
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 4}),
+}
+
+
+class InvalidImage(Exception):
+    pass
+
+
+class ImageProcessingTimeout(Exception):
+    pass
+
+
+def detect_image_format(image_file):
+    """
+    Pillow's format for the file ('JPEG', 'PNG', ...), read from its header.
+    Raises InvalidImage if it isn't an image.
+    """
+    # Image.open only parses the header; pixels are decoded later by the worker
+    try:
+        with Image.open(image_file) as img:
+            return img.format
+    except (UnidentifiedImageError, OSError):
+        raise InvalidImage('File is not a valid image')
+    finally:
+        image_file.seek(0)
+
+
+def validate_image_upload(image_file):
+    """
+    Cheap checks done in the request: content type, size, and that the file
+    header really is an image. Raises InvalidImage with a user-facing message.
+    """
+    if image_file.content_type not in ALLOWED_IMAGE_TYPES:
+        raise InvalidImage('Invalid file type. Only JPEG, PNG, and WebP are allowed')
+
+    if image_file.size > MAX_IMAGE_SIZE:
+        raise InvalidImage('File too large. Maximum size is 5MB')
+
+    if detect_image_format(image_file) not in ALLOWED_IMAGE_FORMATS:
+        raise InvalidImage('Invalid file type. Only JPEG, PNG, and WebP are allowed')
+
+
+def render_renditions(source):
+    """
+    Decode an image once and encode every rendition in RENDITION_WIDTHS, each
+    as JPEG and WebP. Yields (name, format, width, height, file) one encoded
+    file at a time, starting with the full JPEG.
+    """
+    with Image.open(source) as original:
+        # JPEG can decode straight to 1/2, 1/4 or 1/8 scale, so a 4000px
+        # photo is never fully decoded only to be shrunk to 1920px
+        largest = max(RENDITION_WIDTHS.values())
+        if original.width > largest:
+            original.draft('RGB', (largest, max(1, original.height * largest // original.width)))
+
+        # JPEG and WebP both want RGB (or greyscale)
+        img = original
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        # Largest first, so each smaller rendition is resized from the previous one
+        for name, max_width in sorted(RENDITION_WIDTHS.items(), key=lambda item: -item[1]):
+            if img.width > max_width:
+                ratio = max_width / img.width
+                new_height = max(1, int(img.height * ratio))
+                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+
+            for image_format, (pil_format, _, options) in RENDITION_FORMATS.items():
+                output = spooled_file()
+                img.save(output, format=pil_format, **options)
+                yield name, image_format, img.width, img.height, output
+
+
+def hash_file(file):
+    """sha256 of a Django File/UploadedFile, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def store_renditions(rendered):
+    """
+    Save rendered files under the hash of the full JPEG, so the same picture
+    is stored once however many listings use it. Files that already exist
+    are not written again.
+    `rendered` must start with the full JPEG, as render_renditions() does.
+    Each file is stored and closed before the next one is rendered, so only a
+    single output is held at a time.
+    Returns (content hash, full JPEG url, renditions record).
+    """
+    content_hash = None
+    record = {}
+    written = []
+    try:
+        for name, image_format, width, height, output in rendered:
+            with output:
+                if content_hash is None:
+                    if (name, image_format) != ('full', 'jpeg'):
+                        raise ValueError('Renditions must start with the full JPEG')
+                    content_hash = hash_file(output)
+                    base = f"images/{content_hash[:2]}/{content_hash}"
+
+                extension = RENDITION_FORMATS[image_format][1]
+                suffix = '' if name == 'full' else f'_{name}'
+                path = f"{base}{suffix}{extension}"
+                if not default_storage.exists(path):
+                    saved = default_storage.save(path, output)
+                    if saved != path:
+                        # An identical image was stored while we rendered ours
+                        default_storage.delete(saved)
+                    else:
+                        written.append(path)
+                record.setdefault(name, {'width': width, 'height': height})
+                record[name][image_format] = default_storage.url(path)
+    except Exception:
+        # Don't leave part of a picture behind
+        for path in written:
+            delete_stored_file(path)
+        raise
+
+    return content_hash, record['full']['jpeg'], record
+
+
+# ============================================================================
+# STORED IMAGES (content-addressed, reference-counted)
+# ============================================================================
+
+def find_stored_image(source_hash):
+    """StoredImage previously produced from a raw upload with these bytes"""
+    listing_image = (
+        ListingImage.objects.filter(source_hash=source_hash, stored_image__isnull=False)
+        .select_related('stored_image')
+        .first()
+    )
+    return listing_image.stored_image if listing_image else None
+
+
+def acquire_stored_image(stored_image):
+    """Take a reference. False if the StoredImage was released and deleted meanwhile"""
+    return bool(StoredImage.objects.filter(pk=stored_image.pk).update(ref_count=F('ref_count') + 1))
+
+
+def use_stored_image(listing_image, stored_image):
+    """Point a ListingImage at shared files. The caller holds a reference"""
+    listing_image.stored_image = stored_image
+    listing_image.image_url = stored_image.image_url
+    listing_image.renditions = stored_image.renditions
+    listing_image.processing_status = 'ready'
+    listing_image.processing_error = None
+
+
+def release_stored_image(storedimage_id):
+    """
+    Drop a reference (ListingImage post_delete, listings/signals.py).
+    The last one deletes the row and, after commit, the files.
+    """
+    StoredImage.objects.filter(pk=storedimage_id).update(ref_count=F('ref_count') - 1)
+    stored_image = StoredImage.objects.filter(pk=storedimage_id, ref_count__lte=0).first()
+    if stored_image is None:
+        return
+
+    try:
+        stored_image.delete()
+    except ProtectedError:
+        # Still referenced: the count drifted, keep the files
+        return
+    transaction.on_commit(lambda: delete_unreferenced_files(stored_image.content_hash, stored_image.renditions))
+
+
+def lock_content_hash(content_hash):
+    """
+    Lock a content hash until the transaction ends. Taking the first reference
+    to a hash and deleting its files both hold it, so files are never deleted
+    between being found on disk and being referenced. A row lock can't do
+    this: the StoredImage doesn't exist yet when the first reference is taken.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))', [content_hash])
+
+
+def stored_files_exist(renditions):
+    return all(
+        default_storage.exists(storage_path_from_url(rendition[image_format]))
+        for rendition in renditions.values()
+        for image_format in RENDITION_FORMATS
+    )
+
+
+def delete_unreferenced_files(content_hash, renditions):
+    with transaction.atomic():
+        lock_content_hash(content_hash)
+        # An identical upload may have re-created the record since
+        if StoredImage.objects.filter(content_hash=content_hash).exists():
+            return
+        for rendition in renditions.values():
+            for image_format in RENDITION_FORMATS:
+                delete_stored_file(storage_path_from_url(rendition[image_format]))
+
+
+def save_processed(listing_image, content_hash, image_url, renditions, source_path):
+    """
+    Attach freshly rendered files to a ListingImage, sharing any existing
+    StoredImage. `source_path` is the file they were rendered from: if a
+    release deleted the files after they were rendered (store_renditions
+    skips files that already exist), they are rendered again from it.
+    """
+    with transaction.atomic():
+        lock_content_hash(content_hash)
+        while True:
+            stored_image, _ = StoredImage.objects.get_or_create(
+                content_hash=content_hash,
+                defaults={'image_url': image_url, 'renditions': renditions}
+            )
+            if acquire_stored_image(stored_image):
+                break
+
+        if not stored_files_exist(stored_image.renditions):
+            with default_storage.open(source_path, 'rb') as source:
+                store_renditions(render_renditions(source))
+
+        use_stored_image(listing_image, stored_image)
+        old_source_path, listing_image.source_path = listing_image.source_path, None
+        listing_image.save(update_fields=[
+            'stored_image', 'image_url', 'renditions', 'processing_status', 'processing_error',
+            'source_hash', 'source_path'
+        ])
+    return old_source_path
+
+
+# ============================================================================
+# UPLOADS
+# ============================================================================
+
+def create_listing_image(listing, image_file, is_primary, display_order, queue=True):
+    """
+    Store the raw upload and queue it for processing.
+    The image is served from the raw file until the worker replaces it; the
+    file is named after the format Pillow reads from its header, so it is
+    never served under an extension the client chose.
+    An upload whose bytes were processed before is ready straight away.
+    Pass queue=False when creating several images, then queue them together
+    with queue_image_processing().
+    """
+    source_hash = hash_file(image_file)
+
+    # Same bytes as an earlier upload: share its files, no raw copy, no job
+    stored_image = find_stored_image(source_hash)
+    if stored_image is not None:
+        with transaction.atomic():
+            if acquire_stored_image(stored_image):
+                listing_image = ListingImage(
+                    listing_id=listing,
+                    source_hash=source_hash,
+                    is_primary=is_primary,
+                    display_order=display_order
+                )
+                use_stored_image(listing_image, stored_image)
+                listing_image.save()
+                return listing_image
+
+    extension = UPLOAD_EXTENSIONS.get(detect_image_format(image_file))
+    if extension is None:
+        raise InvalidImage('Invalid file type. Only JPEG, PNG, and WebP are allowed')
+
+    # Streamed from the upload's temp file, never read into memory
+    source_path = store_upload(image_file, f"listings/{listing.listing_id}/originals", extension)
+
+    listing_image = ListingImage.objects.create(
+        listing_id=listing,
+        image_url=default_storage.url(source_path),
+        source_path=source_path,
+        source_hash=source_hash,
+        processing_status='pending',
+        is_primary=is_primary,
+        display_order=display_order
+    )
+
+    if queue:
+        queue_image_processing([listing_image])
+    return listing_image
+
+
+def queue_image_processing(listing_images):
+    """Process a listing's new images in one job, once the transaction commits"""
+    from .tasks import process_listing_images_task
+
+    listimage_ids = [
+        listing_image.listimage_id for listing_image in listing_images
+        if listing_image.processing_status == 'pending'
+    ]
+    if listimage_ids:
+        transaction.on_commit(lambda: process_listing_images_task.delay(listimage_ids))
+
+
+# ============================================================================
+# PROCESSING POOL
+# ============================================================================
+
+# Pillow releases the GIL while resizing and encoding, so a thread pool gives
+# real parallelism without shipping image bytes to other processes. The pool
+# is shared by the whole process, which bounds the memory spent on decoded
+# images however many jobs run at once.
+POOL_THREAD_PREFIX = 'listing-image'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.LISTING_IMAGE_WORKERS,
+                    thread_name_prefix=POOL_THREAD_PREFIX
+                )
+    return _executor
+
+
+def render_and_store(source_path):
+    """Pool work for one image: decode, render, save. No database access"""
+    with default_storage.open(source_path, 'rb') as source:
+        return store_renditions(render_renditions(source))
+
+
+def discard_late_result(future):
+    """
+    Done-callback for timed-out images: the files were written for an image
+    already marked failed, so delete them unless a StoredImage uses them.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    content_hash, _, renditions = future.result()
+    try:
+        delete_unreferenced_files(content_hash, renditions)
+    finally:
+        # On a pool thread the lookup opened that thread's own connection
+        if threading.current_thread().name.startswith(POOL_THREAD_PREFIX):
+            connection.close()
+
+
+def process_listing_images(listing_images):
+    """
+    Optimize pending images concurrently and swap each one in for its raw upload.
+
+    Images whose raw bytes were processed before reuse that StoredImage and
+    skip Pillow. Ordering and the primary flag are fixed when the rows are
+    created, so the order in which images finish doesn't matter. Every image
+    gets LISTING_IMAGE_TIMEOUT seconds once a pool thread picks it up; images
+    still waiting for a thread get extra time for the rounds ahead of them.
+
+    Returns [(listing_image, exception)] for the images that failed.
+    """
+    if not listing_images:
+        return []
+
+    # An identical upload may have been processed since these were queued
+    known = dict(
+        ListingImage.objects.filter(
+            source_hash__in=[listing_image.source_hash for listing_image in listing_images if listing_image.source_hash],
+            stored_image__isnull=False
+        ).values_list('source_hash', 'stored_image')
+    )
+    stored_images = StoredImage.objects.in_bulk(known.values())
+    to_render = []
+    for listing_image in listing_images:
+        stored_image = stored_images.get(known.get(listing_image.source_hash))
+        if stored_image is not None and acquire_stored_image(stored_image):
+            use_stored_image(listing_image, stored_image)
+            source_path, listing_image.source_path = listing_image.source_path, None
+            listing_image.save(update_fields=[
+                'stored_image', 'image_url', 'renditions', 'processing_status', 'processing_error', 'source_path'
+            ])
+            delete_stored_file(source_path)
+        else:
+            to_render.append(listing_image)
+
+    ListingImage.objects.filter(
+        pk__in=[listing_image.pk for listing_image in to_render]
+    ).update(processing_status='processing')
+
+    executor = get_executor()
+    workers = settings.LISTING_IMAGE_WORKERS
+    timeout = settings.LISTING_IMAGE_TIMEOUT
+    started = time.monotonic()
+    futures = [executor.submit(render_and_store, listing_image.source_path) for listing_image in to_render]
+
+    failures = []
+    for position, (listing_image, future) in enumerate(zip(to_render, futures)):
+        deadline = started + timeout * (position // workers + 1)
+        try:
+            content_hash, image_url, renditions = future.result(timeout=max(0, deadline - time.monotonic()))
+        except TimeoutError:
+            # A running Pillow call can't be interrupted; let it finish and
+            # clean up after it
+            if not future.cancel():
+                future.add_done_callback(discard_late_result)
+            failures.append((listing_image, ImageProcessingTimeout(f'Processing took longer than {timeout}s')))
+            continue
+        except Exception as e:
+            failures.append((listing_image, e))
+            continue
+
+        source_path = save_processed(listing_image, content_hash, image_url, renditions, listing_image.source_path)
+        delete_stored_file(source_path)
+
+    return failures
+
+
+def add_renditions(listing_image):
+    """Move an image processed before renditions existed into stored images (backfill)"""
+    old_path = storage_path_from_url(listing_image.image_url)
+    with default_storage.open(old_path, 'rb') as source:
+        listing_image.source_hash = hash_file(source)
+        content_hash, image_url, renditions = store_renditions(render_renditions(source))
+
+    save_processed(listing_image, content_hash, image_url, renditions, old_path)
+    delete_stored_file(old_path)
+    return listing_image
+
+
+def delete_image_files(listing_image):
+    """
+    Remove the files only this ListingImage uses. Shared files are released
+    when the row is deleted (listings/signals.py).
+    """
+    delete_stored_file(listing_image.source_path)
+    if listing_image.stored_image_id:
+        return
+
+    # Images stored before content addressing
+    urls = [listing_image.image_url]
+    for rendition in (listing_image.renditions or {}).values():
+        urls.extend(rendition.get(image_format) for image_format in RENDITION_FORMATS)
+    for url in set(filter(None, urls)):
+        delete_stored_file(storage_path_from_url(url))
+
+
+def storage_path_from_url(url):
+    """Map a default_storage.url() back to its storage path (MEDIA_URL prefix stripped)"""
+    for prefix in (settings.MEDIA_URL, '/' + settings.MEDIA_URL.lstrip('/')):
+        if prefix and url.startswith(prefix):
+            return url[len(prefix):]
+    return url
+
+
+def delete_stored_file(path):
+    try:
+        if path and default_storage.exists(path):
+            default_storage.delete(path)
+    except Exception as e:
+        print(f"Error deleting file: {e}")
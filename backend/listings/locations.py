@@ -0,0 +1,217 @@
+"""
+Location gazetteer: turns free-text list_location into province, commune and
+quarter foreign keys.
+
+list_location is typed by sellers ("Bujumbura, Rohero", "rohero - buja",
+"Kinindo"), so filtering on it by exact match or ILIKE splits the same place
+across spellings. Each listing is now also linked to the LOCATIONS hierarchy,
+loaded by `python manage.py setup_locations`, with one indexed column per
+level. A filter on any level (?location=<id>) is a single equality lookup.
+
+Resolution (resolve_location):
+1. The text is normalized: accents stripped, lowercased, punctuation
+   dropped.
+2. Runs of words are matched against every location name and alias, longest
+   first.
+3. The matched location that agrees with most of the other matches (they are
+   its ancestors) wins, with the most specific one preferred.
+   "Bujumbura, Rohero" -> Rohero (Mukaza, Bujumbura Mairie).
+4. Matches that contradict each other and share no ancestor resolve to
+   nothing.
+
+listing_create and listing_update resolve the location when it is set; `python
+manage.py backfill_listing_locations` handles existing listings.
+
+Autocomplete (GET /api/locations/?q=) is a prefix search on LOCATION_NAMES,
+cached per normalized query. Its keys embed the LOCATIONS generation token
+(listings/cache.py), which listings/signals.py renews when the gazetteer
+changes. The token only reaches every worker through a shared cache
+(REDIS_CACHE_URL): with the default per-process LocMemCache, other workers
+serve stale suggestions for up to LOCATION_AUTOCOMPLETE_CACHE_TIMEOUT.
+
+The in-process name index used for resolution is rebuilt when the token
+changes and at the latest every LOCATION_INDEX_TTL seconds, so changes that
+didn't reach this process's cache (setup_locations or admin edits in another
+worker, without a shared cache) show up within that time.
+"""
+
+import hashlib
+import re
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import LOCATIONS, get_group_tokens
+from .models import Location, LocationName
+
+# Longest location name, in words ("bujumbura mairie")
+MAX_NAME_WORDS = 3
+
+LEVEL_FIELDS = {
+    'province': 'province_id',
+    'commune': 'commune_id',
+    'quarter': 'quarter_id',
+}
+
+word_pattern = re.compile(r'[a-z0-9]+')
+
+
+def normalize_location_name(text):
+    """'Rohéro II - Bujumbura' -> 'rohero ii bujumbura'"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return ' '.join(word_pattern.findall(text))
+
+
+class LocationIndex:
+    """Every location name and the hierarchy, in memory (the gazetteer is small)"""
+
+    def __init__(self):
+        self.parents = {}
+        self.levels = {}
+        for location_id, parent_id, level in Location.objects.values_list(
+            'location_id', 'parent_id', 'location_level'
+        ):
+            self.parents[location_id] = parent_id
+            self.levels[location_id] = level
+
+        self.names = {}
+        for name, location_id in LocationName.objects.values_list('normalized_name', 'location_id'):
+            self.names.setdefault(name, set()).add(location_id)
+
+    def ancestors(self, location_id):
+        """The location and its ancestors, most specific first"""
+        chain = []
+        while location_id is not None:
+            chain.append(location_id)
+            location_id = self.parents.get(location_id)
+        return chain
+
+    def match(self, text):
+        """Locations named in `text`; a longer name hides the shorter ones inside it"""
+        words = normalize_location_name(text).split()
+        used = [False] * len(words)
+        matched = set()
+        for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                if all(used[start:start + size]):
+                    continue
+                found = self.names.get(' '.join(words[start:start + size]))
+                if found:
+                    matched |= found
+                    used[start:start + size] = [True] * size
+        return matched
+
+    def resolve(self, text):
+        """Most specific location consistent with `text`, or None"""
+        matched = self.match(text)
+        if not matched:
+            return None
+
+        # How many of the matched locations each candidate agrees with
+        support = {
+            location_id: len(matched.intersection(self.ancestors(location_id)))
+            for location_id in matched
+        }
+        best = max(support.values())
+        candidates = [location_id for location_id in matched if support[location_id] == best]
+
+        # Deepest shared ancestor of the remaining candidates (the candidate
+        # itself when there's only one)
+        common = self.ancestors(candidates[0])
+        for location_id in candidates[1:]:
+            ancestors = set(self.ancestors(location_id))
+            common = [ancestor for ancestor in common if ancestor in ancestors]
+        return common[0] if common else None
+
+    def level_ids(self, location_id):
+        """{'province_id': ..., 'commune_id': ..., 'quarter_id': ...} for a location"""
+        ids = dict.fromkeys(LEVEL_FIELDS.values())
+        if location_id is not None:
+            for ancestor in self.ancestors(location_id):
+                ids[LEVEL_FIELDS[self.levels[ancestor]]] = ancestor
+        return ids
+
+
+_index = None
+_index_token = None
+_index_built = 0
+
+
+def get_location_index():
+    """Process-wide LocationIndex, rebuilt when the gazetteer changes"""
+    global _index, _index_token, _index_built
+
+    token = get_group_tokens([LOCATIONS])[0]
+    expired = time.monotonic() - _index_built > settings.LOCATION_INDEX_TTL
+    if _index is None or _index_token != token or expired:
+        _index = LocationIndex()
+        _index_token = token
+        _index_built = time.monotonic()
+    return _index
+
+
+def resolve_location(text):
+    return get_location_index().resolve(text)
+
+
+def assign_location(listing):
+    """
+    Set the listing's province/commune/quarter from its list_location.
+    Returns the updated field names; the caller saves.
+    """
+    index = get_location_index()
+    ids = index.level_ids(index.resolve(listing.list_location))
+    for field, location_id in ids.items():
+        setattr(listing, f'{field}_id', location_id)
+    return list(ids)
+
+
+def location_label(location):
+    """'Rohero, Mukaza, Bujumbura Mairie'"""
+    parts = []
+    while location is not None:
+        parts.append(location.location_name)
+        location = location.parent_id
+    return ', '.join(parts)
+
+
+def search_locations(query, limit):
+    """Locations with a name or alias starting with `query`, provinces first"""
+    query = normalize_location_name(query)
+    locations = Location.objects.select_related('parent_id__parent_id')
+    if not query:
+        return list(locations.filter(location_level='province').order_by('location_name')[:limit])
+
+    matching = (
+        LocationName.objects.filter(normalized_name__startswith=query)
+        .values_list('location_id', flat=True)
+    )
+    level_order = [level for level, _ in Location.LEVELS]
+    found = sorted(
+        locations.filter(pk__in=matching),
+        key=lambda location: (level_order.index(location.location_level), location.location_name)
+    )
+    return found[:limit]
+
+
+def autocomplete(query, limit):
+    """search_locations() as serializable dicts, cached per normalized query"""
+    raw = '|'.join(['locations', normalize_location_name(query), str(limit), *get_group_tokens([LOCATIONS])])
+    key = 'locations:' + hashlib.sha256(raw.encode()).hexdigest()
+
+    data = cache.get(key)
+    if data is None:
+        data = [
+            {
+                'location_id': location.location_id,
+                'location_name': location.location_name,
+                'location_level': location.location_level,
+                'label': location_label(location),
+            }
+            for location in search_locations(query, limit)
+        ]
+        cache.set(key, data, timeout=settings.LOCATION_AUTOCOMPLETE_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,69 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from listings.cache import LISTINGS, invalidate
+from listings.locations import LEVEL_FIELDS, get_location_index, normalize_location_name
+from listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = 'Link listings to the location gazetteer (province/commune/quarter) from their list_location'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-resolve every listing, not only those without a province (after changing the gazetteer)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Listings updated per query',
+        )
+
+    def handle(self, *args, **options):
+        index = get_location_index()
+        fields = list(LEVEL_FIELDS.values())
+
+        listings = Listing.objects.order_by('listing_id')
+        if not options['all']:
+            listings = listings.filter(province_id__isnull=True)
+
+        resolved = {}  # normalized list_location -> level ids
+        unresolved = Counter()
+        changed = []
+        total = matched = updated = 0
+
+        for listing in listings.only('listing_id', 'list_location', *fields).iterator(chunk_size=options['batch_size']):
+            total += 1
+            text = normalize_location_name(listing.list_location)
+            if text not in resolved:
+                resolved[text] = index.level_ids(index.resolve(text))
+            ids = resolved[text]
+
+            if ids['province_id'] is None:
+                unresolved[text] += 1
+            else:
+                matched += 1
+
+            if any(getattr(listing, f'{field}_id') != ids[field] for field in fields):
+                for field in fields:
+                    setattr(listing, f'{field}_id', ids[field])
+                changed.append(listing)
+            if len(changed) >= options['batch_size']:
+                updated += Listing.objects.bulk_update(changed, fields)
+                changed = []
+
+        if changed:
+            updated += Listing.objects.bulk_update(changed, fields)
+        if updated:
+            # bulk_update sends no signals
+            invalidate(LISTINGS)
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Resolved {matched} of {total} listings ({updated} updated)'))
+        if unresolved:
+            self.stdout.write(self.style.WARNING('Most common unresolved locations (add them to setup_locations):'))
+            for text, count in unresolved.most_common(20):
+                self.stdout.write(f'  {count:6}  {text or "(empty)"}')
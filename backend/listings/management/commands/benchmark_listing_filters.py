@@ -0,0 +1,180 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from listings.filters import ListingFilter
+from listings.models import Category, Listing
+from users.models import User
+
+# Synthetic categories, like the ones setup_database creates, and the
+# property/vehicle types listed in each
+CATEGORIES = {
+    'homes': ('property_type', ['house', 'apartment']),
+    'land': ('property_type', ['land']),
+    'commercial': ('property_type', ['commercial', 'other']),
+    'cars': ('vehicle_type', ['car']),
+    'trucks': ('vehicle_type', ['truck', 'other']),
+    'motorcycles': ('vehicle_type', ['motorcycle']),
+    'buses': ('vehicle_type', ['bus']),
+}
+
+# (description, category, ListingFilter parameters)
+QUERY_SHAPES = [
+    ('Houses, 3+ bedrooms, under 150M', 'homes',
+     {'property_type': 'house', 'min_bedrooms': 3, 'max_price': 150_000_000}),
+    ('Apartments, 2-3 bedrooms', 'homes',
+     {'property_type': 'apartment', 'min_bedrooms': 2, 'max_bedrooms': 3}),
+    ('Land, 2000 m² or more', 'land',
+     {'property_type': 'land', 'min_area': 2000}),
+    ('Cars from 2015, under 80,000 km', 'cars',
+     {'vehicle_type': 'car', 'min_year': 2015, 'max_mileage': 80_000}),
+    ('Diesel automatic cars from 2018', 'cars',
+     {'vehicle_type': 'car', 'fuel_type': 'diesel', 'transmission': 'automatic', 'min_year': 2018}),
+]
+
+PAGE_SIZE = 20
+
+PARTIAL_INDEXES = {'listings_active_property_idx', 'listings_active_area_idx', 'listings_active_vehicle_idx'}
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain(sql, params):
+    """(index names used, execution time in ms) from EXPLAIN ANALYZE"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}', params)
+        result = cursor.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    indexes = sorted({node['Index Name'] for node in plan_nodes(result[0]['Plan']) if 'Index Name' in node})
+    return indexes, result[0]['Execution Time']
+
+
+class Command(BaseCommand):
+    help = (
+        'Show the query plans and timings of the common listing attribute filters. '
+        'Adds synthetic listings (deleted afterwards) and vacuums LISTINGS: '
+        'run it on a development or staging database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--listings',
+            type=int,
+            default=100000,
+            help='Synthetic listings to add for the run',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed for the synthetic listings',
+        )
+
+    def handle(self, *args, **options):
+        seller = User.objects.create_user(
+            'benchmark@example.com', '+25779999999',
+            user_firstname='Benchmark', user_lastname='Seller'
+        )
+        categories = {
+            key: Category.objects.create(cat_name=f'Benchmark {key}', slug=f'benchmark-{key}')
+            for key in CATEGORIES
+        }
+        try:
+            self.create_listings(seller, categories, options['listings'], random.Random(options['seed']))
+            with connection.cursor() as cursor:
+                # Index-only scans need an up-to-date visibility map
+                cursor.execute('VACUUM ANALYZE "LISTINGS"')
+
+            for description, category, params in QUERY_SHAPES:
+                self.benchmark(description, categories[category], params)
+        finally:
+            with connection.cursor() as cursor:
+                # Plain DELETE: the synthetic rows have nothing attached
+                cursor.execute('DELETE FROM "LISTINGS" WHERE "USERID" = %s', [seller.pk])
+            Category.objects.filter(pk__in=[c.pk for c in categories.values()]).delete()
+            seller.delete()
+            self.stdout.write(self.style.SUCCESS('✓ Synthetic listings removed'))
+
+    def benchmark(self, description, category, params):
+        filterset = ListingFilter(
+            {**params, 'cat_id': category.cat_id},
+            queryset=Listing.objects.filter(listing_status='active')
+        )
+        # What the first page of the feed runs: the paginator's count, then the page
+        matching_sql, matching_params = filterset.qs.order_by().values('pk').query.sql_with_params()
+        queries = [
+            ('count', f'SELECT COUNT(*) FROM ({matching_sql}) AS matching', matching_params),
+            ('page', *filterset.qs.order_by('-createdat')[:PAGE_SIZE].query.sql_with_params()),
+        ]
+
+        self.stdout.write(description)
+        for name, sql, params in queries:
+            indexes, elapsed = explain(sql, params)
+            with connection.cursor() as cursor:
+                # Baseline: the same query without any index
+                cursor.execute('SET enable_indexscan = off')
+                cursor.execute('SET enable_bitmapscan = off')
+                cursor.execute('SET enable_indexonlyscan = off')
+                try:
+                    _, baseline = explain(sql, params)
+                finally:
+                    cursor.execute('RESET enable_indexscan')
+                    cursor.execute('RESET enable_bitmapscan')
+                    cursor.execute('RESET enable_indexonlyscan')
+
+            used = ', '.join(indexes) or 'sequential scan'
+            line = f'  {name:<6}{elapsed:8.2f} ms  (no index: {baseline:.2f} ms)  {used}'
+            if any(index in PARTIAL_INDEXES for index in indexes):
+                line = self.style.SUCCESS(line)
+            self.stdout.write(line)
+
+    def create_listings(self, seller, categories, count, rng):
+        start = time.time()
+        keys = list(CATEGORIES)
+        listings = []
+        for i in range(count):
+            key = keys[i % len(keys)]
+            type_field, types = CATEGORIES[key]
+            fields = {
+                'userid': seller,
+                'cat_id': categories[key],
+                'listing_title': f'Benchmark listing {i}',
+                'list_description': '-',
+                'list_location': rng.choice(['Bujumbura, Rohero', 'Bujumbura, Kinindo', 'Gitega', 'Ngozi']),
+                'listing_status': 'active' if rng.random() < 0.7 else rng.choice(['sold', 'expired', 'pending']),
+                type_field: rng.choice(types),
+            }
+            if type_field == 'property_type':
+                fields.update(
+                    bedrooms=rng.randint(1, 6),
+                    bathrooms=rng.randint(1, 4),
+                    area_size=rng.randint(40, 5000),
+                    listing_price=rng.randint(10, 500) * 1_000_000,
+                )
+            else:
+                fields.update(
+                    year_built=rng.randint(1995, 2025),
+                    mileage=rng.randint(0, 300_000),
+                    fuel_type=rng.choice([value for value, _ in Listing.FUEL_TYPES]),
+                    transmission=rng.choice([value for value, _ in Listing.TRANSMISSION_TYPES]),
+                    condition=rng.choice([value for value, _ in Listing.CONDITION_TYPES]),
+                    listing_price=rng.randint(2, 200) * 1_000_000,
+                )
+            listings.append(Listing(**fields))
+        Listing.objects.bulk_create(listings, batch_size=1000)
+
+        with connection.cursor() as cursor:
+            # Spread creation dates over a year so newest-first ordering is realistic
+            cursor.execute(
+                'UPDATE "LISTINGS" SET "CREATEDAT" = NOW() - RANDOM() * INTERVAL \'365 days\' WHERE "USERID" = %s',
+                [seller.pk]
+            )
+        self.stdout.write(f'Added {count} synthetic listings in {time.time() - start:.1f}s\n')
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from listings.upload_sessions import cleanup_stale_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable image uploads idle for more than IMAGE_UPLOAD_SESSION_TTL hours'
+
+    def handle(self, *args, **options):
+        deleted = cleanup_stale_sessions()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Deleted {deleted} upload sessions idle for more than {settings.IMAGE_UPLOAD_SESSION_TTL}h'
+        ))
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from listings.view_counter import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Write buffered listing views to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and flush every --interval seconds (worker mode)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.LISTING_VIEW_FLUSH_INTERVAL,
+            help='Seconds between flushes in --loop mode',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            flushed = view_counter.flush()
+            self.stdout.write(self.style.SUCCESS(f'✓ Flushed {flushed} listing views'))
+            return
+
+        self.stdout.write(f"Flushing listing views every {options['interval']}s (Ctrl+C to stop)")
+        try:
+            while True:
+                try:
+                    flushed = view_counter.flush()
+                    if flushed:
+                        self.stdout.write(f'✓ Flushed {flushed} listing views')
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f'Error flushing listing views: {e}'))
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            view_counter.flush()
+            self.stdout.write(self.style.SUCCESS('\n✓ Final flush done'))
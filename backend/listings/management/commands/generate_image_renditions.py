@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from listings.images import add_renditions
+from listings.models import ListingImage
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail/card/full JPEG and WebP renditions for images processed before renditions existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of images loaded per query',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Stop after this many images',
+        )
+
+    def handle(self, *args, **options):
+        queryset = ListingImage.objects.filter(processing_status='ready', renditions={}).order_by('listimage_id')
+        total = queryset.count()
+        if options['limit'] is not None:
+            total = min(total, options['limit'])
+        self.stdout.write(f'Generating renditions for {total} images...')
+
+        done = failed = 0
+        last_id = 0
+        while done + failed < total:
+            # Keyset over the primary key: rows leave the queryset as they are processed
+            batch = list(queryset.filter(listimage_id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+
+            for image in batch:
+                last_id = image.listimage_id
+                if done + failed >= total:
+                    break
+                try:
+                    add_renditions(image)
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f'✗ Image {image.listimage_id}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Generated renditions for {done} images ({failed} failed)'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from listings.similarity import rebuild_all, rebuild_category
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed similar listings of every active listing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--category',
+            type=int,
+            default=None,
+            help='Only rebuild this category id',
+        )
+
+    def handle(self, *args, **options):
+        if options['category'] is not None:
+            counts = {options['category']: rebuild_category(options['category'])}
+        else:
+            counts = rebuild_all()
+
+        for cat_id, count in sorted(counts.items()):
+            self.stdout.write(f'  Category {cat_id}: {count} listings')
+        self.stdout.write(self.style.SUCCESS(f'✓ Similar listings rebuilt for {sum(counts.values())} listings'))
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from listings.locations import normalize_location_name
+from listings.models import Location, LocationName
+
+# Provinces, their communes and the communes' quarters, with the other
+# spellings sellers use. Extend as `backfill_listing_locations` reports
+# unresolved locations.
+GAZETTEER = [
+    {
+        'name': 'Bujumbura Mairie',
+        'aliases': ['Bujumbura', 'Buja', 'Bujumbura Ville'],
+        'communes': [
+            {'name': 'Mukaza', 'quarters': ['Bwiza', 'Buyenzi', 'Nyakabiga', 'Rohero']},
+            {'name': 'Ntahangwa', 'quarters': ['Buterere', 'Cibitoke', 'Gihosha', 'Kamenge', 'Kinama', 'Ngagara']},
+            {'name': 'Muha', 'quarters': ['Kanyosha', 'Kinindo', 'Musaga']},
+        ],
+    },
+    {'name': 'Bujumbura Rural', 'communes': [{'name': 'Isale'}, {'name': 'Kabezi'}, {'name': 'Mutimbuzi'}]},
+    {'name': 'Bubanza', 'communes': [{'name': 'Bubanza'}]},
+    {'name': 'Bururi', 'communes': [{'name': 'Bururi'}]},
+    {'name': 'Cankuzo', 'communes': [{'name': 'Cankuzo'}]},
+    {'name': 'Cibitoke'},
+    {'name': 'Gitega', 'communes': [{'name': 'Gitega'}]},
+    {'name': 'Karusi', 'aliases': ['Karuzi']},
+    {'name': 'Kayanza', 'communes': [{'name': 'Kayanza'}]},
+    {'name': 'Kirundo', 'communes': [{'name': 'Kirundo'}]},
+    {'name': 'Makamba', 'communes': [{'name': 'Makamba'}, {'name': 'Nyanza-Lac'}]},
+    {'name': 'Muramvya', 'communes': [{'name': 'Muramvya'}]},
+    {'name': 'Muyinga', 'communes': [{'name': 'Muyinga'}]},
+    {'name': 'Mwaro'},
+    {'name': 'Ngozi', 'communes': [{'name': 'Ngozi'}]},
+    {'name': 'Rumonge', 'communes': [{'name': 'Rumonge'}]},
+    {'name': 'Rutana', 'communes': [{'name': 'Rutana'}]},
+    {'name': 'Ruyigi', 'communes': [{'name': 'Ruyigi'}]},
+]
+
+
+class Command(BaseCommand):
+    help = 'Load the location gazetteer (provinces, communes, quarters) used to normalize listing locations'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        self.created = 0
+        for province in GAZETTEER:
+            province_location = self.add(province['name'], 'province', None, province.get('aliases', []))
+            for commune in province.get('communes', []):
+                commune_location = self.add(commune['name'], 'commune', province_location, commune.get('aliases', []))
+                for quarter in commune.get('quarters', []):
+                    self.add(quarter, 'quarter', commune_location, [])
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Locations setup complete! ({self.created} created)'))
+        self.stdout.write(self.style.SUCCESS(f'Total locations: {Location.objects.count()}'))
+        self.stdout.write('Run `python manage.py backfill_listing_locations` to link existing listings')
+
+    def add(self, name, level, parent, aliases):
+        location, created = Location.objects.get_or_create(
+            parent_id=parent,
+            location_name=name,
+            defaults={'location_level': level}
+        )
+        if created:
+            self.created += 1
+            self.stdout.write(self.style.SUCCESS(f'✓ Created {level}: {name}'))
+
+        spellings = {normalize_location_name(name): False}
+        for alias in aliases:
+            spellings.setdefault(normalize_location_name(alias), True)
+        for normalized_name, is_alias in spellings.items():
+            LocationName.objects.get_or_create(
+                location_id=location,
+                normalized_name=normalized_name,
+                defaults={'is_alias': is_alias}
+            )
+        return location
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_listing_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['createdat', 'listing_id'], name='listings_createdat_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['listing_price', 'listing_id'], name='listings_price_id_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0009_listing_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='processing_error',
+            field=models.TextField(blank=True, db_column='PROCESSING_ERROR', null=True),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_column='PROCESSING_STATUS', default='ready', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='source_path',
+            field=models.CharField(blank=True, db_column='SOURCE_PATH', help_text='Storage path of the raw upload while it awaits processing', max_length=255, null=True),
+        ),
+    ]
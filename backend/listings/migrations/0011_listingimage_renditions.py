@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_listingimage_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='renditions',
+            field=models.JSONField(blank=True, db_column='RENDITIONS', default=dict),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:15
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_listingimage_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageUploadSession',
+            fields=[
+                ('upload_id', models.UUIDField(db_column='UPLOAD_ID', default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(db_column='FILENAME', max_length=255)),
+                ('content_type', models.CharField(db_column='CONTENT_TYPE', max_length=50)),
+                ('total_size', models.IntegerField(db_column='TOTAL_SIZE')),
+                ('received_size', models.IntegerField(db_column='RECEIVED_SIZE', default=0)),
+                ('chunk_offsets', models.JSONField(blank=True, db_column='CHUNK_OFFSETS', default=list)),
+                ('session_status', models.CharField(choices=[('uploading', 'Uploading'), ('completed', 'Completed')], db_column='SESSION_STATUS', default='uploading', max_length=10)),
+                ('createdat', models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')),
+                ('updatedat', models.DateTimeField(auto_now=True, db_column='UPDATEDAT')),
+                ('listimage_id', models.ForeignKey(blank=True, db_column='LISTIMAGE_ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='listings.listingimage')),
+                ('listing_id', models.ForeignKey(db_column='LISTING_ID', on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='listings.listing')),
+                ('userid', models.ForeignKey(db_column='USERID', on_delete=django.db.models.deletion.CASCADE, related_name='image_upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'IMAGE_UPLOAD_SESSIONS',
+                'indexes': [models.Index(fields=['updatedat'], name='IMAGE_UPLOA_UPDATED_86cdb8_idx')],
+            },
+        ),
+    ]
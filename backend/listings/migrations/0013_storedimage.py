@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_imageuploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('storedimage_id', models.AutoField(db_column='STOREDIMAGE_ID', primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(db_column='CONTENT_HASH', max_length=64, unique=True)),
+                ('image_url', models.CharField(db_column='IMAGE_URL', max_length=255)),
+                ('renditions', models.JSONField(blank=True, db_column='RENDITIONS', default=dict)),
+                ('ref_count', models.IntegerField(db_column='REF_COUNT', default=0)),
+                ('createdat', models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')),
+            ],
+            options={
+                'db_table': 'STORED_IMAGES',
+            },
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='source_hash',
+            field=models.CharField(blank=True, db_column='SOURCE_HASH', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='stored_image',
+            field=models.ForeignKey(blank=True, db_column='STOREDIMAGE_ID', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='listing_images', to='listings.storedimage'),
+        ),
+        migrations.AddIndex(
+            model_name='listingimage',
+            index=models.Index(fields=['source_hash'], name='listing_images_source_hash_idx'),
+        ),
+    ]
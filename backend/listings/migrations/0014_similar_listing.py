@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_storedimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarListing',
+            fields=[
+                ('similar_id', models.BigAutoField(db_column='SIMILAR_ID', primary_key=True, serialize=False)),
+                ('rank', models.SmallIntegerField(db_column='RANK')),
+                ('distance', models.FloatField(db_column='DISTANCE')),
+                ('listing_id', models.ForeignKey(db_column='LISTING_ID', on_delete=django.db.models.deletion.CASCADE, related_name='similar_listings', to='listings.listing')),
+                ('neighbour_id', models.ForeignKey(db_column='NEIGHBOUR_ID', on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_of', to='listings.listing')),
+            ],
+            options={
+                'db_table': 'SIMILAR_LISTINGS',
+                'ordering': ['listing_id', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('listing_id', 'rank'), name='similar_listings_listing_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_similar_listing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('listing_status', 'active')), fields=['cat_id', 'property_type', 'bedrooms', 'listing_price'], name='listings_active_property_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('listing_status', 'active')), fields=['cat_id', 'property_type', 'area_size'], name='listings_active_area_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('listing_status', 'active')), fields=['cat_id', 'vehicle_type', 'year_built', 'mileage'], name='listings_active_vehicle_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0015_listing_attribute_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('location_id', models.AutoField(db_column='LOCATION_ID', primary_key=True, serialize=False)),
+                ('location_name', models.CharField(db_column='LOCATION_NAME', max_length=100)),
+                ('location_level', models.CharField(choices=[('province', 'Province'), ('commune', 'Commune'), ('quarter', 'Quarter')], db_column='LOCATION_LEVEL', max_length=10)),
+                ('createdat', models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')),
+                ('parent_id', models.ForeignKey(blank=True, db_column='PARENT_ID', null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='children', to='listings.location')),
+            ],
+            options={
+                'db_table': 'LOCATIONS',
+            },
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='commune_id',
+            field=models.ForeignKey(blank=True, db_column='COMMUNE_ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='listings.location'),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='province_id',
+            field=models.ForeignKey(blank=True, db_column='PROVINCE_ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='listings.location'),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='quarter_id',
+            field=models.ForeignKey(blank=True, db_column='QUARTER_ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='listings.location'),
+        ),
+        migrations.CreateModel(
+            name='LocationName',
+            fields=[
+                ('name_id', models.AutoField(db_column='NAME_ID', primary_key=True, serialize=False)),
+                ('normalized_name', models.CharField(db_column='NORMALIZED_NAME', max_length=100)),
+                ('is_alias', models.BooleanField(db_column='IS_ALIAS', default=False)),
+                ('location_id', models.ForeignKey(db_column='LOCATION_ID', on_delete=django.db.models.deletion.CASCADE, related_name='names', to='listings.location')),
+            ],
+            options={
+                'db_table': 'LOCATION_NAMES',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='location',
+            constraint=models.UniqueConstraint(fields=('parent_id', 'location_name'), name='locations_parent_name_uniq', nulls_distinct=False),
+        ),
+        migrations.AddIndex(
+            model_name='locationname',
+            index=models.Index(fields=['normalized_name'], name='location_names_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddConstraint(
+            model_name='locationname',
+            constraint=models.UniqueConstraint(fields=('location_id', 'normalized_name'), name='location_names_location_name_uniq'),
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import Q
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -27,6 +30,77 @@ class Category(models.Model):
         return self.cat_name
 
 
+# ============================================================================
+# LOCATIONS
+# ============================================================================
+
+class Location(models.Model):
+    """
+    Gazetteer entry: a province, a commune in a province or a quarter in a
+    commune. Loaded by `python manage.py setup_locations`.
+    """
+    LEVELS = [
+        ('province', 'Province'),
+        ('commune', 'Commune'),
+        ('quarter', 'Quarter'),
+    ]
+
+    location_id = models.AutoField(primary_key=True, db_column='LOCATION_ID')
+    location_name = models.CharField(max_length=100, db_column='LOCATION_NAME')
+    location_level = models.CharField(max_length=10, choices=LEVELS, db_column='LOCATION_LEVEL')
+    parent_id = models.ForeignKey(
+        'self',
+        on_delete=models.RESTRICT,
+        null=True,
+        blank=True,
+        db_column='PARENT_ID',
+        related_name='children'
+    )
+    createdat = models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')
+
+    class Meta:
+        db_table = 'LOCATIONS'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['parent_id', 'location_name'],
+                name='locations_parent_name_uniq',
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return self.location_name
+
+
+class LocationName(models.Model):
+    """
+    Normalized spellings of a location (its name and aliases such as
+    "Buja"), looked up by listing normalization and autocomplete
+    """
+    name_id = models.AutoField(primary_key=True, db_column='NAME_ID')
+    location_id = models.ForeignKey(
+        Location,
+        on_delete=models.CASCADE,
+        db_column='LOCATION_ID',
+        related_name='names'
+    )
+    normalized_name = models.CharField(max_length=100, db_column='NORMALIZED_NAME')
+    is_alias = models.BooleanField(default=False, db_column='IS_ALIAS')
+
+    class Meta:
+        db_table = 'LOCATION_NAMES'
+        constraints = [
+            models.UniqueConstraint(fields=['location_id', 'normalized_name'], name='location_names_location_name_uniq'),
+        ]
+        indexes = [
+            # Prefix search (LIKE 'roh%') for autocomplete
+            models.Index(fields=['normalized_name'], name='location_names_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.normalized_name
+
+
 # ============================================================================
 # PRICING PLANS
 # ============================================================================
@@ -129,6 +203,11 @@ class UserSubscription(models.Model):
 # LISTINGS
 # ============================================================================
 
+# Text search configuration used for listing search documents. 'simple' does no
+# stemming, which suits our mix of French, Kirundi and English listings.
+SEARCH_CONFIG = 'simple'
+
+
 class Listing(models.Model):
     LISTING_STATUS = [
         ('active', 'Active'),
@@ -187,6 +266,17 @@ class Listing(models.Model):
     list_description = models.TextField(db_column='LIST_DESCRIPTION')
     listing_price = models.DecimalField(max_digits=15, decimal_places=2, db_column='LISTING_PRICE')
     list_location = models.CharField(max_length=255, db_column='LIST_LOCATION')
+    # list_location resolved against the gazetteer (listings/locations.py);
+    # one column per level so a filter on any level is a single indexed lookup
+    province_id = models.ForeignKey(
+        Location, on_delete=models.SET_NULL, null=True, blank=True, db_column='PROVINCE_ID', related_name='+'
+    )
+    commune_id = models.ForeignKey(
+        Location, on_delete=models.SET_NULL, null=True, blank=True, db_column='COMMUNE_ID', related_name='+'
+    )
+    quarter_id = models.ForeignKey(
+        Location, on_delete=models.SET_NULL, null=True, blank=True, db_column='QUARTER_ID', related_name='+'
+    )
     listing_status = models.CharField(
         max_length=10,
         choices=LISTING_STATUS,
@@ -306,6 +396,19 @@ class Listing(models.Model):
     expiration_date = models.DateTimeField(null=True, blank=True, db_column='EXPIRATION_DATE')
     createdat = models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')
     updatedat = models.DateTimeField(auto_now=True, db_column='UPDATEDAT')
+
+    # Full-text search document, recomputed by PostgreSQL whenever the row is
+    # written. Weights: title (A) > location (B) > description (C)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('listing_title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('list_location', weight='B', config=SEARCH_CONFIG)
+            + SearchVector('list_description', weight='C', config=SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        db_column='SEARCH_VECTOR'
+    )
     
     class Meta:
         db_table = 'LISTINGS'
@@ -317,6 +420,27 @@ class Listing(models.Model):
             models.Index(fields=['list_location']),
             models.Index(fields=['listing_price']),
             models.Index(fields=['createdat']),
+            # Keyset pagination keys (see listings/pagination.py)
+            models.Index(fields=['createdat', 'listing_id'], name='listings_createdat_id_idx'),
+            models.Index(fields=['listing_price', 'listing_id'], name='listings_price_id_idx'),
+            GinIndex(fields=['search_vector'], name='listings_search_vector_gin'),
+            # Attribute filters (ListingFilter) on the public feed: equality
+            # columns first, then the range the shape is usually narrowed by
+            models.Index(
+                fields=['cat_id', 'property_type', 'bedrooms', 'listing_price'],
+                name='listings_active_property_idx',
+                condition=Q(listing_status='active'),
+            ),
+            models.Index(
+                fields=['cat_id', 'property_type', 'area_size'],
+                name='listings_active_area_idx',
+                condition=Q(listing_status='active'),
+            ),
+            models.Index(
+                fields=['cat_id', 'vehicle_type', 'year_built', 'mileage'],
+                name='listings_active_vehicle_idx',
+                condition=Q(listing_status='active'),
+            ),
         ]
         ordering = ['-createdat']
     
@@ -324,15 +448,82 @@ class Listing(models.Model):
         return self.listing_title
     
     def increment_views(self):
+        """
+        Count a view. The database is updated in batches by the view counter
+        (see listings/view_counter.py); only this instance is bumped right away.
+        """
+        from .view_counter import view_counter
+
+        view_counter.record(self.pk)
         self.views += 1
-        self.save(update_fields=['views'])
+
+
+class SimilarListing(models.Model):
+    """
+    Precomputed nearest neighbours of an active listing within its category,
+    maintained by listings/similarity.py. rank 0 is the most similar.
+    """
+    similar_id = models.BigAutoField(primary_key=True, db_column='SIMILAR_ID')
+    listing_id = models.ForeignKey(
+        Listing,
+        on_delete=models.CASCADE,
+        db_column='LISTING_ID',
+        related_name='similar_listings'
+    )
+    neighbour_id = models.ForeignKey(
+        Listing,
+        on_delete=models.CASCADE,
+        db_column='NEIGHBOUR_ID',
+        related_name='neighbour_of'
+    )
+    rank = models.SmallIntegerField(db_column='RANK')
+    distance = models.FloatField(db_column='DISTANCE')
+
+    class Meta:
+        db_table = 'SIMILAR_LISTINGS'
+        constraints = [
+            # Also the index similar_listings reads in rank order
+            models.UniqueConstraint(fields=['listing_id', 'rank'], name='similar_listings_listing_rank_uniq'),
+        ]
+        ordering = ['listing_id', 'rank']
+
+    def __str__(self):
+        return f"{self.listing_id_id} -> {self.neighbour_id_id} (#{self.rank})"
 
 
 # ============================================================================
 # LISTING IMAGES
 # ============================================================================
 
+class StoredImage(models.Model):
+    """
+    Processed image files, stored once per distinct content and shared by
+    every ListingImage showing that picture (see listings/images.py)
+    """
+    storedimage_id = models.AutoField(primary_key=True, db_column='STOREDIMAGE_ID')
+    # sha256 of the full-size JPEG rendition; files live under images/{hash[:2]}/{hash}*
+    content_hash = models.CharField(max_length=64, unique=True, db_column='CONTENT_HASH')
+    image_url = models.CharField(max_length=255, db_column='IMAGE_URL')
+    renditions = models.JSONField(default=dict, blank=True, db_column='RENDITIONS')
+    # Number of ListingImage rows pointing here; files are deleted when it drops to 0
+    ref_count = models.IntegerField(default=0, db_column='REF_COUNT')
+    createdat = models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')
+
+    class Meta:
+        db_table = 'STORED_IMAGES'
+
+    def __str__(self):
+        return f"{self.content_hash} ({self.ref_count} refs)"
+
+
 class ListingImage(models.Model):
+    PROCESSING_STATUS = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     listimage_id = models.AutoField(primary_key=True, db_column='LISTIMAGE_ID')
     listing_id = models.ForeignKey(
         Listing, 
@@ -343,16 +534,105 @@ class ListingImage(models.Model):
     image_url = models.CharField(max_length=255, db_column='IMAGE_URL')
     is_primary = models.BooleanField(default=False, db_column='IS_PRIMARY')
     display_order = models.IntegerField(default=0, db_column='DISPLAY_ORDER')
+    # Background optimization (see listings/images.py)
+    processing_status = models.CharField(
+        max_length=10,
+        choices=PROCESSING_STATUS,
+        default='ready',
+        db_column='PROCESSING_STATUS'
+    )
+    source_path = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        db_column='SOURCE_PATH',
+        help_text='Storage path of the raw upload while it awaits processing'
+    )
+    processing_error = models.TextField(null=True, blank=True, db_column='PROCESSING_ERROR')
+    # {"thumbnail": {"width": 320, "height": 213, "jpeg": url, "webp": url}, "card": {...}, "full": {...}}
+    # Copied from stored_image so serializing a listing needs no extra join
+    renditions = models.JSONField(default=dict, blank=True, db_column='RENDITIONS')
+    # sha256 of the raw upload: a new upload with the same bytes reuses stored_image
+    source_hash = models.CharField(max_length=64, null=True, blank=True, db_column='SOURCE_HASH')
+    stored_image = models.ForeignKey(
+        StoredImage,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        db_column='STOREDIMAGE_ID',
+        related_name='listing_images'
+    )
     uploadedat = models.DateTimeField(auto_now_add=True, db_column='UPLOADEDAT')
     
     class Meta:
         db_table = 'LISTING_IMAGES'
         ordering = ['display_order']
+        indexes = [
+            models.Index(fields=['source_hash'], name='listing_images_source_hash_idx'),
+        ]
     
     def __str__(self):
         return f"Image for {self.listing_id.listing_title}"
 
 
+# ============================================================================
+# RESUMABLE IMAGE UPLOADS
+# ============================================================================
+
+class ImageUploadSession(models.Model):
+    """A listing image received in chunks (see listings/upload_sessions.py)"""
+    SESSION_STATUS = [
+        ('uploading', 'Uploading'),
+        ('completed', 'Completed'),
+    ]
+
+    # Random id: it is the only handle clients get on an in-progress upload
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, db_column='UPLOAD_ID')
+    listing_id = models.ForeignKey(
+        Listing,
+        on_delete=models.CASCADE,
+        db_column='LISTING_ID',
+        related_name='upload_sessions'
+    )
+    userid = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_column='USERID',
+        related_name='image_upload_sessions'
+    )
+    filename = models.CharField(max_length=255, db_column='FILENAME')
+    content_type = models.CharField(max_length=50, db_column='CONTENT_TYPE')
+    total_size = models.IntegerField(db_column='TOTAL_SIZE')
+    received_size = models.IntegerField(default=0, db_column='RECEIVED_SIZE')
+    # Offsets of the chunk files received so far, in order
+    chunk_offsets = models.JSONField(default=list, blank=True, db_column='CHUNK_OFFSETS')
+    session_status = models.CharField(
+        max_length=10,
+        choices=SESSION_STATUS,
+        default='uploading',
+        db_column='SESSION_STATUS'
+    )
+    listimage_id = models.ForeignKey(
+        ListingImage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_column='LISTIMAGE_ID',
+        related_name='+'
+    )
+    createdat = models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')
+    updatedat = models.DateTimeField(auto_now=True, db_column='UPDATEDAT')
+
+    class Meta:
+        db_table = 'IMAGE_UPLOAD_SESSIONS'
+        indexes = [
+            models.Index(fields=['updatedat']),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.upload_id} ({self.received_size}/{self.total_size} bytes)"
+
+
 # ============================================================================
 # RATINGS & REVIEWS
 # ============================================================================
@@ -0,0 +1,154 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def parse_cursor_datetime(value):
+    parsed = parse_datetime(value)
+    # Cursors we hand out always carry the UTC offset
+    if parsed is None or timezone.is_naive(parsed):
+        raise ValueError(value)
+    return parsed
+
+
+def parse_cursor_decimal(value):
+    parsed = Decimal(value)
+    # NaN and Infinity parse but can't be compared against a DecimalField
+    if not parsed.is_finite():
+        raise ValueError(value)
+    return parsed
+
+
+class ListingCursorPagination(BasePagination):
+    """
+    Keyset pagination for the public listing feed
+    GET /api/listings/?pagination=cursor&ordering=-createdat
+    GET /api/listings/?pagination=cursor&cursor=<next cursor>
+
+    Pages are keyed on (ordering field, listing_id), so each page is a single
+    index range scan with no COUNT and no OFFSET, however deep the client
+    scrolls. Only orderings listed in `key_fields` are supported.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = '-createdat'
+
+    # ordering field -> function parsing the cursor value back into a Python value
+    key_fields = {
+        'createdat': parse_cursor_datetime,
+        'listing_price': parse_cursor_decimal,
+    }
+
+    @classmethod
+    def is_requested(cls, request):
+        """Cursor mode is opt-in: ?pagination=cursor, or any ?cursor= link we handed out"""
+        return (
+            request.query_params.get(cls.mode_query_param) == 'cursor'
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(OrderingFilter.ordering_param) or self.default_ordering
+        ordering = ordering.split(',')[0].strip()
+        if ordering.lstrip('-') not in self.key_fields:
+            raise ValidationError({
+                OrderingFilter.ordering_param: 'Cursor pagination supports ordering by: ' + ', '.join(
+                    f'{field}, -{field}' for field in self.key_fields
+                )
+            })
+        return ordering
+
+    def encode_cursor(self, instance):
+        field = self.ordering.lstrip('-')
+        payload = json.dumps({'v': str(getattr(instance, field)), 'id': instance.pk})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        field = self.ordering.lstrip('-')
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            value = self.key_fields[field](payload['v'])
+            pk = int(payload['id'])
+        except (ValueError, TypeError, KeyError, InvalidOperation):
+            raise NotFound('Invalid cursor')
+        return value, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(request)
+        self.page_size = self.get_page_size(request)
+
+        field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+        pk_ordering = '-listing_id' if descending else 'listing_id'
+        queryset = queryset.order_by(self.ordering, pk_ordering)
+
+        cursor = self.decode_cursor(request)
+        if cursor:
+            value, pk = cursor
+            # (field, id) < (value, pk), written so the planner still gets a
+            # plain range condition on `field` for the index scan
+            if descending:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lte': value}),
+                    Q(**{f'{field}__lt': value}) | Q(listing_id__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gte': value}),
+                    Q(**{f'{field}__gt': value}) | Q(listing_id__gt=pk)
+                )
+
+        # Fetch one extra row to find out whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -25,25 +25,39 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ListingImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = ListingImage
-        fields = ['listimage_id', 'image_url', 'is_primary', 'display_order']
+        fields = ['listimage_id', 'image_url', 'renditions', 'is_primary', 'display_order', 'processing_status']
 
-    def get_image_url(self, obj):
+    def build_url(self, url):
         """Return absolute URL for images"""
         request = self.context.get('request')
-        if obj.image_url:
+        if url:
             # If the URL is already absolute, return it as is
-            if obj.image_url.startswith('http://') or obj.image_url.startswith('https://'):
-                return obj.image_url
+            if url.startswith('http://') or url.startswith('https://'):
+                return url
             # Otherwise, build absolute URI
             if request:
-                return request.build_absolute_uri(obj.image_url)
+                return request.build_absolute_uri(url)
             # Fallback: return the relative URL if no request context
-            return obj.image_url
+            return url
         return None
 
+    def get_image_url(self, obj):
+        return self.build_url(obj.image_url)
+
+    def get_renditions(self, obj):
+        """{"thumbnail"|"card"|"full": {"width", "height", "jpeg", "webp"}}, empty until processed"""
+        return {
+            name: {
+                key: self.build_url(value) if key in ('jpeg', 'webp') else value
+                for key, value in rendition.items()
+            }
+            for name, rendition in (obj.renditions or {}).items()
+        }
+
 
 class ListingSerializer(serializers.ModelSerializer):
     images = ListingImageSerializer(many=True, read_only=True)
@@ -55,6 +69,7 @@ class ListingSerializer(serializers.ModelSerializer):
         fields = [
             'listing_id', 'listing_title', 'list_description',
             'listing_price', 'list_location', 'listing_status',
+            'province_id', 'commune_id', 'quarter_id',
             'views', 'is_featured', 'expiration_date',
             'createdat', 'updatedat', 'images', 'category', 'seller',
             # Property fields
@@ -64,7 +79,7 @@ class ListingSerializer(serializers.ModelSerializer):
             'vehicle_type', 'year_built', 'mileage', 'fuel_type',
             'transmission', 'condition'
         ]
-        read_only_fields = ['listing_id', 'views', 'createdat', 'updatedat']
+        read_only_fields = ['listing_id', 'views', 'createdat', 'updatedat', 'province_id', 'commune_id', 'quarter_id']
 
 
 class ListingCreateSerializer(serializers.ModelSerializer):
@@ -114,6 +129,7 @@ class ListingDetailSerializer(serializers.ModelSerializer):
         fields = [
             'listing_id', 'listing_title', 'list_description',
             'listing_price', 'list_location', 'listing_status',
+            'province_id', 'commune_id', 'quarter_id',
             'views', 'is_featured', 'expiration_date',
             'createdat', 'updatedat', 'images', 'category',
             'seller', 'is_favorited',
@@ -1,6 +1,10 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from .models import Listing
+
+from .cache import CATEGORIES, LISTINGS, LOCATIONS, PRICING_PLANS, invalidate
+from .images import release_stored_image
+from .models import Category, Listing, ListingImage, Location, LocationName, PricingPlan, SimilarListing
 
 
 @receiver(post_save, sender=Listing)
@@ -17,3 +21,72 @@ def set_user_as_seller(sender, instance, created, **kwargs):
             if user.user_role == 'buyer':
                 user.user_role = 'seller'
             user.save(update_fields=['is_seller', 'user_role'])
+
+
+# ============================================================================
+# RESPONSE CACHE INVALIDATION
+# ============================================================================
+
+def invalidate_on_commit(*groups):
+    # Wait for the commit so a concurrent read can't re-cache the old rows
+    transaction.on_commit(lambda: invalidate(*groups))
+
+
+@receiver([post_save, post_delete], sender=Listing)
+@receiver([post_save, post_delete], sender=ListingImage)
+def invalidate_listing_cache(sender, **kwargs):
+    invalidate_on_commit(LISTINGS)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    # Listing payloads embed their category
+    invalidate_on_commit(CATEGORIES, LISTINGS)
+
+
+@receiver([post_save, post_delete], sender=PricingPlan)
+def invalidate_pricing_plan_cache(sender, **kwargs):
+    invalidate_on_commit(PRICING_PLANS)
+
+
+@receiver([post_save, post_delete], sender=Location)
+@receiver([post_save, post_delete], sender=LocationName)
+def invalidate_location_cache(sender, **kwargs):
+    # Location autocomplete and the name index used to resolve listings
+    invalidate_on_commit(LOCATIONS)
+
+
+# ============================================================================
+# STORED IMAGE REFERENCES
+# ============================================================================
+
+@receiver(post_delete, sender=ListingImage)
+def release_listing_image_files(sender, instance, **kwargs):
+    # Also runs for images removed by a listing's cascade delete
+    if instance.stored_image_id:
+        release_stored_image(instance.stored_image_id)
+
+
+# ============================================================================
+# SIMILAR LISTINGS
+# ============================================================================
+
+def refresh_similar_on_commit(listing_ids):
+    from .tasks import refresh_similar_listings_task
+
+    transaction.on_commit(lambda: refresh_similar_listings_task.delay(listing_ids))
+
+
+@receiver(post_save, sender=Listing)
+def refresh_similar_listings(sender, instance, **kwargs):
+    refresh_similar_on_commit([instance.pk])
+
+
+@receiver(pre_delete, sender=Listing)
+def refresh_similar_listings_on_delete(sender, instance, **kwargs):
+    # The cascade removes this listing from other lists; those need a replacement
+    referencing = list(
+        SimilarListing.objects.filter(neighbour_id=instance.pk).values_list('listing_id', flat=True)
+    )
+    if referencing:
+        refresh_similar_on_commit(referencing)
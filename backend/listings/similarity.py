@@ -0,0 +1,287 @@
+"""
+"Similar listings" engine.
+
+similar_listings used to run a range query per detail view (same category,
+price within ±30%, newest first), ignoring the property and vehicle
+attributes. Neighbours are now precomputed into SIMILAR_LISTINGS so the
+endpoint is a single lookup on (listing_id, rank).
+
+Every active listing gets a feature vector, built per category:
+- numeric attributes (log price, bedrooms, bathrooms, log area in m², parking,
+  garden, garage, year, log mileage) are standardized within the category;
+  missing values take the category average, plus a flag separating listings
+  that have the attribute from those that don't;
+- categorical attributes (property/vehicle type, fuel, transmission,
+  condition, city and exact location) are one-hot encoded;
+- each block is scaled by its FEATURE_WEIGHTS entry.
+
+The SIMILAR_LISTINGS_COUNT nearest listings by Euclidean distance are
+computed with NumPy matrix products, in chunks of CHUNK_SIZE rows so memory
+stays bounded on large categories.
+
+Refreshes are incremental (refresh_listings): when listings change, only the
+rows that can be affected are recomputed:
+- the changed listings themselves;
+- listings that had one of them as a neighbour;
+- listings a changed one is now closer to than their current last neighbour.
+rebuild_all() recomputes everything and runs nightly to catch changes made
+without signals (queryset updates, raw SQL).
+"""
+
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import Listing, SimilarListing
+
+CHUNK_SIZE = 512
+
+# Relative importance of each attribute in the distance
+FEATURE_WEIGHTS = {
+    'price': 2.0,
+    'bedrooms': 1.0,
+    'bathrooms': 0.75,
+    'area': 1.0,
+    'parking_spaces': 0.5,
+    'has_garden': 0.25,
+    'has_garage': 0.25,
+    'year_built': 1.0,
+    'mileage': 1.0,
+    'property_type': 2.0,
+    'vehicle_type': 2.0,
+    'fuel_type': 1.0,
+    'transmission': 1.0,
+    'condition': 1.0,
+    'city': 1.5,
+    'location': 0.75,
+}
+
+AREA_TO_SQM = {
+    'sqm': 1.0,
+    'hectares': 10000.0,
+    'acres': 4046.86,
+}
+
+FIELDS = [
+    'listing_id', 'listing_price', 'bedrooms', 'bathrooms', 'area_size', 'area_unit',
+    'parking_spaces', 'has_garden', 'has_garage', 'year_built', 'mileage',
+    'property_type', 'vehicle_type', 'fuel_type', 'transmission', 'condition', 'list_location',
+]
+
+
+def _log(value):
+    return math.log1p(float(value)) if value is not None else None
+
+
+def numeric_features(row):
+    area = None
+    if row['area_size'] is not None:
+        area = _log(float(row['area_size']) * AREA_TO_SQM.get(row['area_unit'] or 'sqm', 1.0))
+    return {
+        'price': _log(row['listing_price']),
+        'bedrooms': row['bedrooms'],
+        'bathrooms': row['bathrooms'],
+        'area': area,
+        'parking_spaces': row['parking_spaces'],
+        'has_garden': float(row['has_garden']),
+        'has_garage': float(row['has_garage']),
+        'year_built': row['year_built'],
+        'mileage': _log(row['mileage']),
+    }
+
+
+def categorical_features(row):
+    location = ' '.join((row['list_location'] or '').lower().split())
+    return {
+        'property_type': row['property_type'],
+        'vehicle_type': row['vehicle_type'],
+        'fuel_type': row['fuel_type'],
+        'transmission': row['transmission'],
+        'condition': row['condition'],
+        # "Bujumbura, Rohero" -> "bujumbura"
+        'city': location.split(',')[0].strip() or None,
+        'location': location or None,
+    }
+
+
+def build_vectors(rows):
+    """Weighted, normalized feature matrix (one row per listing) as float32"""
+    n = len(rows)
+    blocks = []
+
+    numeric = [numeric_features(row) for row in rows]
+    for name in numeric[0] if numeric else []:
+        column = np.array([np.nan if r[name] is None else r[name] for r in numeric], dtype=np.float64)
+        known = ~np.isnan(column)
+        if not known.any():
+            continue
+        mean = column[known].mean()
+        std = column[known].std()
+        # Missing values sit at the category average (0 after scaling)...
+        column = np.where(known, (column - mean) / std if std > 0 else 0.0, 0.0)
+        blocks.append((FEATURE_WEIGHTS[name] * column)[:, None])
+        if not known.all():
+            # ...but having the attribute or not (land has no bedrooms) still
+            # counts as a full-weight difference
+            blocks.append((FEATURE_WEIGHTS[name] * known.astype(np.float64))[:, None])
+
+    categorical = [categorical_features(row) for row in rows]
+    for name in categorical[0] if categorical else []:
+        values = sorted({r[name] for r in categorical if r[name] is not None})
+        if len(values) < 2:
+            # Same value (or unknown) everywhere: no information
+            continue
+        index = {value: i for i, value in enumerate(values)}
+        block = np.zeros((n, len(values)))
+        for i, r in enumerate(categorical):
+            if r[name] is not None:
+                block[i, index[r[name]]] = 1.0
+        # Two different values are FEATURE_WEIGHTS[name] apart
+        blocks.append(block * (FEATURE_WEIGHTS[name] / math.sqrt(2)))
+
+    if not blocks:
+        return np.zeros((n, 1), dtype=np.float32)
+    return np.hstack(blocks).astype(np.float32)
+
+
+def squared_distances(a, b):
+    """Pairwise squared Euclidean distances between the rows of a and b"""
+    d = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2.0 * (a @ b.T)
+    return np.maximum(d, 0.0)
+
+
+def nearest_neighbours(vectors, rows, k, ids):
+    """
+    Top-k neighbours for each position in `rows`.
+    Yields (position, neighbour positions, distances) with the closest first;
+    ties go to the newest listing (highest id).
+    """
+    n = len(vectors)
+    k = min(k, n - 1)
+    if k <= 0:
+        for position in rows:
+            yield position, np.array([], dtype=int), np.array([])
+        return
+
+    rows = np.asarray(rows)
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        distances = squared_distances(vectors[chunk], vectors)
+        distances[np.arange(len(chunk)), chunk] = np.inf  # not its own neighbour
+
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        for i, position in enumerate(chunk):
+            found = candidates[i]
+            found_distances = distances[i, found]
+            order = np.lexsort((-ids[found], found_distances))
+            yield position, found[order], np.sqrt(found_distances[order])
+
+
+def load_category(cat_id):
+    """Ids (int64 array) and feature vectors of the category's active listings"""
+    rows = list(
+        Listing.objects.filter(cat_id=cat_id, listing_status='active')
+        .order_by('listing_id')
+        .values(*FIELDS)
+    )
+    ids = np.array([row['listing_id'] for row in rows], dtype=np.int64)
+    return ids, build_vectors(rows)
+
+
+def store_neighbours(ids, neighbours):
+    """Replace the neighbour rows of every listing in `neighbours`"""
+    listing_ids = [int(ids[position]) for position, _, _ in neighbours]
+    rows = [
+        SimilarListing(
+            listing_id_id=int(ids[position]),
+            neighbour_id_id=int(ids[neighbour]),
+            rank=rank,
+            distance=float(distance),
+        )
+        for position, found, distances in neighbours
+        for rank, (neighbour, distance) in enumerate(zip(found, distances))
+    ]
+    with transaction.atomic():
+        SimilarListing.objects.filter(listing_id__in=listing_ids).delete()
+        SimilarListing.objects.bulk_create(rows, batch_size=1000)
+
+
+def rebuild_category(cat_id):
+    """Recompute neighbours for every active listing in a category"""
+    ids, vectors = load_category(cat_id)
+    k = settings.SIMILAR_LISTINGS_COUNT
+    neighbours = list(nearest_neighbours(vectors, range(len(ids)), k, ids))
+    with transaction.atomic():
+        # Listings that left the category or stopped being active
+        SimilarListing.objects.filter(listing_id__cat_id=cat_id).exclude(listing_id__in=ids.tolist()).delete()
+        store_neighbours(ids, neighbours)
+    return len(ids)
+
+
+def rebuild_all():
+    """Recompute every neighbour list. Returns {cat_id: listings}"""
+    categories = list(
+        Listing.objects.filter(listing_status='active').order_by().values_list('cat_id', flat=True).distinct()
+    )
+    SimilarListing.objects.exclude(listing_id__listing_status='active').delete()
+    return {cat_id: rebuild_category(cat_id) for cat_id in categories}
+
+
+def refresh_listings(listing_ids):
+    """
+    Bring neighbours up to date after `listing_ids` were created, changed,
+    deactivated or deleted. Returns the number of neighbour lists rewritten.
+    """
+    changed = set(listing_ids)
+    if not changed:
+        return 0
+
+    # Lists that contain a changed listing may have to drop or reorder it
+    referencing = set(
+        SimilarListing.objects.filter(neighbour_id__in=changed).values_list('listing_id', flat=True)
+    )
+    active = dict(
+        Listing.objects.filter(pk__in=changed | referencing, listing_status='active')
+        .values_list('listing_id', 'cat_id')
+    )
+    SimilarListing.objects.filter(listing_id__in=changed - set(active)).delete()
+
+    k = settings.SIMILAR_LISTINGS_COUNT
+    rewritten = 0
+    for cat_id in set(active.values()):
+        ids, vectors = load_category(cat_id)
+        position = {int(listing_id): i for i, listing_id in enumerate(ids)}
+        affected = {position[i] for i in changed | referencing if i in position}
+
+        changed_here = [position[i] for i in changed if i in position]
+        if changed_here:
+            # Lists a changed listing now belongs in: closer than their last
+            # neighbour, or not full yet
+            closest = np.sqrt(squared_distances(vectors[changed_here], vectors)).min(axis=0)
+            closest[changed_here] = np.inf
+            current = {
+                row['listing_id']: row
+                for row in SimilarListing.objects.filter(listing_id__in=ids.tolist())
+                .values('listing_id').annotate(worst=Max('distance'), total=Count('*'))
+            }
+            full = min(k, len(ids) - 1)
+            for i, listing_id in enumerate(ids.tolist()):
+                row = current.get(listing_id)
+                if row is None or row['total'] < full or closest[i] < row['worst']:
+                    affected.add(i)
+
+        neighbours = list(nearest_neighbours(vectors, sorted(affected), k, ids))
+        store_neighbours(ids, neighbours)
+        rewritten += len(neighbours)
+    return rewritten
+
+
+def get_similar_listings(listing_id, limit):
+    """Precomputed neighbours, most similar first"""
+    return (
+        Listing.objects.filter(neighbour_of__listing_id=listing_id, listing_status='active')
+        .order_by('neighbour_of__rank')[:limit]
+    )
@@ -0,0 +1,61 @@
+from celery import shared_task
+from PIL import Image, UnidentifiedImageError
+
+from .images import ImageProcessingTimeout, process_listing_images
+from .models import ListingImage
+from .similarity import rebuild_all, refresh_listings
+from .upload_sessions import cleanup_stale_sessions
+
+# Bad input or a pathological image: retrying won't help
+PERMANENT_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError, ImageProcessingTimeout)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10)
+def process_listing_images_task(self, listimage_ids):
+    """Resize and re-encode a listing's uploaded images concurrently (see listings/images.py)"""
+    # Rows deleted before the worker got to them, or already done, are skipped
+    listing_images = list(
+        ListingImage.objects.filter(pk__in=listimage_ids, source_path__isnull=False)
+        .exclude(processing_status='ready')
+        .order_by('display_order', 'listimage_id')
+    )
+
+    retry = []
+    for listing_image, error in process_listing_images(listing_images):
+        if isinstance(error, PERMANENT_ERRORS) or self.request.retries >= self.max_retries:
+            mark_failed(listing_image, error)
+        else:
+            retry.append((listing_image, error))
+
+    if retry:
+        raise self.retry(args=[[listing_image.pk for listing_image, _ in retry]], exc=retry[0][1])
+
+
+@shared_task
+def process_listing_image_task(listimage_id):
+    """Single-image entry point, kept for jobs queued before batching"""
+    process_listing_images_task.delay([listimage_id])
+
+
+def mark_failed(listing_image, error):
+    listing_image.processing_status = 'failed'
+    listing_image.processing_error = str(error)[:500]
+    listing_image.save(update_fields=['processing_status', 'processing_error'])
+
+
+@shared_task
+def cleanup_upload_sessions_task():
+    """Drop resumable uploads nobody finished (scheduled in CELERY_BEAT_SCHEDULE)"""
+    return cleanup_stale_sessions()
+
+
+@shared_task
+def refresh_similar_listings_task(listing_ids):
+    """Update neighbour lists after listings changed (queued by listings/signals.py)"""
+    return refresh_listings(listing_ids)
+
+
+@shared_task
+def rebuild_similar_listings_task():
+    """Recompute every neighbour list (scheduled in CELERY_BEAT_SCHEDULE)"""
+    return sum(rebuild_all().values())
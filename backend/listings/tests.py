@@ -1,3 +1,878 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image, PngImagePlugin
+from rest_framework.test import APIClient
+
+from users.models import User
+from .filters import ListingFilter
+from .locations import resolve_location
+from . import images
+from .images import process_listing_images, render_renditions, store_renditions
+from .models import (
+    Category, ImageUploadSession, Listing, ListingImage, Location, LocationName, PricingPlan, SimilarListing
+)
+from .similarity import rebuild_all
+from .upload_sessions import chunk_path, cleanup_stale_sessions
+from .view_counter import ViewCounter, view_counter
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def jpeg_bytes(width=640, height=480):
+    output = BytesIO()
+    Image.new('RGB', (width, height), (200, 120, 40)).save(output, format='JPEG')
+    return output.getvalue()
+
+
+def png_bytes(width=640, height=480, comment=None):
+    output = BytesIO()
+    info = PngImagePlugin.PngInfo()
+    if comment:
+        # Same pixels, different file
+        info.add_text('Comment', comment)
+    Image.new('RGBA', (width, height), (40, 120, 200, 255)).save(output, format='PNG', pnginfo=info)
+    return output.getvalue()
+
+
+@override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': MEDIA_ROOT, 'base_url': '/media/'},
+        },
+    },
+    CELERY_TASK_ALWAYS_EAGER=True,
+)
+class ResumableUploadTests(TestCase):
+    """Chunked image uploads through /api/listings/{id}/uploads/ and /api/uploads/{id}/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        cls.other = User.objects.create_user(
+            'other@example.com', '+25779000002', 'SecurePass123',
+            user_firstname='Other', user_lastname='User'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        cls.listing = Listing.objects.create(
+            userid=cls.seller, cat_id=category, listing_title='House',
+            list_description='3 bedrooms', listing_price=1000, list_location='Bujumbura',
+            listing_status='active'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+        self.content = jpeg_bytes()
+
+    def start_upload(self, size=None):
+        response = self.client.post(f'/api/listings/{self.listing.listing_id}/uploads/', {
+            'filename': 'house.jpg',
+            'content_type': 'image/jpeg',
+            'size': len(self.content) if size is None else size,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['upload_id']
+
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.put(
+            f'/api/uploads/{upload_id}/?offset={offset}', data, content_type='application/octet-stream'
+        )
+
+    def upload_all(self, upload_id, chunk_size=1000):
+        for offset in range(0, len(self.content), chunk_size):
+            response = self.put_chunk(upload_id, offset, self.content[offset:offset + chunk_size])
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_chunked_upload_creates_listing_image(self):
+        upload_id = self.start_upload()
+        self.upload_all(upload_id)
+
+        progress = self.client.get(f'/api/uploads/{upload_id}/')
+        self.assertEqual(progress.data['offset'], len(self.content))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['image']['is_primary'])
+
+        listing_image = ListingImage.objects.get(pk=response.data['image']['listimage_id'])
+        self.assertEqual(listing_image.listing_id_id, self.listing.listing_id)
+        self.assertEqual(listing_image.processing_status, 'ready')
+        self.assertEqual(listing_image.renditions['thumbnail']['width'], 320)
+
+        session = ImageUploadSession.objects.get(pk=upload_id)
+        self.assertEqual(session.session_status, 'completed')
+        for offset in session.chunk_offsets:
+            self.assertFalse(default_storage.exists(chunk_path(session, offset)))
+
+    def test_resume_from_reported_offset(self):
+        upload_id = self.start_upload()
+        self.put_chunk(upload_id, 0, self.content[:1000])
+
+        # The client lost track and resends the first chunk
+        response = self.put_chunk(upload_id, 0, self.content[:1000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 1000)
+
+        response = self.put_chunk(upload_id, 1000, self.content[1000:])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['offset'], len(self.content))
+
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 201)
+
+    def test_complete_is_idempotent(self):
+        upload_id = self.start_upload()
+        self.upload_all(upload_id)
+
+        first = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        second = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(first.data['image']['listimage_id'], second.data['image']['listimage_id'])
+        self.assertEqual(ListingImage.objects.filter(listing_id=self.listing).count(), 1)
+
+    def test_incomplete_upload_cannot_be_completed(self):
+        upload_id = self.start_upload()
+        self.put_chunk(upload_id, 0, self.content[:1000])
+
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ListingImage.objects.exists())
+
+    def test_chunk_past_declared_size_is_rejected(self):
+        upload_id = self.start_upload(size=100)
+        response = self.put_chunk(upload_id, 0, self.content[:200])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ImageUploadSession.objects.get(pk=upload_id).received_size, 0)
+
+    def test_invalid_image_is_rejected_on_complete(self):
+        self.content = b'not an image' * 100
+        upload_id = self.start_upload()
+        self.upload_all(upload_id)
+
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImageUploadSession.objects.filter(pk=upload_id).exists())
+
+    def test_sessions_are_private(self):
+        upload_id = self.start_upload()
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').status_code, 404)
+        self.assertEqual(self.put_chunk(upload_id, 0, self.content[:10]).status_code, 404)
+
+    def test_cleanup_removes_stale_sessions(self):
+        stale_id = self.start_upload()
+        self.put_chunk(stale_id, 0, self.content[:1000])
+        fresh_id = self.start_upload()
+
+        ImageUploadSession.objects.filter(pk=stale_id).update(
+            updatedat=timezone.now() - timedelta(hours=settings.IMAGE_UPLOAD_SESSION_TTL + 1)
+        )
+        stale = ImageUploadSession.objects.get(pk=stale_id)
+
+        self.assertEqual(cleanup_stale_sessions(), 1)
+        self.assertFalse(ImageUploadSession.objects.filter(pk=stale_id).exists())
+        self.assertTrue(ImageUploadSession.objects.filter(pk=fresh_id).exists())
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, chunk_path(stale, 0))))
+
+
+
+@override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': MEDIA_ROOT, 'base_url': '/media/'},
+        },
+    },
+)
+class DeferredImageProcessingTests(TestCase):
+    """Raw uploads stored in the request, renditions produced by the background job"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            'imageseller@example.com', '+25779000011', 'SecurePass123',
+            user_firstname='Image', user_lastname='Seller'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        cls.listing = Listing.objects.create(
+            userid=cls.seller, cat_id=category, listing_title='House',
+            list_description='3 bedrooms', listing_price=1000, list_location='Bujumbura',
+            listing_status='active'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def upload(self, content, name='photo.png', content_type='image/png'):
+        with mock.patch('listings.tasks.process_listing_images_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    f'/api/listings/{self.listing.listing_id}/upload-image/',
+                    {'image': SimpleUploadedFile(name, content, content_type=content_type)},
+                    format='multipart'
+                )
+        self.assertEqual(response.status_code, 201)
+        return ListingImage.objects.get(pk=response.data['image']['listimage_id']), delay
+
+    def test_raw_upload_is_named_after_the_detected_format(self):
+        listing_image, delay = self.upload(png_bytes(), name='photo.html')
+
+        delay.assert_called_once_with([listing_image.listimage_id])
+        self.assertEqual(listing_image.processing_status, 'pending')
+        self.assertTrue(listing_image.source_path.endswith('.png'))
+        self.assertTrue(listing_image.image_url.endswith('.png'))
+        self.assertTrue(default_storage.exists(listing_image.source_path))
+
+    def test_processing_replaces_the_raw_upload(self):
+        listing_image, _ = self.upload(png_bytes(width=2400, height=1200))
+        source_path = listing_image.source_path
+
+        self.assertEqual(process_listing_images([listing_image]), [])
+        listing_image.refresh_from_db()
+        self.assertEqual(listing_image.processing_status, 'ready')
+        self.assertIsNone(listing_image.source_path)
+        self.assertTrue(listing_image.image_url.endswith('.jpg'))
+        self.assertEqual(listing_image.renditions['full']['width'], 1920)
+        self.assertEqual(listing_image.renditions['thumbnail']['width'], 320)
+        self.assertFalse(default_storage.exists(source_path))
+
+    def test_processed_bytes_are_not_queued_again(self):
+        content = jpeg_bytes()
+        first, _ = self.upload(content, name='house.jpg', content_type='image/jpeg')
+        process_listing_images([first])
+        first.refresh_from_db()
+
+        second, delay = self.upload(content, name='house.jpg', content_type='image/jpeg')
+        delay.assert_not_called()
+        self.assertEqual(second.processing_status, 'ready')
+        self.assertEqual(second.stored_image_id, first.stored_image_id)
+        self.assertIsNone(second.source_path)
+
+    def test_identical_picture_processed_while_the_last_copy_is_released(self):
+        first, _ = self.upload(png_bytes(comment='first'))
+        process_listing_images([first])
+        first.refresh_from_db()
+        content_hash = first.stored_image.content_hash
+        paths = [
+            images.storage_path_from_url(rendition[image_format])
+            for rendition in first.renditions.values() for image_format in images.RENDITION_FORMATS
+        ]
+
+        # Another file with the same picture: rendered to the same hash, so
+        # store_renditions finds its files already there
+        second, _ = self.upload(png_bytes(comment='second'))
+        save_processed = images.save_processed
+
+        def release_then_save(*args):
+            # The only listing image using the files is deleted before the
+            # second one takes its reference
+            with self.captureOnCommitCallbacks(execute=True):
+                ListingImage.objects.filter(pk=first.pk).delete()
+            return save_processed(*args)
+
+        with mock.patch('listings.images.save_processed', side_effect=release_then_save):
+            self.assertEqual(process_listing_images([second]), [])
+
+        second.refresh_from_db()
+        self.assertEqual(second.processing_status, 'ready')
+        self.assertEqual(second.stored_image.content_hash, content_hash)
+        self.assertEqual(second.stored_image.ref_count, 1)
+        self.assertTrue(all(default_storage.exists(path) for path in paths))
+
+    def test_renditions_are_stored_one_at_a_time(self):
+        outputs = []
+
+        def rendered():
+            for rendition in render_renditions(BytesIO(jpeg_bytes(width=2400, height=1600))):
+                self.assertTrue(all(output.closed for output in outputs))
+                outputs.append(rendition[-1])
+                yield rendition
+
+        content_hash, image_url, renditions = store_renditions(rendered())
+        self.assertEqual(len(outputs), 6)
+        self.assertTrue(all(output.closed for output in outputs))
+        self.assertEqual(set(renditions), {'full', 'card', 'thumbnail'})
+        self.assertTrue(default_storage.exists(f'images/{content_hash[:2]}/{content_hash}_thumbnail.webp'))
+
+    # Long enough for a pool thread to pick the job up, so it can't be cancelled
+    @override_settings(LISTING_IMAGE_TIMEOUT=1)
+    def test_late_result_of_a_timed_out_image_is_deleted(self):
+        listing_image, _ = self.upload(png_bytes(width=1000, height=900))
+        release = threading.Event()
+        discarded = threading.Event()
+        late_results = []
+        render_and_store = images.render_and_store
+        discard_late_result = images.discard_late_result
+
+        def slow_render(source_path):
+            release.wait(10)
+            return render_and_store(source_path)
+
+        def discard(future):
+            late_results.append(future.result())
+            discard_late_result(future)
+            discarded.set()
+
+        with mock.patch('listings.images.render_and_store', slow_render), \
+                mock.patch('listings.images.discard_late_result', discard):
+            failures = process_listing_images([listing_image])
+            self.assertEqual([type(error).__name__ for _, error in failures], ['ImageProcessingTimeout'])
+            release.set()
+            self.assertTrue(discarded.wait(10))
+
+        content_hash, _, renditions = late_results[0]
+        self.assertEqual(set(renditions), {'full', 'card', 'thumbnail'})
+        for suffix in ('.jpg', '.webp', '_card.jpg', '_card.webp', '_thumbnail.jpg', '_thumbnail.webp'):
+            self.assertFalse(default_storage.exists(f'images/{content_hash[:2]}/{content_hash}{suffix}'))
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, SIMILAR_LISTINGS_COUNT=3)
+class SimilarListingsTests(TestCase):
+    """Precomputed neighbours behind /api/listings/{id}/similar/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        cls.category = Category.objects.create(cat_name='Real Estate', slug='real-estate')
+
+    def create(self, title, price, **fields):
+        fields.setdefault('list_location', 'Bujumbura, Rohero')
+        with self.captureOnCommitCallbacks(execute=True):
+            return Listing.objects.create(
+                userid=self.seller, cat_id=self.category, listing_title=title,
+                list_description='-', listing_price=price, listing_status='active', **fields
+            )
+
+    def similar_titles(self, listing):
+        response = self.client.get(f'/api/listings/{listing.listing_id}/similar/')
+        self.assertEqual(response.status_code, 200)
+        return [item['listing_title'] for item in response.data]
+
+    def test_attributes_drive_similarity(self):
+        house = self.create('House', 200000, property_type='house', bedrooms=3, area_size=250)
+        self.create('Land', 200000, property_type='land', area_size=250, list_location='Gitega')
+        self.create('Bigger house', 260000, property_type='house', bedrooms=4, area_size=300)
+        self.create('Apartment', 150000, property_type='apartment', bedrooms=2, area_size=90)
+        self.create('Villa', 900000, property_type='house', bedrooms=6, area_size=800)
+        self.create('Studio', 40000, property_type='apartment', bedrooms=1, area_size=35)
+
+        # Incremental refreshes don't re-rank older lists when the category's
+        # averages shift; the nightly rebuild does
+        rebuild_all()
+
+        # Price alone would have put the land first
+        self.assertEqual(self.similar_titles(house)[0], 'Bigger house')
+        self.assertEqual(SimilarListing.objects.filter(listing_id=house).count(), 3)
+
+    def test_refreshed_when_listings_change(self):
+        house = self.create('House', 200000, property_type='house', bedrooms=3)
+        other = self.create('Other house', 210000, property_type='house', bedrooms=3)
+        self.create('Land', 900000, property_type='land')
+        self.assertEqual(self.similar_titles(house)[0], 'Other house')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.listing_status = 'sold'
+            other.save()
+        self.assertNotIn('Other house', self.similar_titles(house))
+        self.assertFalse(SimilarListing.objects.filter(listing_id=other).exists())
+
+        twin = self.create('Twin house', 200000, property_type='house', bedrooms=3)
+        self.assertEqual(self.similar_titles(house)[0], 'Twin house')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.delete()
+        self.assertEqual(self.similar_titles(house), ['Land'])
+
+
+class ListingFacetsTests(TestCase):
+    """/api/listings/facets/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        cls.homes = Category.objects.create(cat_name='Real Estate', slug='real-estate')
+        cls.cars = Category.objects.create(cat_name='Vehicles', slug='vehicles')
+
+        def create(category, price, location, **fields):
+            return Listing.objects.create(
+                userid=seller, cat_id=category, listing_title='Listing', list_description='-',
+                listing_price=price, list_location=location, listing_status='active', **fields
+            )
+
+        create(cls.homes, 250000, 'Bujumbura', property_type='house')
+        create(cls.homes, 80000, 'Bujumbura', property_type='land')
+        create(cls.homes, 300000, 'Gitega', property_type='house')
+        create(cls.cars, 15000000, 'Bujumbura', vehicle_type='suv', fuel_type='diesel', transmission='manual')
+        cls.sold = create(cls.cars, 9000000, 'Ngozi', vehicle_type='car')
+        cls.sold.listing_status = 'sold'
+        cls.sold.save()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_for_current_filters(self):
+        with self.assertNumQueries(2):  # the grouped pass, then category names
+            response = self.client.get('/api/listings/facets/')
+        self.assertEqual(response.status_code, 200)
+        facets = response.data['facets']
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(
+            [(f['label'], f['count']) for f in facets['category']],
+            [('Real Estate', 3), ('Vehicles', 1)]
+        )
+        self.assertEqual([(f['value'], f['count']) for f in facets['location']], [('Bujumbura', 3), ('Gitega', 1)])
+        self.assertEqual([(f['value'], f['count']) for f in facets['property_type']], [('house', 2), ('land', 1)])
+        self.assertEqual([(f['value'], f['count']) for f in facets['fuel_type']], [('diesel', 1)])
+        self.assertEqual(
+            [(f['min_price'], f['max_price'], f['count']) for f in facets['price']],
+            [(0, 100000, 1), (100000, 500000, 2), (5000000, 20000000, 1)]
+        )
+
+        response = self.client.get('/api/listings/facets/', {'cat_id': self.homes.cat_id, 'max_price': 260000})
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['facets']['vehicle_type'], [])
+
+    def test_cached_per_filter_set_until_listings_change(self):
+        self.client.get('/api/listings/facets/', {'cat_id': self.homes.cat_id, 'page': 2})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/listings/facets/', {'cat_id': self.homes.cat_id, 'ordering': 'views'})
+        self.assertEqual(response.data['total'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sold.listing_status = 'active'
+            self.sold.cat_id = self.homes
+            self.sold.save()
+        response = self.client.get('/api/listings/facets/', {'cat_id': self.homes.cat_id})
+        self.assertEqual(response.data['total'], 4)
+
+
+class ListingFilterTests(TestCase):
+    """Attribute filters on /api/listings/ (ListingFilter)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        cls.homes = Category.objects.create(cat_name='Houses & Apartments', slug='houses-apartments')
+        cls.cars = Category.objects.create(cat_name='Cars', slug='cars')
+
+        def create(title, category, price, **fields):
+            Listing.objects.create(
+                userid=seller, cat_id=category, listing_title=title, list_description='-',
+                listing_price=price, list_location='Bujumbura', listing_status='active', **fields
+            )
+
+        create('Family house', cls.homes, 120000000, property_type='house', bedrooms=4, bathrooms=2, area_size=400)
+        create('Small house', cls.homes, 60000000, property_type='house', bedrooms=2, bathrooms=1, area_size=120)
+        create('Flat', cls.homes, 90000000, property_type='apartment', bedrooms=3, bathrooms=2, area_size=110)
+        create('Old diesel', cls.cars, 9000000, vehicle_type='car', year_built=2008, mileage=210000,
+               fuel_type='diesel', transmission='manual', condition='used')
+        create('New hybrid', cls.cars, 45000000, vehicle_type='car', year_built=2021, mileage=15000,
+               fuel_type='hybrid', transmission='automatic', condition='new')
+
+    def titles(self, **params):
+        response = self.client.get('/api/listings/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['listing_title'] for item in response.data['results'])
+
+    def test_range_and_choice_filters(self):
+        self.assertEqual(self.titles(min_bedrooms=3), ['Family house', 'Flat'])
+        self.assertEqual(self.titles(property_type='house', max_price=100000000), ['Small house'])
+        self.assertEqual(self.titles(min_area=100, max_area=150, min_bathrooms=2), ['Flat'])
+        self.assertEqual(self.titles(min_year=2015, max_mileage=50000), ['New hybrid'])
+        self.assertEqual(self.titles(fuel_type=['diesel', 'hybrid']), ['New hybrid', 'Old diesel'])
+        self.assertEqual(self.titles(transmission='manual', condition='used'), ['Old diesel'])
+
+    def test_invalid_values_are_rejected(self):
+        self.assertEqual(self.client.get('/api/listings/', {'fuel_type': 'steam'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/listings/', {'min_bedrooms': 'many'}).status_code, 400)
+
+    def test_partial_indexes_serve_the_common_shapes(self):
+        from listings.management.commands.benchmark_listing_filters import explain
+
+        shapes = [
+            ({'cat_id': self.homes.cat_id, 'property_type': 'house', 'min_bedrooms': 3}, 'listings_active_property_idx'),
+            ({'cat_id': self.cars.cat_id, 'vehicle_type': 'car', 'min_year': 2015}, 'listings_active_vehicle_idx'),
+        ]
+        with connection.cursor() as cursor:
+            # The table is tiny; make the planner show what it would use at scale
+            cursor.execute('ANALYZE "LISTINGS"')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for params, index in shapes:
+                queryset = ListingFilter(params, queryset=Listing.objects.filter(listing_status='active')).qs
+                indexes, _ = explain(*queryset.order_by().values('pk').query.sql_with_params())
+                self.assertIn(index, indexes)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class LocationGazetteerTests(TestCase):
+    """Listing locations resolved against the gazetteer, ?location= and /api/locations/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('setup_locations', stdout=StringIO())
+        cls.seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One', is_verified=True
+        )
+        # New users get the Free Tier subscription (users/signals.py)
+        PricingPlan.objects.filter(pricing_name='Free Tier').update(max_listings=20)
+        cls.category = Category.objects.create(cat_name='Houses', slug='houses')
+
+        cls.bujumbura = Location.objects.get(location_name='Bujumbura Mairie')
+        cls.mukaza = Location.objects.get(location_name='Mukaza')
+        cls.rohero = Location.objects.get(location_name='Rohero')
+        cls.gitega = Location.objects.get(location_name='Gitega', location_level='province')
+
+    def setUp(self):
+        # The name index is cached per process under the LOCATIONS token
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+        # listing_create is activity-logged from a background thread, which
+        # can't see this test's transaction
+        patcher = mock.patch('umuhuza_api.middleware.activity_log')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create(self, location):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/listings/create/', {
+                'cat_id': self.category.cat_id, 'listing_title': 'House', 'list_description': '-',
+                'listing_price': 1000, 'list_location': location,
+            })
+        self.assertEqual(response.status_code, 201, response.data)
+        return Listing.objects.get(pk=response.data['listing']['listing_id'])
+
+    def test_spelling_variants_resolve_to_the_same_place(self):
+        for text in ['Bujumbura, Rohero', 'rohéro - BUJA', 'Rohero II']:
+            listing = self.create(text)
+            self.assertEqual(
+                (listing.province_id_id, listing.commune_id_id, listing.quarter_id_id),
+                (self.bujumbura.pk, self.mukaza.pk, self.rohero.pk)
+            )
+
+        # Province and commune share the name: the commune is more specific
+        self.assertEqual(self.create('Gitega').province_id, self.gitega)
+        # Cibitoke is a province and a Bujumbura quarter
+        self.assertIsNone(self.create('Cibitoke').province_id)
+        self.assertEqual(self.create('Bujumbura, Cibitoke').province_id, self.bujumbura)
+
+        listing = self.create('Nowhere')
+        self.assertIsNone(listing.province_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/listings/{listing.pk}/update/', {'list_location': 'Kinindo'})
+        self.assertEqual(response.status_code, 200)
+        listing.refresh_from_db()
+        self.assertEqual(listing.province_id, self.bujumbura)
+        self.assertEqual(listing.quarter_id.location_name, 'Kinindo')
+
+    def test_filter_by_any_level(self):
+        rohero = self.create('Rohero')
+        kinindo = self.create('Kinindo')
+        gitega = self.create('Gitega')
+
+        def ids(location_id):
+            response = self.client.get('/api/listings/', {'location': location_id})
+            return {item['listing_id'] for item in response.data['results']}
+
+        self.assertEqual(ids(self.bujumbura.pk), {rohero.pk, kinindo.pk})
+        self.assertEqual(ids(self.mukaza.pk), {rohero.pk})
+        self.assertEqual(ids(self.rohero.pk), {rohero.pk})
+        self.assertEqual(ids(self.gitega.pk), {gitega.pk})
+        self.assertEqual(ids(999999), set())
+
+    def test_backfill(self):
+        listing = Listing.objects.create(
+            userid=self.seller, cat_id=self.category, listing_title='Old', list_description='-',
+            listing_price=1000, list_location='Ngagara, Bujumbura', listing_status='active'
+        )
+        out = StringIO()
+        call_command('backfill_listing_locations', stdout=out)
+        listing.refresh_from_db()
+        self.assertEqual(listing.province_id, self.bujumbura)
+        self.assertEqual(listing.quarter_id.location_name, 'Ngagara')
+        self.assertIn('Resolved 1 of 1', out.getvalue())
+
+    def test_index_follows_changes_made_elsewhere(self):
+        self.assertIsNone(resolve_location('Kwa Rugira'))
+
+        # bulk_create sends no signals, like a write from another worker whose
+        # cache this process doesn't share: picked up once the index expires
+        LocationName.objects.bulk_create([LocationName(location_id=self.rohero, normalized_name='kwa rugira')])
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_location('Kwa Rugira'))
+        with override_settings(LOCATION_INDEX_TTL=0):
+            self.assertEqual(resolve_location('Kwa Rugira'), self.rohero.pk)
+
+    def test_autocomplete(self):
+        response = self.client.get('/api/locations/', {'q': 'RoHé'})
+        self.assertEqual(response.data, [{
+            'location_id': self.rohero.pk, 'location_name': 'Rohero', 'location_level': 'quarter',
+            'label': 'Rohero, Mukaza, Bujumbura Mairie',
+        }])
+        # Aliases match, provinces come first
+        names = [item['location_name'] for item in self.client.get('/api/locations/', {'q': 'bu'}).data]
+        self.assertEqual(names[:2], ['Bubanza', 'Bujumbura Mairie'])
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/locations/', {'q': 'rohe'})  # same normalized query as 'RoHé'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rohero.location_name = 'Rohero I'
+            self.rohero.save()
+        self.assertEqual(self.client.get('/api/locations/', {'q': 'rohe'}).data[0]['location_name'], 'Rohero I')
+
+
+@override_settings(LISTING_VIEW_BUFFER_BACKEND='local', LISTING_VIEW_FLUSH_INTERVAL=3600, LISTING_VIEW_FLUSH_SIZE=500)
+class ListingViewCounterTests(TestCase):
+    """Buffered view counts (listings/view_counter.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        cls.house, cls.flat, cls.land = [
+            Listing.objects.create(
+                userid=seller, cat_id=category, listing_title=title, list_description='-',
+                listing_price=100000, list_location='Bujumbura', listing_status='active'
+            )
+            for title in ('House', 'Flat', 'Land')
+        ]
+
+    def setUp(self):
+        # Not the process-wide counter, so nothing leaks between tests
+        self.counter = ViewCounter()
+
+    def views(self, listing):
+        listing.refresh_from_db()
+        return listing.views
+
+    def test_flushed_views_are_written_once(self):
+        for _ in range(3):
+            self.counter.record(self.house.pk)
+        self.assertEqual(self.views(self.house), 0)
+
+        self.assertEqual(self.counter.flush(), 3)
+        self.assertEqual(self.views(self.house), 3)
+        self.assertEqual(self.counter.flush(), 0)
+        self.assertEqual(self.views(self.house), 3)
+
+    def test_one_update_for_several_listings(self):
+        self.counter.record(self.house.pk)
+        self.counter.record(self.flat.pk)
+        self.counter.record(self.house.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.counter.flush(), 3)
+        self.assertEqual([self.views(self.house), self.views(self.flat), self.views(self.land)], [2, 1, 0])
+
+    def test_failed_flush_keeps_the_views(self):
+        self.counter.record(self.house.pk)
+        self.counter.record(self.house.pk)
+
+        with mock.patch('listings.view_counter.write_view_counts', side_effect=DatabaseError('connection lost')):
+            with self.assertRaises(DatabaseError):
+                self.counter.flush()
+        self.assertEqual(self.views(self.house), 0)
+
+        self.counter.record(self.house.pk)
+        self.assertEqual(self.counter.flush(), 3)
+        self.assertEqual(self.views(self.house), 3)
+
+
+class ListingResponseCacheTests(TestCase):
+    """Anonymous listing reads served from the response cache (listings/cache.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        cls.house, cls.flat = [
+            Listing.objects.create(
+                userid=cls.seller, cat_id=category, listing_title=title, list_description='-',
+                listing_price=100000, list_location='Bujumbura', listing_status='active'
+            )
+            for title in ('House', 'Flat')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        patcher = mock.patch.object(view_counter, 'record')
+        self.record_view = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def rename_quietly(self, listing, title):
+        # update() sends no signals, so cached responses still show the old title
+        Listing.objects.filter(pk=listing.pk).update(listing_title=title)
+
+    def titles(self, **params):
+        response = self.client.get('/api/listings/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['listing_title'] for item in response.data['results'])
+
+    def detail_title(self, listing):
+        response = self.client.get(f'/api/listings/{listing.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['listing_title']
+
+    def test_anonymous_reads_come_from_the_cache(self):
+        self.assertEqual(self.titles(), ['Flat', 'House'])
+        self.assertEqual(self.detail_title(self.house), 'House')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(), ['Flat', 'House'])
+            self.assertEqual(self.detail_title(self.house), 'House')
+
+    def test_saves_and_deletes_refresh_the_next_read(self):
+        self.titles()
+        self.detail_title(self.house)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.house.listing_title = 'Big house'
+            self.house.save()
+        self.assertEqual(self.titles(), ['Big house', 'Flat'])
+        self.assertEqual(self.detail_title(self.house), 'Big house')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flat.delete()
+        self.assertEqual(self.titles(), ['Big house'])
+
+    @override_settings(LISTING_CACHE_MAX_PAGE=1)
+    def test_deep_pages_are_not_cached(self):
+        self.assertEqual(self.titles(page_size=1), ['Flat'])  # newest first
+        self.assertEqual(self.titles(page_size=1, page=2), ['House'])
+
+        self.rename_quietly(self.flat, 'Big flat')
+        self.rename_quietly(self.house, 'Big house')
+        self.assertEqual(self.titles(page_size=1), ['Flat'])
+        self.assertEqual(self.titles(page_size=1, page=2), ['Big house'])
+
+    def test_authenticated_reads_bypass_the_cache(self):
+        self.titles()
+        self.detail_title(self.house)
+        self.rename_quietly(self.house, 'Big house')
+
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.titles(), ['Big house', 'Flat'])
+        self.assertEqual(self.detail_title(self.house), 'Big house')
+
+    def test_cache_hits_still_count_views(self):
+        self.detail_title(self.house)
+        with self.assertNumQueries(0):
+            self.detail_title(self.house)
+
+        self.assertEqual(self.record_view.call_args_list, [mock.call(self.house.pk)] * 2)
+
+
+class ListingCursorPaginationTests(TestCase):
+    """GET /api/listings/?pagination=cursor (ListingCursorPagination)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(
+            'seller@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        now = timezone.now()
+        # Only three distinct values per sort key, so most pages split a tie
+        for index, price in enumerate([100000, 100000, 100000, 250000, 250000, 90000, 90000]):
+            listing = Listing.objects.create(
+                userid=seller, cat_id=category, listing_title=f'Listing {index}', list_description='-',
+                listing_price=price, list_location='Bujumbura', listing_status='active'
+            )
+            Listing.objects.filter(pk=listing.pk).update(createdat=now - timedelta(days=index % 3))
+
+    def setUp(self):
+        # The first cursor page is cached like any other anonymous list
+        cache.clear()
+
+    def walk(self, ordering):
+        ids = []
+        url = '/api/listings/'
+        params = {'pagination': 'cursor', 'ordering': ordering, 'page_size': 2}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['listing_id'] for item in response.data['results']]
+            url, params = response.data['next'], None
+        return ids
+
+    def test_every_ordering_walks_each_listing_once(self):
+        listings = list(Listing.objects.all())
+        for field in ('createdat', 'listing_price'):
+            for descending in (False, True):
+                ordering = f'-{field}' if descending else field
+                with self.subTest(ordering=ordering):
+                    expected = sorted(listings, key=lambda listing: (getattr(listing, field), listing.pk),
+                                      reverse=descending)
+                    self.assertEqual(self.walk(ordering), [listing.pk for listing in expected])
+
+    def test_unsupported_ordering_is_rejected(self):
+        response = self.client.get('/api/listings/', {'pagination': 'cursor', 'ordering': 'views'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor_is_not_found(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        cursors = {
+            'listing_price': ['garbage!', encode(['100000', 1]), encode({'v': 'NaN', 'id': 1}),
+                              encode({'v': 'Infinity', 'id': 1}), encode({'v': '100000', 'id': 'x'})],
+            'createdat': [encode({'v': 'yesterday', 'id': 1}), encode({'v': '2026-01-01T00:00:00', 'id': 1})],
+        }
+        for ordering, values in cursors.items():
+            for cursor in values:
+                with self.subTest(ordering=ordering, cursor=cursor):
+                    response = self.client.get('/api/listings/', {'ordering': ordering, 'cursor': cursor})
+                    self.assertEqual(response.status_code, 404)
@@ -0,0 +1,180 @@
+"""
+Resumable listing image uploads.
+
+A multipart POST that dies halfway on a mobile network has to start again
+from byte zero. An upload session receives the file in chunks instead, and
+the client asks for the current offset to resume after a failure:
+
+    POST   /api/listings/{id}/uploads/          {"filename", "content_type", "size"}
+    PUT    /api/uploads/{upload_id}/?offset=N   raw chunk bytes
+    GET    /api/uploads/{upload_id}/            progress
+    POST   /api/uploads/{upload_id}/complete/   -> ListingImage
+    DELETE /api/uploads/{upload_id}/            abort
+
+Storage backends can't append to a file, so every chunk is stored as its own
+file under upload_sessions/{upload_id}/. complete() stitches them into one
+temporary upload and hands it to create_listing_image(), the same path as
+upload_listing_image. Sessions idle for IMAGE_UPLOAD_SESSION_TTL hours are
+removed by cleanup_stale_sessions().
+"""
+
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from django.utils import timezone
+
+from umuhuza_api.uploads import spooled_file
+
+from .images import (
+    ALLOWED_IMAGE_TYPES, MAX_IMAGE_SIZE, create_listing_image, delete_stored_file, validate_image_upload
+)
+from .models import ImageUploadSession, ListingImage
+
+READ_SIZE = 64 * 1024
+
+
+class UploadSessionError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadSessionError):
+    """The chunk doesn't start where the session left off"""
+
+    def __init__(self, expected):
+        super().__init__(f'Expected a chunk at offset {expected}')
+        self.expected = expected
+
+
+def create_session(listing, user, filename, content_type, size):
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        raise UploadSessionError('Invalid file type. Only JPEG, PNG, and WebP are allowed')
+    if size <= 0:
+        raise UploadSessionError('size must be a positive number of bytes')
+    if size > MAX_IMAGE_SIZE:
+        raise UploadSessionError('File too large. Maximum size is 5MB')
+
+    return ImageUploadSession.objects.create(
+        listing_id=listing,
+        userid=user,
+        filename=filename[:255],
+        content_type=content_type,
+        total_size=size
+    )
+
+
+def chunk_path(session, offset):
+    return f"upload_sessions/{session.upload_id}/{offset:010d}.part"
+
+
+def receive_chunk(session, offset, stream):
+    """
+    Store the chunk read from `stream` at `offset`. Returns the updated session.
+    A chunk for an offset that was already received is rejected with
+    OffsetMismatch, which tells the client where to resume.
+    """
+    if session.session_status != 'uploading':
+        raise UploadSessionError('Upload is already complete')
+    if offset != session.received_size:
+        raise OffsetMismatch(session.received_size)
+
+    if stream is None:
+        raise UploadSessionError('Empty chunk')
+
+    # Read the body before taking the row lock: it arrives at mobile speed
+    remaining = session.total_size - offset
+    chunk = spooled_file()
+    length = 0
+    while True:
+        data = stream.read(READ_SIZE)
+        if not data:
+            break
+        length += len(data)
+        if length > remaining:
+            chunk.close()
+            raise UploadSessionError(f'Chunk is larger than the {remaining} bytes left in this upload')
+        chunk.write(data)
+
+    if not length:
+        chunk.close()
+        raise UploadSessionError('Empty chunk')
+
+    with chunk, transaction.atomic():
+        session = ImageUploadSession.objects.select_for_update().get(pk=session.pk)
+        # A retried request may have raced us to this offset
+        if session.session_status != 'uploading' or offset != session.received_size:
+            raise OffsetMismatch(session.received_size)
+
+        default_storage.save(chunk_path(session, offset), chunk)
+        session.chunk_offsets.append(offset)
+        session.received_size = offset + length
+        session.save(update_fields=['chunk_offsets', 'received_size', 'updatedat'])
+
+    return session
+
+
+def complete_session(session):
+    """
+    Assemble the chunks and create the ListingImage.
+    Completing an already completed session returns the same image, so a
+    client that lost the response can safely retry.
+    """
+    with transaction.atomic():
+        session = ImageUploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.session_status == 'completed':
+            return session.listimage_id
+
+        if session.received_size != session.total_size:
+            raise UploadSessionError(
+                f'Upload is incomplete: {session.received_size} of {session.total_size} bytes received'
+            )
+
+        upload = TemporaryUploadedFile(session.filename, session.content_type, session.total_size, None)
+        try:
+            for offset in session.chunk_offsets:
+                with default_storage.open(chunk_path(session, offset), 'rb') as part:
+                    shutil.copyfileobj(part, upload, READ_SIZE)
+            upload.seek(0)
+
+            validate_image_upload(upload)
+
+            max_order = ListingImage.objects.filter(listing_id=session.listing_id_id).count()
+            listing_image = create_listing_image(
+                session.listing_id,
+                upload,
+                is_primary=(max_order == 0),  # First image is primary
+                display_order=max_order
+            )
+        finally:
+            upload.close()
+
+        session.session_status = 'completed'
+        session.listimage_id = listing_image
+        session.save(update_fields=['session_status', 'listimage_id', 'updatedat'])
+        transaction.on_commit(lambda: delete_session_files(session))
+
+    return listing_image
+
+
+def delete_session_files(session):
+    for offset in session.chunk_offsets:
+        delete_stored_file(chunk_path(session, offset))
+
+
+def abort_session(session):
+    delete_session_files(session)
+    session.delete()
+
+
+def cleanup_stale_sessions():
+    """Delete sessions (and their chunks) idle for IMAGE_UPLOAD_SESSION_TTL hours"""
+    cutoff = timezone.now() - timedelta(hours=settings.IMAGE_UPLOAD_SESSION_TTL)
+    deleted = 0
+    for session in ImageUploadSession.objects.filter(updatedat__lt=cutoff).iterator():
+        abort_session(session)
+        deleted += 1
+    return deleted
+
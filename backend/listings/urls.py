@@ -5,9 +5,13 @@ urlpatterns = [
     # Categories
     path('categories/', views.category_list, name='category-list'),
     path('categories/<int:pk>/', views.category_detail, name='category-detail'),
+
+    # Locations
+    path('locations/', views.location_autocomplete, name='location-autocomplete'),
     
     # Listings
     path('listings/', views.ListingListView.as_view(), name='listing-list'),
+    path('listings/facets/', views.ListingFacetsView.as_view(), name='listing-facets'),
     path('listings/create/', views.listing_create, name='listing-create'),
     path('listings/my-listings/', views.my_listings, name='my-listings'),
     path('listings/featured/', views.featured_listings, name='featured-listings'),
@@ -41,4 +45,9 @@ urlpatterns = [
     path('listings/<int:listing_id>/images/<int:image_id>/', views.delete_listing_image, name='delete-image'),
     path('listings/<int:listing_id>/images/<int:image_id>/set-primary/', views.set_primary_image, name='set-primary-image'),
 
+    # Resumable image uploads
+    path('listings/<int:listing_id>/uploads/', views.upload_session_create, name='upload-session-create'),
+    path('uploads/<uuid:upload_id>/', views.upload_session_detail, name='upload-session-detail'),
+    path('uploads/<uuid:upload_id>/complete/', views.upload_session_complete, name='upload-session-complete'),
+
 ]
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Buffered listing view counter.
+
+listing_detail used to write a row to LISTINGS on every page view. Views are
+now added to a buffer and written in batches with a single
+`UPDATE ... SET views = views + CASE ...` statement, so concurrent views are
+never lost and a popular listing costs one write per flush instead of one per
+view.
+
+Two buffers are available (settings.LISTING_VIEW_BUFFER_BACKEND):
+- 'local': per-process dict. Flushed from the request path once
+  LISTING_VIEW_FLUSH_INTERVAL seconds have passed or LISTING_VIEW_FLUSH_SIZE
+  listings are pending, and at process exit.
+- 'redis': a Redis hash shared by every worker. Drained by
+  `python manage.py flush_listing_views --loop`.
+"""
+
+import atexit
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+
+
+def write_view_counts(counts):
+    """Apply {listing_id: views} to LISTINGS, one UPDATE per batch"""
+    from .models import Listing
+
+    items = list(counts.items())
+    batch_size = settings.LISTING_VIEW_FLUSH_SIZE
+    for start in range(0, len(items), batch_size):
+        batch = dict(items[start:start + batch_size])
+        increments = Case(
+            *[When(pk=pk, then=Value(count)) for pk, count in batch.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+        Listing.objects.filter(pk__in=batch.keys()).update(views=F('views') + increments)
+
+
+class LocalViewBuffer:
+    """In-process buffer, flushed by whichever request finds it due"""
+    flush_on_request = True
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.last_flush = time.monotonic()
+
+    def add(self, listing_id, count=1):
+        with self.lock:
+            self.counts[listing_id] += count
+            return len(self.counts)
+
+    def is_due(self, pending):
+        interval = settings.LISTING_VIEW_FLUSH_INTERVAL
+        return (
+            pending >= settings.LISTING_VIEW_FLUSH_SIZE
+            or time.monotonic() - self.last_flush >= interval
+        )
+
+    def drain(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.last_flush = time.monotonic()
+        return counts
+
+    def restore(self, counts):
+        with self.lock:
+            self.counts.update(counts)
+
+
+class RedisViewBuffer:
+    """Buffer shared by all workers, kept in a single Redis hash"""
+    flush_on_request = False
+    key = 'umuhuza:listing_views'
+
+    def __init__(self):
+        import redis
+
+        self.client = redis.Redis.from_url(settings.LISTING_VIEW_BUFFER_REDIS_URL)
+
+    def add(self, listing_id, count=1):
+        self.client.hincrby(self.key, listing_id, count)
+
+    def drain(self):
+        # HGETALL + DEL in one MULTI/EXEC so no increment slips in between
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(self.key)
+        pipe.delete(self.key)
+        raw, _ = pipe.execute()
+        return Counter({int(pk): int(count) for pk, count in raw.items()})
+
+    def restore(self, counts):
+        pipe = self.client.pipeline(transaction=False)
+        for pk, count in counts.items():
+            pipe.hincrby(self.key, pk, count)
+        pipe.execute()
+
+
+BUFFER_BACKENDS = {
+    'local': LocalViewBuffer,
+    'redis': RedisViewBuffer,
+}
+
+
+class ViewCounter:
+    def __init__(self):
+        self._buffer = None
+        self._lock = threading.Lock()
+
+    @property
+    def buffer(self):
+        # Built lazily so settings are read after Django is configured
+        if self._buffer is None:
+            with self._lock:
+                if self._buffer is None:
+                    backend = settings.LISTING_VIEW_BUFFER_BACKEND
+                    self._buffer = BUFFER_BACKENDS[backend]()
+        return self._buffer
+
+    def record(self, listing_id):
+        """Count one view of a listing"""
+        buffer = self.buffer
+        pending = buffer.add(listing_id)
+        if buffer.flush_on_request and buffer.is_due(pending):
+            self.flush()
+
+    def flush(self):
+        """Write buffered views to the database. Returns the number of views written"""
+        counts = self.buffer.drain()
+        if not counts:
+            return 0
+        try:
+            write_view_counts(counts)
+        except Exception:
+            # Keep the views for the next flush rather than dropping them
+            self.buffer.restore(counts)
+            raise
+        return sum(counts.values())
+
+
+view_counter = ViewCounter()
+
+
+@atexit.register
+def _flush_on_exit():
+    if isinstance(view_counter._buffer, LocalViewBuffer):
+        try:
+            view_counter.flush()
+        except Exception as e:
+            print(f"Error flushing listing views: {e}")
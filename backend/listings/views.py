@@ -1,10 +1,5 @@
 from django.shortcuts import render
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 import os
-import uuid
-from PIL import Image
-from io import BytesIO
 from rest_framework import status, generics, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
@@ -14,18 +9,33 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Q, Avg
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Category, Listing, ListingImage, PricingPlan, RatingReview, Favorite, ReportMisconduct, UserSubscription
+from .cache import CATEGORIES, LISTINGS, PRICING_PLANS, cache_anonymous_response, get_cached_response, store_response
+from .facets import get_facets
+from .filters import ListingFilter, ListingSearchFilter
+from .images import (
+    InvalidImage, create_listing_image, delete_image_files, queue_image_processing, validate_image_upload
+)
+from .locations import assign_location, autocomplete
+from . import upload_sessions
+from .pagination import ListingCursorPagination
+from .models import Category, Listing, ListingImage, ImageUploadSession, PricingPlan, RatingReview, Favorite, ReportMisconduct, UserSubscription
+from .similarity import get_similar_listings
+from .view_counter import view_counter
 from .serializers import (
     CategorySerializer, ListingSerializer, ListingCreateSerializer,
     ListingDetailSerializer, PricingPlanSerializer, RatingReviewSerializer,
     RatingReviewCreateSerializer, FavoriteSerializer, ReportMisconductSerializer, ReportCreateSerializer,
     UserSubscriptionSerializer
 )
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 
 from notifications.utils import create_notification
 
+# Listings returned by similar_listings
+SIMILAR_LISTINGS_SHOWN = 6
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
@@ -38,6 +48,7 @@ class StandardResultsSetPagination(PageNumberPagination):
 # ============================================================================
 
 @api_view(['GET'])
+@cache_anonymous_response(CATEGORIES)
 def category_list(request):
     """
     Get all active categories
@@ -59,6 +70,20 @@ def category_detail(request, pk):
     return Response(serializer.data)
 
 
+# ============================================================================
+# LOCATIONS
+# ============================================================================
+
+@api_view(['GET'])
+def location_autocomplete(request):
+    """
+    Location suggestions for the search box and the listing form
+    GET /api/locations/?q=roh
+    Without q, returns the provinces. Filter listings with ?location={location_id}
+    """
+    return Response(autocomplete(request.query_params.get('q', ''), settings.LOCATION_AUTOCOMPLETE_LIMIT))
+
+
 # ============================================================================
 # LISTINGS
 # ============================================================================
@@ -67,31 +92,66 @@ class ListingListView(generics.ListAPIView):
     """
     List all listings with filters
     GET /api/listings/?category=1&min_price=1000&max_price=50000&location=Bujumbura&search=house
+    GET /api/listings/?pagination=cursor  (keyset pagination for the infinite-scroll feed)
+    GET /api/listings/?property_type=house&min_bedrooms=3  (attribute filters, see ListingFilter)
     """
     queryset = Listing.objects.filter(listing_status='active').select_related('userid', 'cat_id').prefetch_related('images')
     serializer_class = ListingSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # ListingSearchFilter runs after OrderingFilter so relevance ordering can
+    # take over when the client does not pass ?ordering=
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ListingSearchFilter]
     
-    filterset_fields = ['cat_id', 'listing_status', 'is_featured', 'list_location']
-    search_fields = ['listing_title', 'list_description', 'list_location']
+    filterset_class = ListingFilter
     ordering_fields = ['listing_price', 'createdat', 'views']
     ordering = ['-createdat']
-    
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        
-        # Filter by price range
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        
-        if min_price:
-            queryset = queryset.filter(listing_price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(listing_price__lte=max_price)
-        
-        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Only the first few pages are worth caching; deep pages are rarely shared
+        key = cached = None
+        if self.is_cacheable_page(request):
+            key, cached = get_cached_response(request, [LISTINGS, CATEGORIES])
+        if cached is not None:
+            return cached
+
+        response = super().list(request, *args, **kwargs)
+        store_response(key, response)
+        return response
+
+    def is_cacheable_page(self, request):
+        if ListingCursorPagination.cursor_query_param in request.query_params:
+            return False
+        try:
+            page = int(request.query_params.get(self.pagination_class.page_query_param, 1))
+        except ValueError:
+            return False
+        return page <= settings.LISTING_CACHE_MAX_PAGE
+
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client opts in with ?pagination=cursor"""
+        if not hasattr(self, '_paginator'):
+            if ListingCursorPagination.is_requested(self.request):
+                self._paginator = ListingCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+    
+
+class ListingFacetsView(ListingListView):
+    """
+    Filter chip counts for the current filters
+    GET /api/listings/facets/?category=1&min_price=1000&search=house
+    Accepts every ListingListView filter; see listings/facets.py
+    """
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        return Response(get_facets(
+            request.query_params,
+            lambda: self.filter_queryset(self.get_queryset())
+        ))
 
 
 @api_view(['POST'])
@@ -147,7 +207,9 @@ def listing_create(request):
         # STEP 4: Automatically activate listing and set expiration
         listing.listing_status = 'active'
         listing.expiration_date = timezone.now() + timedelta(days=active_subscription.pricing_id.duration_days)
-        listing.save(update_fields=['listing_status', 'expiration_date', 'updatedat'])
+        # Link list_location to the gazetteer (province/commune/quarter)
+        location_fields = assign_location(listing)
+        listing.save(update_fields=['listing_status', 'expiration_date', 'updatedat', *location_fields])
 
         # STEP 5: Increment subscription usage
         active_subscription.listings_used += 1
@@ -161,79 +223,42 @@ def listing_create(request):
         # Handle image uploads if provided
         images = request.FILES.getlist('images')
         uploaded_images = []
+        new_images = []
 
         # STEP 7: Limit images based on subscription plan
         max_images = active_subscription.pricing_id.max_images_per_listing
 
-        for index, image_file in enumerate(images[:max_images]):
-            img = None  # Initialize for cleanup
+        # Raw files are stored now; resizing/re-encoding happens in a background
+        # job (see listings/images.py)
+        for image_file in images[:max_images]:
             try:
-                # Validate file type
-                allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/webp']
-                if image_file.content_type not in allowed_types:
-                    continue
-
-                # Validate file size (5MB max)
-                if image_file.size > 5 * 1024 * 1024:
-                    continue
-
-                # Open and optimize image
-                # NOTE: Original uploaded file remains in memory only and is never saved to disk
-                # Only the converted/optimized JPEG version is saved
-                img = Image.open(image_file)
-
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-
-                # Resize if too large
-                max_width = 1920
-                if img.width > max_width:
-                    ratio = max_width / img.width
-                    new_height = int(img.height * ratio)
-                    img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-
-                # Save optimized image to BytesIO buffer
-                output = BytesIO()
-                img.save(output, format='JPEG', quality=85, optimize=True)
-                output.seek(0)
-
-                # Close PIL image to free memory
-                img.close()
-                img = None
-
-                # Generate unique filename (always .jpg after conversion)
-                filename = f"listings/{listing.listing_id}/{uuid.uuid4().hex}.jpg"
-
-                # Save ONLY the converted file to storage
-                path = default_storage.save(filename, ContentFile(output.read()))
-                url = default_storage.url(path)
-
-                # Close buffer
-                output.close()
-
-                # Create image record
-                listing_image = ListingImage.objects.create(
-                    listing_id=listing,
-                    image_url=url,
-                    is_primary=(index == 0),  # First image is primary
-                    display_order=index
-                )
-
-                uploaded_images.append({
-                    'listimage_id': listing_image.listimage_id,
-                    'image_url': listing_image.image_url,
-                    'is_primary': listing_image.is_primary
-                })
+                validate_image_upload(image_file)
+            except InvalidImage:
+                continue
 
+            try:
+                listing_image = create_listing_image(
+                    listing,
+                    image_file,
+                    is_primary=(len(uploaded_images) == 0),  # First image is primary
+                    display_order=len(uploaded_images),
+                    queue=False
+                )
             except Exception as e:
                 # Log error but don't fail the entire request
-                print(f"Error uploading image {index}: {str(e)}")
+                print(f"Error uploading image {image_file.name}: {str(e)}")
                 continue
-            finally:
-                # Ensure PIL image is closed even if error occurs
-                if img:
-                    img.close()
+
+            new_images.append(listing_image)
+            uploaded_images.append({
+                'listimage_id': listing_image.listimage_id,
+                'image_url': listing_image.image_url,
+                'is_primary': listing_image.is_primary,
+                'processing_status': listing_image.processing_status
+            })
+
+        # All of the listing's images are processed together, in parallel
+        queue_image_processing(new_images)
 
         return Response({
             'message': 'Listing created and activated successfully!',
@@ -256,6 +281,13 @@ def listing_detail(request, pk):
     Get listing details
     GET /api/listings/{id}/
     """
+    # Anonymous visitors share a cached payload; they are never the owner, so
+    # their view is still counted on a cache hit
+    key, cached = get_cached_response(request, [LISTINGS, CATEGORIES])
+    if cached is not None:
+        view_counter.record(pk)
+        return cached
+
     listing = get_object_or_404(
         Listing.objects.select_related('userid', 'cat_id').prefetch_related('images'),
         pk=pk
@@ -266,7 +298,9 @@ def listing_detail(request, pk):
         listing.increment_views()
     
     serializer = ListingDetailSerializer(listing, context={'request': request})
-    return Response(serializer.data)
+    response = Response(serializer.data)
+    store_response(key, response)
+    return response
 
 
 @api_view(['PUT', 'PATCH'])
@@ -307,6 +341,8 @@ def listing_update(request, pk):
 
     if serializer.is_valid():
         serializer.save()
+        if 'list_location' in serializer.validated_data:
+            listing.save(update_fields=assign_location(listing))
         return Response({
             'message': 'Listing updated successfully',
             'listing': ListingDetailSerializer(listing).data
@@ -408,6 +444,7 @@ def my_listings(request):
 
 
 @api_view(['GET'])
+@cache_anonymous_response(LISTINGS, CATEGORIES)
 def featured_listings(request):
     """
     Get featured listings
@@ -425,23 +462,28 @@ def featured_listings(request):
 @api_view(['GET'])
 def similar_listings(request, pk):
     """
-    Get similar listings (same category, similar price)
+    Get similar listings, precomputed by listings/similarity.py
     GET /api/listings/{id}/similar/
     """
     from decimal import Decimal
 
-    listing = get_object_or_404(Listing, pk=pk)
+    similar = list(
+        get_similar_listings(pk, SIMILAR_LISTINGS_SHOWN)
+        .select_related('userid', 'cat_id').prefetch_related('images')
+    )
 
-    # Price range: ±30% using Decimal arithmetic
-    min_price = listing.listing_price * Decimal('0.7')
-    max_price = listing.listing_price * Decimal('1.3')
+    if not similar:
+        # Not computed yet (new listing): same category, price within ±30%
+        listing = get_object_or_404(Listing, pk=pk)
+        min_price = listing.listing_price * Decimal('0.7')
+        max_price = listing.listing_price * Decimal('1.3')
 
-    similar = Listing.objects.filter(
-        cat_id=listing.cat_id,
-        listing_status='active',
-        listing_price__gte=min_price,
-        listing_price__lte=max_price
-    ).exclude(pk=pk).select_related('userid', 'cat_id').prefetch_related('images').order_by('-createdat')[:6]
+        similar = Listing.objects.filter(
+            cat_id=listing.cat_id,
+            listing_status='active',
+            listing_price__gte=min_price,
+            listing_price__lte=max_price
+        ).exclude(pk=pk).select_related('userid', 'cat_id').prefetch_related('images').order_by('-createdat')[:SIMILAR_LISTINGS_SHOWN]
 
     serializer = ListingSerializer(similar, many=True, context={'request': request})
     return Response(serializer.data)
@@ -553,6 +595,7 @@ def review_create(request):
 # ============================================================================
 
 @api_view(['GET'])
+@cache_anonymous_response(PRICING_PLANS)
 def pricing_plans_list(request):
     """
     Get all active pricing plans
@@ -688,64 +731,22 @@ def upload_listing_image(request, listing_id):
     
     image_file = request.FILES['image']
     
-    # Validate file type
-    allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/webp']
-    if image_file.content_type not in allowed_types:
-        return Response({
-            'error': 'Invalid file type. Only JPEG, PNG, and WebP are allowed'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Validate file size (5MB max)
-    if image_file.size > 5 * 1024 * 1024:
+    # Validate file type, size and header
+    try:
+        validate_image_upload(image_file)
+    except InvalidImage as e:
         return Response({
-            'error': 'File too large. Maximum size is 5MB'
+            'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
-    
-    img = None
-    output = None
 
     try:
-        # Open and optimize image
-        img = Image.open(image_file)
-
-        # Convert to RGB if necessary
-        if img.mode in ('RGBA', 'P'):
-            img = img.convert('RGB')
-
-        # Resize if too large (max 1920px width)
-        max_width = 1920
-        if img.width > max_width:
-            ratio = max_width / img.width
-            new_height = int(img.height * ratio)
-            img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-
-        # Save optimized image to BytesIO buffer
-        output = BytesIO()
-        img.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
-
-        # Close PIL image immediately to free memory
-        img.close()
-        img = None
-
-        # Generate unique filename (always .jpg after conversion)
-        filename = f"listings/{listing.listing_id}/{uuid.uuid4().hex}.jpg"
-
-        # Save ONLY the converted file to storage
-        path = default_storage.save(filename, ContentFile(output.read()))
-        url = default_storage.url(path)
-
-        # Close buffer
-        output.close()
-        output = None
-
         # Get next display order
         max_order = ListingImage.objects.filter(listing_id=listing).count()
 
-        # Create image record
-        listing_image = ListingImage.objects.create(
-            listing_id=listing,
-            image_url=url,
+        # Store the raw upload; it is optimized in the background
+        listing_image = create_listing_image(
+            listing,
+            image_file,
             is_primary=(max_order == 0),  # First image is primary
             display_order=max_order
         )
@@ -756,7 +757,8 @@ def upload_listing_image(request, listing_id):
                 'listimage_id': listing_image.listimage_id,
                 'image_url': listing_image.image_url,
                 'is_primary': listing_image.is_primary,
-                'display_order': listing_image.display_order
+                'display_order': listing_image.display_order,
+                'processing_status': listing_image.processing_status
             }
         }, status=status.HTTP_201_CREATED)
 
@@ -764,14 +766,149 @@ def upload_listing_image(request, listing_id):
         return Response({
             'error': f'Error processing image: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    finally:
-        # Ensure cleanup of resources
-        if img:
-            img.close()
-        if output:
-            output.close()
-        # Django will automatically clean up temporary files from request.FILES
-        # after the request completes, so no manual deletion needed
+
+
+# ============================================================================
+# RESUMABLE IMAGE UPLOADS
+# ============================================================================
+
+def upload_session_data(session):
+    return {
+        'upload_id': str(session.upload_id),
+        'listing_id': session.listing_id_id,
+        'filename': session.filename,
+        'size': session.total_size,
+        'offset': session.received_size,
+        'status': session.session_status,
+        'chunk_size': settings.IMAGE_UPLOAD_CHUNK_SIZE,
+        'expires_at': session.updatedat + timedelta(hours=settings.IMAGE_UPLOAD_SESSION_TTL),
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_session_create(request, listing_id):
+    """
+    Start a resumable image upload
+    POST /api/listings/{listing_id}/uploads/
+    {
+        "filename": "house.jpg",
+        "content_type": "image/jpeg",
+        "size": 2483001
+    }
+    """
+    listing = get_object_or_404(Listing, pk=listing_id)
+
+    # Check ownership
+    if listing.userid != request.user:
+        return Response({
+            'error': 'You do not have permission to upload images for this listing'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    filename = request.data.get('filename')
+    content_type = request.data.get('content_type')
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        size = None
+
+    if not filename or not content_type or size is None:
+        return Response({
+            'error': 'filename, content_type and size are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        session = upload_sessions.create_session(listing, request.user, filename, content_type, size)
+    except upload_sessions.UploadSessionError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(upload_session_data(session), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_session_detail(request, upload_id):
+    """
+    GET: progress of a resumable upload (resume from "offset")
+    PUT: send the next chunk as the raw request body
+         PUT /api/uploads/{upload_id}/?offset=0
+         Content-Type: application/octet-stream
+    DELETE: abort the upload
+    """
+    session = get_object_or_404(ImageUploadSession, pk=upload_id, userid=request.user)
+
+    if request.method == 'GET':
+        return Response(upload_session_data(session))
+
+    if request.method == 'DELETE':
+        upload_sessions.abort_session(session)
+        return Response({
+            'message': 'Upload cancelled'
+        }, status=status.HTTP_204_NO_CONTENT)
+
+    offset = request.headers.get('Upload-Offset', request.query_params.get('offset'))
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'offset is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        # Read straight from the request stream, not request.data/request.body
+        session = upload_sessions.receive_chunk(session, offset, request.stream)
+    except upload_sessions.OffsetMismatch as e:
+        return Response({
+            'error': str(e),
+            'offset': e.expected
+        }, status=status.HTTP_409_CONFLICT)
+    except upload_sessions.UploadSessionError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(upload_session_data(session))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_session_complete(request, upload_id):
+    """
+    Turn a fully received upload into a listing image
+    POST /api/uploads/{upload_id}/complete/
+    """
+    session = get_object_or_404(ImageUploadSession, pk=upload_id, userid=request.user)
+
+    try:
+        listing_image = upload_sessions.complete_session(session)
+    except InvalidImage as e:
+        upload_sessions.abort_session(session)
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except upload_sessions.UploadSessionError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if listing_image is None:
+        # Completed earlier, then the image was deleted
+        return Response({
+            'error': 'Image no longer exists'
+        }, status=status.HTTP_410_GONE)
+
+    return Response({
+        'message': 'Image uploaded successfully',
+        'image': {
+            'listimage_id': listing_image.listimage_id,
+            'image_url': listing_image.image_url,
+            'is_primary': listing_image.is_primary,
+            'display_order': listing_image.display_order,
+            'processing_status': listing_image.processing_status
+        }
+    }, status=status.HTTP_201_CREATED)
 
 
 @api_view(['DELETE'])
@@ -791,12 +928,8 @@ def delete_listing_image(request, listing_id, image_id):
     
     image = get_object_or_404(ListingImage, pk=image_id, listing_id=listing)
     
-    # Delete file from storage
-    try:
-        if default_storage.exists(image.image_url):
-            default_storage.delete(image.image_url)
-    except Exception as e:
-        print(f"Error deleting file: {e}")
+    # Delete files from storage (renditions, and the raw upload if it was never processed)
+    delete_image_files(image)
     
     # If this was primary, make first remaining image primary
     was_primary = image.is_primary
@@ -0,0 +1,54 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import user_group
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Real-time chat updates for the connected user
+    WS /ws/chats/?token=<JWT access token>
+
+    One connection covers all of the user's chats. Server -> client events:
+        {"type": "message", "chat_id": 1, "message": {...}, "unread_delta": 1}
+        {"type": "read", "chat_id": 1, "reader_id": 2, "count": 3, "read_at": "...", "unread_delta": 0}
+    `unread_delta` is the change to apply to the user's unread badge.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.group_name = user_group(user.userid)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Push-only: messages are still sent through the REST API
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    # Group event handlers (see messaging/realtime.py)
+
+    async def chat_message(self, event):
+        await self.send_json({
+            'type': 'message',
+            'chat_id': event['chat_id'],
+            'message': event['message'],
+            'unread_delta': event['unread_delta'],
+        })
+
+    async def chat_read(self, event):
+        await self.send_json({
+            'type': 'read',
+            'chat_id': event['chat_id'],
+            'reader_id': event['reader_id'],
+            'count': event['count'],
+            'read_at': event['read_at'],
+            'unread_delta': event['unread_delta'],
+        })
@@ -27,6 +27,15 @@ class Chat(models.Model):
         related_name='chats_as_seller'
     )
     last_message_at = models.DateTimeField(null=True, blank=True, db_column='LAST_MESSAGE_AT')
+    # Denormalized pointer to the newest message so the inbox can join it in
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_column='LAST_MESSAGE_ID',
+        related_name='+'
+    )
     is_active = models.BooleanField(default=True, db_column='IS_ACTIVE')
     createdat = models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')
     
@@ -65,7 +74,8 @@ class Message(models.Model):
     class Meta:
         db_table = 'MESSAGES'
         indexes = [
-            models.Index(fields=['chat_id']),
+            # Message history pages: WHERE chat_id = ? AND message_id > / < ?
+            models.Index(fields=['chat_id', 'message_id'], name='messages_chat_message_idx'),
             models.Index(fields=['sentat']),
         ]
         ordering = ['sentat']
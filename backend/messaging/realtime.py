@@ -0,0 +1,67 @@
+"""
+Pushes chat events to connected WebSocket clients (see messaging/consumers.py).
+
+Every user has a channel-layer group; events are sent after the surrounding
+transaction commits so clients never see rows that could still roll back.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+
+def user_group(userid):
+    return f'user_{userid}'
+
+
+def _send(userid, event):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(user_group(userid), event)
+    except Exception as e:
+        # Real-time delivery is best effort; clients resync over REST
+        print(f"Error sending real-time chat event: {e}")
+
+
+def broadcast_new_message(chat, message, message_data):
+    """Send a new message to both participants (the sender's other devices too)"""
+    sender_id = message.userid_id
+    recipient_id = chat.userid_as_seller_id if sender_id == chat.userid_id else chat.userid_id
+
+    def send():
+        for userid, unread_delta in ((recipient_id, 1), (sender_id, 0)):
+            _send(userid, {
+                'type': 'chat.message',
+                'chat_id': chat.chat_id,
+                'message': message_data,
+                'unread_delta': unread_delta,
+            })
+
+    transaction.on_commit(send)
+
+
+def broadcast_messages_read(chat, reader, count, read_at=None):
+    """Read receipt for the other participant, unread badge update for the reader"""
+    if not count:
+        return
+
+    other_id = chat.userid_as_seller_id if reader.userid == chat.userid_id else chat.userid_id
+    # Same format as the REST API (REST_FRAMEWORK['DATETIME_FORMAT'])
+    read_at = serializers.DateTimeField().to_representation(read_at or timezone.now())
+
+    def send():
+        for userid, unread_delta in ((other_id, 0), (reader.userid, -count)):
+            _send(userid, {
+                'type': 'chat.read',
+                'chat_id': chat.chat_id,
+                'reader_id': reader.userid,
+                'count': count,
+                'read_at': read_at,
+                'unread_delta': unread_delta,
+            })
+
+    transaction.on_commit(send)
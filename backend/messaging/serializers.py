@@ -40,12 +40,15 @@ class ChatSerializer(serializers.ModelSerializer):
         ]
     
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
-        if last_msg:
-            return MessageSerializer(last_msg).data
+        if obj.last_message:
+            return MessageSerializer(obj.last_message).data
         return None
     
     def get_unread_count(self, obj):
+        # chat_list annotates this for the whole page in one query
+        if hasattr(obj, 'unread_messages'):
+            return obj.unread_messages
+
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.messages.filter(
@@ -1,3 +1,237 @@
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from listings.models import Category, Listing, ListingImage
+from users.models import User
+from umuhuza_api.asgi import application
+from .models import Chat, Message
+
+ORIGIN = 'http://localhost:5173'
+
+
+class ChatListQueryCountTests(TestCase):
+    """GET /api/chats/ must not issue queries per conversation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user(
+            'buyer@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Buyer', user_lastname='One'
+        )
+        cls.category = Category.objects.create(cat_name='Houses', slug='houses')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def create_chats(self, count):
+        for i in range(count):
+            seller = User.objects.create_user(
+                f'seller{Chat.objects.count()}@example.com', '+25779000002', 'SecurePass123',
+                user_firstname='Seller', user_lastname=str(i)
+            )
+            listing = Listing.objects.create(
+                userid=seller, cat_id=self.category, listing_title=f'House {i}',
+                list_description='3 bedrooms', listing_price=1000, list_location='Bujumbura',
+                listing_status='active'
+            )
+            ListingImage.objects.create(listing_id=listing, image_url=f'/media/{i}.jpg', is_primary=True)
+            chat = Chat.objects.create(userid=self.buyer, listing_id=listing, userid_as_seller=seller)
+            Message.objects.create(userid=self.buyer, chat_id=chat, content='Is it available?')
+            reply = Message.objects.create(userid=seller, chat_id=chat, content='Yes')
+            chat.last_message = reply
+            chat.last_message_at = reply.sentat
+            chat.save()
+
+    def test_query_count_is_constant(self):
+        self.create_chats(2)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/chats/')
+        self.assertEqual(len(response.data), 2)
+
+        self.create_chats(10)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/chats/')
+        self.assertEqual(len(response.data), 12)
+
+    def test_last_message_and_unread_count(self):
+        self.create_chats(1)
+        response = self.client.get('/api/chats/')
+
+        chat = response.data[0]
+        self.assertEqual(chat['last_message']['content'], 'Yes')
+        self.assertEqual(chat['unread_count'], 1)
+        self.assertEqual(len(chat['listing']['images']), 1)
+
+
+class ChatMessagesTests(TestCase):
+    """GET /api/chats/{id}/messages/: cursors, page size and read receipts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user(
+            'buyer@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Buyer', user_lastname='One'
+        )
+        cls.seller = User.objects.create_user(
+            'seller@example.com', '+25779000002', 'SecurePass123',
+            user_firstname='Seller', user_lastname='One'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        listing = Listing.objects.create(
+            userid=cls.seller, cat_id=category, listing_title='House', list_description='3 bedrooms',
+            listing_price=1000, list_location='Bujumbura', listing_status='active'
+        )
+        cls.chat = Chat.objects.create(userid=cls.buyer, listing_id=listing, userid_as_seller=cls.seller)
+        cls.ids = [
+            Message.objects.create(
+                userid=cls.seller if i % 2 else cls.buyer, chat_id=cls.chat, content=f'Message {i}'
+            ).message_id
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def fetch(self, **params):
+        return self.client.get(f'/api/chats/{self.chat.chat_id}/messages/', params)
+
+    def fetch_ids(self, **params):
+        response = self.fetch(**params)
+        self.assertEqual(response.status_code, 200)
+        return [message['message_id'] for message in response.data]
+
+    def test_cursors(self):
+        ids = self.ids
+        self.assertEqual(self.fetch_ids(), ids)
+        self.assertEqual(self.fetch_ids(after_message_id=ids[1]), ids[2:])
+        self.assertEqual(self.fetch_ids(after_message_id=ids[1], limit=2), ids[2:4])
+        self.assertEqual(self.fetch_ids(before_message_id=ids[4], limit=2), ids[2:4])
+        self.assertEqual(self.fetch_ids(after_message_id=ids[0], before_message_id=ids[3]), ids[1:3])
+        self.assertEqual(self.fetch_ids(after_message_id=ids[-1]), [])
+
+    def test_limit_is_clamped(self):
+        Message.objects.bulk_create([
+            Message(userid=self.buyer, chat_id=self.chat, content='Filler') for _ in range(200)
+        ])
+        latest = Message.objects.filter(chat_id=self.chat).order_by('-message_id')
+
+        self.assertEqual(self.fetch_ids(limit=0), [latest[0].message_id])
+        self.assertEqual(self.fetch_ids(limit=-5), [latest[0].message_id])
+        self.assertEqual(len(self.fetch_ids(limit=500)), 200)
+
+        for params in ({'limit': 'ten'}, {'limit': '2.5'}, {'after_message_id': 'last'}, {'before_message_id': 'x'}):
+            with self.subTest(**params):
+                self.assertEqual(self.fetch(**params).status_code, 400)
+
+    def test_reading_marks_unread_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.fetch_ids()
+        self.assertTrue(any(query['sql'].startswith('UPDATE "MESSAGES"') for query in queries))
+        self.assertFalse(Message.objects.filter(userid=self.seller, is_read=False).exists())
+        self.assertFalse(Message.objects.filter(userid=self.buyer, is_read=True).exists())
+
+        # Nothing left to mark: polling doesn't write
+        for params in ({}, {'after_message_id': self.ids[-1]}):
+            with self.subTest(**params), CaptureQueriesContext(connection) as queries:
+                self.fetch_ids(**params)
+            self.assertFalse([query['sql'] for query in queries if query['sql'].startswith('UPDATE')])
+
+
+class ChatWebSocketTests(TransactionTestCase):
+    """
+    WS /ws/chats/: token and origin checks, message and read events.
+    A TransactionTestCase: the consumer's database_sync_to_async calls close
+    connections that are inside a transaction, and broadcasts go out on commit.
+    """
+
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            'buyer@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Buyer', user_lastname='One'
+        )
+        self.seller = User.objects.create_user(
+            'seller@example.com', '+25779000002', 'SecurePass123',
+            user_firstname='Seller', user_lastname='Two'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        listing = Listing.objects.create(
+            userid=self.seller, cat_id=category, listing_title='House',
+            list_description='3 bedrooms', listing_price=1000, list_location='Bujumbura',
+            listing_status='active'
+        )
+        self.chat = Chat.objects.create(userid=self.buyer, listing_id=listing, userid_as_seller=self.seller)
+
+    def communicator(self, query='', origin=ORIGIN):
+        headers = [(b'origin', origin.encode())] if origin else []
+        return WebsocketCommunicator(application, f'/ws/chats/{query}', headers=headers)
+
+    def token_query(self, user):
+        return f'?token={AccessToken.for_user(user)}'
+
+    def request(self, user, method, path, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = getattr(client, method)(path, data, format='json')
+        self.assertIn(response.status_code, (200, 201))
+        return response
+
+    async def test_valid_token_connects(self):
+        communicator = self.communicator(self.token_query(self.buyer))
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await communicator.send_json_to({'type': 'ping'})
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'pong'})
+        await communicator.disconnect()
+
+    async def test_missing_or_invalid_token_is_rejected(self):
+        for query in ('', '?token=not-a-jwt'):
+            communicator = self.communicator(query)
+            connected, code = await communicator.connect()
+            self.assertFalse(connected)
+            self.assertEqual(code, 4401)
+
+    async def test_origin_check(self):
+        communicator = self.communicator(self.token_query(self.buyer), origin='https://evil.example.com')
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+        # Mobile apps send no Origin header
+        communicator = self.communicator(self.token_query(self.buyer), origin=None)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.disconnect()
+
+    async def test_message_and_read_events(self):
+        buyer = self.communicator(self.token_query(self.buyer))
+        seller = self.communicator(self.token_query(self.seller))
+        self.assertTrue((await buyer.connect())[0])
+        self.assertTrue((await seller.connect())[0])
+
+        await sync_to_async(self.request)(
+            self.buyer, 'post', f'/api/chats/{self.chat.chat_id}/messages/send/', {'content': 'Is it available?'}
+        )
+        event = await seller.receive_json_from()
+        self.assertEqual(event['type'], 'message')
+        self.assertEqual(event['chat_id'], self.chat.chat_id)
+        self.assertEqual(event['message']['content'], 'Is it available?')
+        self.assertEqual(event['unread_delta'], 1)
+        # The sender's other devices get it too, without a badge change
+        self.assertEqual((await buyer.receive_json_from())['unread_delta'], 0)
+
+        await sync_to_async(self.request)(self.seller, 'put', f'/api/chats/{self.chat.chat_id}/mark-read/')
+        receipt = await buyer.receive_json_from()
+        self.assertEqual(receipt['type'], 'read')
+        self.assertEqual((receipt['reader_id'], receipt['count'], receipt['unread_delta']), (self.seller.userid, 1, 0))
+        badge = await seller.receive_json_from()
+        self.assertEqual((badge['type'], badge['unread_delta']), ('read', -1))
+
+        await buyer.disconnect()
+        await seller.disconnect()
@@ -1,18 +1,26 @@
 from django.shortcuts import render
+from notifications.counters import adjust, get_unread_counts
 from notifications.utils import notify_new_message
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Max
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from .models import Chat, Message
+from .realtime import broadcast_messages_read, broadcast_new_message
 from .serializers import ChatSerializer, MessageSerializer
 from listings.models import Listing
 from users.serializers import UserPublicSerializer
 
+# chat_messages page sizes
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -21,15 +29,27 @@ def chat_list(request):
     Get all chats for current user
     GET /api/chats/
     """
+    # Unread messages from the other participant, counted per chat in the same query
+    unread = Message.objects.filter(
+        chat_id=OuterRef('pk'),
+        is_read=False
+    ).exclude(userid=request.user).order_by().values('chat_id').annotate(
+        total=Count('*')
+    ).values('total')
+
     # Get chats where user is either buyer or seller
     chats = Chat.objects.filter(
         Q(userid=request.user) | Q(userid_as_seller=request.user),
         is_active=True
     ).select_related(
-        'userid', 'userid_as_seller', 'listing_id'
+        'userid', 'userid_as_seller',
+        'listing_id__userid', 'listing_id__cat_id',
+        'last_message__userid'
+    ).prefetch_related(
+        'listing_id__images'
     ).annotate(
-        latest_message=Max('messages__sentat')
-    ).order_by('-latest_message')
+        unread_messages=Coalesce(Subquery(unread), 0)
+    ).order_by('-last_message_at')
     
     serializer = ChatSerializer(chats, many=True, context={'request': request})
     return Response(serializer.data)
@@ -105,29 +125,70 @@ def chat_detail(request, pk):
 @permission_classes([IsAuthenticated])
 def chat_messages(request, chat_id):
     """
-    Get all messages in a chat
+    Get messages in a chat, oldest first
     GET /api/chats/{chat_id}/messages/
+        ?after_message_id=120   only messages newer than 120 (polling for new messages)
+        ?before_message_id=80   the page of messages just before 80 (scrolling back)
+        ?limit=50               page size (default 50, max 200)
+
+    Without cursors the latest `limit` messages are returned.
     """
     chat = get_object_or_404(Chat, pk=chat_id)
     
     # Check permission
-    if chat.userid != request.user and chat.userid_as_seller != request.user:
+    if chat.userid_id != request.user.userid and chat.userid_as_seller_id != request.user.userid:
         return Response({
             'error': 'You do not have permission to view these messages'
         }, status=status.HTTP_403_FORBIDDEN)
-    
-    messages = chat.messages.all().select_related('userid').order_by('sentat')
+
+    try:
+        after_id = int(request.query_params['after_message_id']) if request.query_params.get('after_message_id') else None
+        before_id = int(request.query_params['before_message_id']) if request.query_params.get('before_message_id') else None
+        limit = int(request.query_params.get('limit') or MESSAGE_PAGE_SIZE)
+    except ValueError:
+        return Response({
+            'error': 'after_message_id, before_message_id and limit must be integers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, MAX_MESSAGE_PAGE_SIZE))
+
+    # Range scans on the (chat_id, message_id) index
+    messages = Message.objects.filter(chat_id=chat).select_related('userid')
+    if after_id is not None:
+        messages = messages.filter(message_id__gt=after_id)
+    if before_id is not None:
+        messages = messages.filter(message_id__lt=before_id)
+
+    if after_id is not None:
+        messages = list(messages.order_by('message_id')[:limit])
+    else:
+        messages = list(messages.order_by('-message_id')[:limit])
+        messages.reverse()
+
+    # Mark messages as read (for the other user's messages), but only when
+    # this page actually shows some, so idle polling never writes
+    unread = [
+        message for message in messages
+        if not message.is_read and message.userid_id != request.user.userid
+    ]
+    if unread:
+        read_at = timezone.now()
+        with transaction.atomic():
+            updated = Message.objects.filter(
+                chat_id=chat,
+                is_read=False,
+                message_id__lte=messages[-1].message_id
+            ).exclude(userid=request.user).update(
+                is_read=True,
+                read_at=read_at
+            )
+            adjust(request.user.pk, messages=-updated)
+        broadcast_messages_read(chat, request.user, updated, read_at)
+
+        for message in unread:
+            message.is_read = True
+            message.read_at = read_at
+
     serializer = MessageSerializer(messages, many=True)
-    
-    # Mark messages as read (for the other user's messages)
-    Message.objects.filter(
-        chat_id=chat,
-        is_read=False
-    ).exclude(userid=request.user).update(
-        is_read=True,
-        read_at=timezone.now()
-    )
-    
     return Response(serializer.data)
 
 
@@ -158,31 +219,32 @@ def message_send(request, chat_id):
             'error': 'Message content is required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Create message
-    message = Message.objects.create(
-        userid=request.user,
-        chat_id=chat,
-        content=content,
-        message_type=message_type
-    )
+    # The message, the recipient's unread counter and notification commit together
+    with transaction.atomic():
+        # Create message
+        message = Message.objects.create(
+            userid=request.user,
+            chat_id=chat,
+            content=content,
+            message_type=message_type
+        )
     
-    # Notify the other user
-    recipient = chat.userid_as_seller if request.user == chat.userid else chat.userid
-    notify_new_message(
-        recipient=recipient,
-        sender=request.user,
-        listing_title=chat.listing_id.listing_title,
-        chat_id=chat.chat_id
-    )
-    
-    # Update chat's last_message_at
-    chat.last_message_at = message.sentat
-    chat.save(update_fields=['last_message_at'])
+        # Notify the other user
+        recipient = chat.userid_as_seller if request.user == chat.userid else chat.userid
+        adjust(recipient.pk, messages=1)
+        notify_new_message(
+            recipient=recipient,
+            message=message,
+            listing_title=chat.listing_id.listing_title
+        )
     
-    # TODO: Send notification to other user
-    # TODO: Send real-time update via WebSocket
+        # Update chat's last message pointers
+        chat.last_message_at = message.sentat
+        chat.last_message = message
+        chat.save(update_fields=['last_message_at', 'last_message'])
     
     serializer = MessageSerializer(message)
+    broadcast_new_message(chat, message, serializer.data)
     return Response({
         'message': 'Message sent successfully',
         'data': serializer.data
@@ -205,13 +267,17 @@ def mark_messages_read(request, chat_id):
         }, status=status.HTTP_403_FORBIDDEN)
     
     # Mark all unread messages from other user as read
-    updated = Message.objects.filter(
-        chat_id=chat,
-        is_read=False
-    ).exclude(userid=request.user).update(
-        is_read=True,
-        read_at=timezone.now()
-    )
+    read_at = timezone.now()
+    with transaction.atomic():
+        updated = Message.objects.filter(
+            chat_id=chat,
+            is_read=False
+        ).exclude(userid=request.user).update(
+            is_read=True,
+            read_at=read_at
+        )
+        adjust(request.user.pk, messages=-updated)
+    broadcast_messages_read(chat, request.user, updated, read_at)
     
     return Response({
         'message': f'{updated} messages marked as read'
@@ -225,15 +291,8 @@ def unread_count(request):
     Get total unread messages count for current user
     GET /api/chats/unread-count/
     """
-    count = Message.objects.filter(
-        chat_id__in=Chat.objects.filter(
-            Q(userid=request.user) | Q(userid_as_seller=request.user)
-        ),
-        is_read=False
-    ).exclude(userid=request.user).count()
-    
     return Response({
-        'unread_count': count
+        'unread_count': get_unread_counts(request.user).messages
     })
 
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, OutboxMessage
 
 
 @admin.register(Notification)
@@ -21,3 +21,12 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('createdat',)
         }),
     )
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['outbox_id', 'channel', 'recipient', 'subject', 'outbox_status',
+                    'attempts', 'next_attempt_at', 'sentat']
+    list_filter = ['channel', 'outbox_status', 'createdat']
+    search_fields = ['recipient', 'subject']
+    readonly_fields = ['createdat', 'sentat', 'attempts', 'last_error']
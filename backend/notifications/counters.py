@@ -0,0 +1,105 @@
+"""
+Denormalized unread counters.
+
+The header badge polls notification_unread_count and the chats unread_count,
+which used to COUNT unread notifications and unread messages across every chat
+the user is in. Each user now has an UnreadCounter row that is adjusted in the
+same transaction as the change:
+
+- notifications: +1 in create_notification(), -N when notifications are marked
+  read (or an unread one is deleted), +1 when a message digest re-opens one
+- messages: +1 in message_send for the recipient, -N when a chat is read
+
+so the badge endpoints are a single primary-key lookup. Updates are relative
+(`SET n = GREATEST(n + delta, 0)`), so concurrent requests never overwrite
+each other.
+
+Rows are created on first use from a real count. Anything that changes unread
+rows without going through these helpers (bulk deletes, cascades, admin
+edits) can make them drift: `python manage.py reconcile_unread_counts`
+recomputes them.
+"""
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from messaging.models import Message
+from .models import Notification, UnreadCounter
+
+
+def count_unread_notifications(user_ids=None):
+    """{userid: unread notifications}"""
+    notifications = Notification.objects.filter(is_read=False)
+    if user_ids is not None:
+        notifications = notifications.filter(userid__in=user_ids)
+    return dict(
+        notifications.order_by().values('userid').annotate(total=Count('*')).values_list('userid', 'total')
+    )
+
+
+def count_unread_messages(user_ids=None):
+    """{userid: unread messages from the other participant, across all their chats}"""
+    counts = {}
+    # Messages to the buyer, then messages to the seller of each chat
+    for participant in ('chat_id__userid', 'chat_id__userid_as_seller'):
+        messages = Message.objects.filter(is_read=False).exclude(userid=F(participant))
+        if user_ids is not None:
+            messages = messages.filter(**{f'{participant}__in': user_ids})
+        grouped = messages.order_by().values(participant).annotate(total=Count('*'))
+        for userid, total in grouped.values_list(participant, 'total'):
+            counts[userid] = counts.get(userid, 0) + total
+    return counts
+
+
+def reconcile(user_ids=None):
+    """
+    Recompute counters from the source tables, for `user_ids` or everyone.
+    Returns the number of counters that were missing or wrong.
+    """
+    notifications = count_unread_notifications(user_ids)
+    messages = count_unread_messages(user_ids)
+
+    counters = UnreadCounter.objects.all()
+    if user_ids is not None:
+        counters = counters.filter(userid__in=user_ids)
+    current = {userid: (n, m) for userid, n, m in counters.values_list('userid', 'notifications', 'messages')}
+
+    targets = set(user_ids) if user_ids is not None else set(notifications) | set(messages) | set(current)
+    fixed = [
+        UnreadCounter(userid_id=userid, notifications=notifications.get(userid, 0), messages=messages.get(userid, 0))
+        for userid in targets
+        if current.get(userid) != (notifications.get(userid, 0), messages.get(userid, 0))
+    ]
+    UnreadCounter.objects.bulk_create(
+        fixed,
+        update_conflicts=True,
+        unique_fields=['userid'],
+        update_fields=['notifications', 'messages'],
+        batch_size=1000,
+    )
+    return len(fixed)
+
+
+def adjust(user_id, notifications=0, messages=0):
+    """
+    Add to a user's counters. Call after the change it accounts for, in the
+    same transaction: a missing row is created from a real count, which
+    already includes it.
+    """
+    if not notifications and not messages:
+        return
+    updated = UnreadCounter.objects.filter(pk=user_id).update(
+        notifications=Greatest(F('notifications') + notifications, 0),
+        messages=Greatest(F('messages') + messages, 0),
+    )
+    if not updated:
+        reconcile([user_id])
+
+
+def get_unread_counts(user):
+    """The user's UnreadCounter, created from a real count the first time"""
+    try:
+        return UnreadCounter.objects.get(pk=user.pk)
+    except UnreadCounter.DoesNotExist:
+        reconcile([user.pk])
+        return UnreadCounter.objects.get(pk=user.pk)
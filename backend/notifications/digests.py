@@ -0,0 +1,146 @@
+"""
+Coalesced chat message notifications.
+
+message_send used to insert a Notification row for every message, so a burst
+of 20 messages meant 20 rows in the bell menu. Messages are now collected per
+recipient and chat in a MessageDigest:
+
+- The first message of a burst creates the in-app Notification right away and
+  opens a digest that stays open for MESSAGE_DIGEST_WINDOW seconds.
+- Further messages in the window only bump the digest's counter (one UPDATE,
+  no new Notification).
+- flush_due_digests(), run every minute by beat, closes expired digests: the
+  Notification is rewritten to "sent you N messages" and marked unread, and if
+  the recipient still hasn't read the chat, a single email or SMS digest is
+  queued in the outbox (MESSAGE_DIGEST_CHANNEL).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from messaging.models import Message
+from users.utils import send_message_notification_sms, send_new_message_email
+from .counters import adjust
+from .models import MessageDigest, Notification
+from .realtime import broadcast_notification
+from .utils import create_notification
+
+FLUSH_BATCH_SIZE = 100
+
+
+def _add_to_open_digest(recipient, message):
+    return MessageDigest.objects.filter(userid=recipient, chat_id=message.chat_id_id).update(
+        message_count=F('message_count') + 1,
+        last_message=message,
+    )
+
+
+def record_message(recipient, message, listing_title):
+    """
+    Count a new chat message for `recipient`. Returns the Notification if this
+    message opened a new digest, None if it was added to an open one.
+    """
+    if _add_to_open_digest(recipient, message):
+        return None
+
+    try:
+        with transaction.atomic():
+            notification = create_notification(
+                user=recipient,
+                title='New Message',
+                message=f'{message.userid.full_name} sent you a message about "{listing_title}"',
+                notif_type='chat',
+                link_url=f'/chats/{message.chat_id_id}'
+            )
+            MessageDigest.objects.create(
+                userid=recipient,
+                chat_id_id=message.chat_id_id,
+                notif_id=notification,
+                last_message=message,
+                flush_after=timezone.now() + timedelta(seconds=settings.MESSAGE_DIGEST_WINDOW),
+            )
+        return notification
+    except IntegrityError:
+        # A concurrent message opened the digest first
+        _add_to_open_digest(recipient, message)
+        return None
+
+
+def send_digest(digest):
+    """Queue the email/SMS alert for a closed digest"""
+    channel = settings.MESSAGE_DIGEST_CHANNEL
+    recipient = digest.userid
+    sender = digest.last_message.userid
+
+    if channel == 'email':
+        send_new_message_email(
+            recipient,
+            sender,
+            digest.last_message.content,
+            listing=digest.chat_id.listing_id,
+            chat_url=f"{settings.FRONTEND_URL}/chats/{digest.chat_id_id}",
+            message_count=digest.message_count,
+        )
+    elif channel == 'sms':
+        send_message_notification_sms(recipient, sender.full_name, digest.message_count)
+
+
+def flush_digest(digest):
+    if digest.last_message is None:
+        # The messages were deleted in the meantime
+        return
+
+    # Already caught up in the app: no need for an email or SMS, and a
+    # notification that was read stays read
+    still_unread = Message.objects.filter(
+        chat_id=digest.chat_id_id,
+        is_read=False
+    ).exclude(userid=digest.userid_id).exists()
+
+    if digest.message_count > 1:
+        notification = digest.notif_id
+        listing_title = digest.chat_id.listing_id.listing_title
+        notification.notif_message = (
+            f'{digest.last_message.userid.full_name} sent you {digest.message_count} '
+            f'messages about "{listing_title}"'
+        )
+        Notification.objects.filter(pk=notification.pk).update(notif_message=notification.notif_message)
+        if still_unread:
+            # Bring it back to the unread list if it was read after the first message
+            reopened = Notification.objects.filter(pk=notification.pk, is_read=True).update(
+                is_read=False,
+                read_at=None,
+            )
+            adjust(digest.userid_id, notifications=reopened)
+            notification.is_read = False
+            notification.read_at = None
+        broadcast_notification(notification, created=False)
+
+    if still_unread:
+        send_digest(digest)
+
+
+def flush_due_digests(now=None):
+    """Close every digest whose window has passed. Returns how many were flushed"""
+    now = now or timezone.now()
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            digests = list(
+                MessageDigest.objects
+                .select_for_update(skip_locked=True, of=('self',))
+                .filter(flush_after__lte=now)
+                .select_related('userid', 'notif_id', 'chat_id__listing_id', 'last_message__userid')
+                .order_by('flush_after')[:FLUSH_BATCH_SIZE]
+            )
+            if not digests:
+                return flushed
+
+            for digest in digests:
+                flush_digest(digest)
+            MessageDigest.objects.filter(pk__in=[d.pk for d in digests]).delete()
+        flushed += len(digests)
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import OutboxDeliverer
+
+
+class Command(BaseCommand):
+    help = 'Send pending outbox emails and SMS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll every --interval seconds, reusing the same connections',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=5,
+            help='Seconds between polls in --loop mode',
+        )
+
+    def handle(self, *args, **options):
+        deliverer = OutboxDeliverer()
+
+        if not options['loop']:
+            try:
+                sent, failed = deliverer.deliver_pending()
+            finally:
+                deliverer.close()
+            self.stdout.write(self.style.SUCCESS(f'✓ Sent {sent} messages ({failed} failed attempts)'))
+            return
+
+        self.stdout.write(f"Delivering outbox messages every {options['interval']}s (Ctrl+C to stop)")
+        try:
+            while True:
+                try:
+                    sent, failed = deliverer.deliver_pending()
+                    if sent or failed:
+                        self.stdout.write(f'✓ Sent {sent} messages ({failed} failed attempts)')
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f'Error delivering outbox: {e}'))
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('\n✓ Stopped'))
+        finally:
+            deliverer.close()
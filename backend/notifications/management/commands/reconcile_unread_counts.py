@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from notifications.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user unread notification and message counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only this user id (repeatable). Default: every user',
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Corrected {fixed} unread counters'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('outbox_id', models.BigAutoField(db_column='OUTBOX_ID', primary_key=True, serialize=False)),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], db_column='CHANNEL', max_length=10)),
+                ('recipient', models.CharField(db_column='RECIPIENT', max_length=255)),
+                ('subject', models.CharField(blank=True, db_column='SUBJECT', default='', max_length=255)),
+                ('body', models.TextField(db_column='BODY')),
+                ('html_body', models.TextField(blank=True, db_column='HTML_BODY', default='')),
+                ('outbox_status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], db_column='OUTBOX_STATUS', default='pending', max_length=10)),
+                ('attempts', models.IntegerField(db_column='ATTEMPTS', default=0)),
+                ('next_attempt_at', models.DateTimeField(db_column='NEXT_ATTEMPT_AT', default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, db_column='LAST_ERROR', default='')),
+                ('createdat', models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')),
+                ('sentat', models.DateTimeField(blank=True, db_column='SENTAT', null=True)),
+            ],
+            options={
+                'db_table': 'OUTBOX_MESSAGES',
+                'ordering': ['outbox_id'],
+                'indexes': [models.Index(condition=models.Q(('outbox_status', 'pending')), fields=['next_attempt_at'], name='outbox_pending_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_message_chat_message_index'),
+        ('notifications', '0003_outbox_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageDigest',
+            fields=[
+                ('digest_id', models.AutoField(db_column='DIGEST_ID', primary_key=True, serialize=False)),
+                ('message_count', models.IntegerField(db_column='MESSAGE_COUNT', default=1)),
+                ('createdat', models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')),
+                ('flush_after', models.DateTimeField(db_column='FLUSH_AFTER', db_index=True)),
+                ('chat_id', models.ForeignKey(db_column='CHAT_ID', on_delete=django.db.models.deletion.CASCADE, to='messaging.chat')),
+                ('last_message', models.ForeignKey(db_column='LAST_MESSAGE_ID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message')),
+                ('notif_id', models.ForeignKey(db_column='NOTIF_ID', on_delete=django.db.models.deletion.CASCADE, to='notifications.notification')),
+                ('userid', models.ForeignKey(db_column='USERID', on_delete=django.db.models.deletion.CASCADE, related_name='message_digests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'MESSAGE_DIGESTS',
+                'constraints': [models.UniqueConstraint(fields=('userid', 'chat_id'), name='message_digest_user_chat_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_message_digest'),
+        ('users', '0004_partition_activity_logs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('userid', models.OneToOneField(db_column='USERID', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('notifications', models.IntegerField(db_column='NOTIFICATIONS', default=0)),
+                ('messages', models.IntegerField(db_column='MESSAGES', default=0)),
+            ],
+            options={
+                'db_table': 'UNREAD_COUNTERS',
+            },
+        ),
+    ]
@@ -46,3 +46,103 @@ class Notification(models.Model):
         return f"{self.notif_title} for {self.userid.full_name}"
 
 
+class UnreadCounter(models.Model):
+    """
+    Per-user unread badge counts, kept up to date by notifications/counters.py
+    so the badge endpoints read one row instead of counting
+    """
+    userid = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column='USERID',
+        related_name='unread_counter'
+    )
+    notifications = models.IntegerField(default=0, db_column='NOTIFICATIONS')
+    messages = models.IntegerField(default=0, db_column='MESSAGES')
+
+    class Meta:
+        db_table = 'UNREAD_COUNTERS'
+
+    def __str__(self):
+        return f"{self.notifications} notifications, {self.messages} messages unread for user {self.userid_id}"
+
+
+class MessageDigest(models.Model):
+    """
+    Chat messages a recipient hasn't been alerted about yet, coalesced per
+    chat until flush_after (see notifications/digests.py)
+    """
+    digest_id = models.AutoField(primary_key=True, db_column='DIGEST_ID')
+    userid = models.ForeignKey(User, on_delete=models.CASCADE, db_column='USERID', related_name='message_digests')
+    chat_id = models.ForeignKey('messaging.Chat', on_delete=models.CASCADE, db_column='CHAT_ID')
+    notif_id = models.ForeignKey(Notification, on_delete=models.CASCADE, db_column='NOTIF_ID')
+    last_message = models.ForeignKey(
+        'messaging.Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        db_column='LAST_MESSAGE_ID',
+        related_name='+'
+    )
+    message_count = models.IntegerField(default=1, db_column='MESSAGE_COUNT')
+    createdat = models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')
+    flush_after = models.DateTimeField(db_column='FLUSH_AFTER', db_index=True)
+
+    class Meta:
+        db_table = 'MESSAGE_DIGESTS'
+        constraints = [
+            models.UniqueConstraint(fields=['userid', 'chat_id'], name='message_digest_user_chat_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.message_count} messages in chat {self.chat_id_id} for user {self.userid_id}"
+
+
+# ============================================================================
+# OUTBOX
+# ============================================================================
+
+class OutboxMessage(models.Model):
+    """
+    An email or SMS waiting to be delivered by the outbox worker
+    (see notifications/outbox.py). Rows are written in the same transaction
+    as the change that triggers them.
+    """
+    CHANNELS = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    outbox_id = models.BigAutoField(primary_key=True, db_column='OUTBOX_ID')
+    channel = models.CharField(max_length=10, choices=CHANNELS, db_column='CHANNEL')
+    recipient = models.CharField(max_length=255, db_column='RECIPIENT')  # email address or phone number
+    subject = models.CharField(max_length=255, blank=True, default='', db_column='SUBJECT')
+    body = models.TextField(db_column='BODY')
+    html_body = models.TextField(blank=True, default='', db_column='HTML_BODY')
+    outbox_status = models.CharField(max_length=10, choices=STATUSES, default='pending', db_column='OUTBOX_STATUS')
+    attempts = models.IntegerField(default=0, db_column='ATTEMPTS')
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_column='NEXT_ATTEMPT_AT')
+    last_error = models.TextField(blank=True, default='', db_column='LAST_ERROR')
+    createdat = models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')
+    sentat = models.DateTimeField(null=True, blank=True, db_column='SENTAT')
+
+    class Meta:
+        db_table = 'OUTBOX_MESSAGES'
+        indexes = [
+            # The worker only ever looks for due pending messages
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(outbox_status='pending'),
+                name='outbox_pending_due_idx',
+            ),
+        ]
+        ordering = ['outbox_id']
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.outbox_status})"
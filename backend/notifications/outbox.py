@@ -0,0 +1,190 @@
+"""
+Transactional outbox for email and SMS.
+
+Request handlers used to talk to the SMTP server and the SMS API before
+answering. They now call enqueue_email() / enqueue_sms(), which only insert an
+OutboxMessage row in the current transaction: if the change that triggered
+the message rolls back, the message goes with it, and once it commits the
+message is guaranteed to be delivered at least once.
+
+After commit, deliver_outbox_task is queued to send right away; the
+`deliver-outbox` beat entry picks up retries and anything a worker missed.
+OutboxDeliverer keeps one SMTP connection and one SMS backend open across
+messages instead of connecting per message.
+
+Claiming a message pushes its next_attempt_at OUTBOX_LEASE_SECONDS ahead, so
+concurrent workers skip it and a worker that dies mid-send only delays it.
+Failed sends are retried with exponential backoff (OUTBOX_RETRY_DELAY doubled
+per attempt, capped at OUTBOX_RETRY_MAX_DELAY) and marked failed after
+OUTBOX_MAX_ATTEMPTS.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .sms import get_sms_backend
+
+
+def _schedule_delivery():
+    from .tasks import deliver_outbox_task
+
+    transaction.on_commit(deliver_outbox_task.delay)
+
+
+def enqueue_email(recipient, subject, body, html_body=''):
+    message = OutboxMessage.objects.create(
+        channel='email',
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        html_body=html_body or '',
+    )
+    _schedule_delivery()
+    return message
+
+
+def enqueue_sms(phone_number, message):
+    outbox_message = OutboxMessage.objects.create(
+        channel='sms',
+        recipient=phone_number,
+        body=message,
+    )
+    _schedule_delivery()
+    return outbox_message
+
+
+def retry_delay(attempts):
+    """Wait before the next try after `attempts` failed ones"""
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.OUTBOX_RETRY_MAX_DELAY))
+
+
+def claim_due_messages(limit):
+    """Lease up to `limit` due messages to this worker and count the attempt"""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(outbox_status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:limit]
+        )
+        if messages:
+            OutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+            )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+class OutboxDeliverer:
+    """Sends outbox messages over connections kept open between messages"""
+
+    def __init__(self):
+        self.email_connection = None
+        self.email_connection_used = False
+        self.sms_backend = None
+
+    def send_email(self, message):
+        if self.email_connection is None:
+            self.email_connection = get_connection(fail_silently=False)
+            self.email_connection.open()
+            self.email_connection_used = False
+
+        email = EmailMultiAlternatives(
+            subject=message.subject,
+            body=message.body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[message.recipient],
+            connection=self.email_connection,
+        )
+        if message.html_body:
+            email.attach_alternative(message.html_body, 'text/html')
+
+        try:
+            email.send()
+        except Exception:
+            reused = self.email_connection_used
+            self.close_email()
+            if not reused:
+                raise
+            # The server probably dropped the idle connection: reconnect once
+            self.send_email(message)
+            return
+        self.email_connection_used = True
+
+    def send_sms(self, message):
+        if self.sms_backend is None:
+            self.sms_backend = get_sms_backend()
+        try:
+            self.sms_backend.send(message.recipient, message.body)
+        except Exception:
+            # Start from a fresh client next time
+            self.sms_backend.close()
+            self.sms_backend = None
+            raise
+
+    def deliver(self, message):
+        """Send one claimed message and record the outcome. Returns True if sent"""
+        try:
+            if message.channel == 'email':
+                self.send_email(message)
+            else:
+                self.send_sms(message)
+        except Exception as e:
+            print(f"Error delivering {message}: {e}")
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                OutboxMessage.objects.filter(pk=message.pk).update(
+                    outbox_status='failed', last_error=str(e)
+                )
+            else:
+                OutboxMessage.objects.filter(pk=message.pk).update(
+                    next_attempt_at=timezone.now() + retry_delay(message.attempts),
+                    last_error=str(e),
+                )
+            return False
+
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            outbox_status='sent', sentat=timezone.now(), last_error=''
+        )
+        return True
+
+    def deliver_pending(self, batch_size=None):
+        """Send every due message. Returns (sent, failed) counts"""
+        batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        sent = failed = 0
+        while True:
+            messages = claim_due_messages(batch_size)
+            if not messages:
+                return sent, failed
+            for message in messages:
+                if self.deliver(message):
+                    sent += 1
+                else:
+                    failed += 1
+
+    def close_email(self):
+        if self.email_connection is not None:
+            try:
+                self.email_connection.close()
+            except Exception:
+                pass
+            self.email_connection = None
+
+    def close(self):
+        self.close_email()
+        if self.sms_backend is not None:
+            self.sms_backend.close()
+            self.sms_backend = None
+
+
+# One per worker process, so connections outlive a single task
+deliverer = OutboxDeliverer()
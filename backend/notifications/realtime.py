@@ -0,0 +1,66 @@
+"""
+Pushes notification events to open Server-Sent Events streams (see
+notifications/stream.py).
+
+The channel layer is the pub/sub bus, as for chat WebSockets
+(messaging/realtime.py): each user has a group that their streams join. The
+in-memory layer covers a single process and tests; set
+REDIS_CHANNEL_LAYER_URL so events published by other workers (Celery, other
+ASGI nodes) reach the streams too.
+
+Events are sent after the surrounding transaction commits and carry the
+user's current unread count, read from UNREAD_COUNTERS.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import UnreadCounter
+
+
+def notification_group(userid):
+    return f'notifications_{userid}'
+
+
+def _unread_count(userid):
+    count = UnreadCounter.objects.filter(pk=userid).values_list('notifications', flat=True).first()
+    return count or 0
+
+
+def _send(userid, event):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(notification_group(userid), event)
+    except Exception as e:
+        # Best effort; clients resync over REST when they reconnect
+        print(f"Error sending real-time notification event: {e}")
+
+
+def broadcast_notification(notification, created=True):
+    """A notification was created (or rewritten, e.g. by a message digest)"""
+    from .serializers import NotificationSerializer
+
+    userid = notification.userid_id
+
+    def send():
+        _send(userid, {
+            'type': 'notification.created' if created else 'notification.updated',
+            'notification': NotificationSerializer(notification).data,
+            'unread_count': _unread_count(userid),
+        })
+
+    transaction.on_commit(send)
+
+
+def broadcast_unread_count(userid):
+    """Notifications were read or deleted"""
+    def send():
+        _send(userid, {
+            'type': 'notification.unread',
+            'unread_count': _unread_count(userid),
+        })
+
+    transaction.on_commit(send)
@@ -0,0 +1,65 @@
+"""
+SMS backends, chosen with settings.SMS_BACKEND the same way EMAIL_BACKEND
+picks an email backend. A backend instance is meant to be kept alive and
+reused for many messages (see notifications/outbox.py).
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class ConsoleBackend:
+    """Print messages to the console (development)"""
+
+    def send(self, phone_number, message):
+        print(f"\n{'='*60}")
+        print("📱 SMS MESSAGE")
+        print(f"{'='*60}")
+        print(f"To: {phone_number}")
+        print(f"Message: {message}")
+        print(f"{'='*60}\n")
+
+    def close(self):
+        pass
+
+
+class LocMemBackend:
+    """Keep messages in LocMemBackend.outbox instead of sending them (tests)"""
+    outbox = []
+
+    def send(self, phone_number, message):
+        LocMemBackend.outbox.append({'to': phone_number, 'message': message})
+
+    def close(self):
+        pass
+
+
+class AfricasTalkingBackend:
+    """Africa's Talking SMS API. The SDK is initialized once per instance"""
+
+    def __init__(self):
+        import africastalking
+
+        africastalking.initialize(
+            username=settings.AFRICAS_TALKING_USERNAME,
+            api_key=settings.AFRICAS_TALKING_API_KEY
+        )
+        self.client = africastalking.SMS
+
+    def send(self, phone_number, message):
+        response = self.client.send(
+            message=message,
+            recipients=[phone_number],
+            sender_id=settings.AFRICAS_TALKING_SENDER_ID or None
+        )
+        # The API answers 200 even when a recipient was rejected
+        for recipient in response.get('SMSMessageData', {}).get('Recipients', []):
+            if recipient.get('status') != 'Success':
+                raise RuntimeError(f"SMS to {phone_number} rejected: {recipient.get('status')}")
+
+    def close(self):
+        pass
+
+
+def get_sms_backend():
+    return import_string(settings.SMS_BACKEND)()
@@ -0,0 +1,140 @@
+"""
+Server-Sent Events stream of the user's notifications
+GET /api/notifications/stream/?token=<JWT access token>
+
+Replaces polling notification_list / notification_unread_count for the bell
+icon. EventSource can't send an Authorization header, so the access token may
+be passed in the query string like the chat WebSocket (umuhuza_api/ws_auth.py);
+a Bearer header works too.
+
+Events:
+    event: unread                      sent on connect and whenever the count changes
+    data: {"unread_count": 3}
+
+    event: notification                a new notification (id: its notif_id)
+    data: {"notification": {...}, "unread_count": 4}
+
+    event: notification_updated        an existing one changed (message digests)
+    data: {"notification": {...}, "unread_count": 4}
+
+A comment line is sent every NOTIFICATION_STREAM_HEARTBEAT seconds to keep
+proxies from closing an idle connection. On reconnect the browser sends
+Last-Event-ID and notifications created in the meantime are replayed.
+
+This is a plain async Django view (DRF views are sync) and must be served by
+the ASGI server so each open stream costs a coroutine, not a thread.
+"""
+
+import asyncio
+import json
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from umuhuza_api.ws_auth import get_user_for_token
+from .counters import get_unread_counts
+from .models import Notification
+from .realtime import notification_group
+from .serializers import NotificationSerializer
+
+# Most notifications replayed after a reconnect
+MAX_REPLAY = 50
+
+EVENT_NAMES = {
+    'notification.created': 'notification',
+    'notification.updated': 'notification_updated',
+    'notification.unread': 'unread',
+}
+
+
+def format_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def get_token(request):
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):]
+    return request.GET.get('token')
+
+
+@database_sync_to_async
+def get_initial_state(user, last_event_id):
+    """Unread count, plus notifications missed since `last_event_id`"""
+    missed = []
+    if last_event_id is not None:
+        missed = list(
+            Notification.objects.filter(userid=user, notif_id__gt=last_event_id)
+            .order_by('notif_id')[:MAX_REPLAY]
+        )
+    count = get_unread_counts(user).notifications
+    return count, NotificationSerializer(missed, many=True).data
+
+
+async def event_stream(user, last_event_id):
+    channel_layer = get_channel_layer()
+    channel = await channel_layer.new_channel()
+    group = notification_group(user.userid)
+    await channel_layer.group_add(group, channel)
+
+    try:
+        # Join the group first so nothing created meanwhile is missed
+        unread_count, missed = await get_initial_state(user, last_event_id)
+        for notification in missed:
+            yield format_event(
+                'notification',
+                {'notification': notification, 'unread_count': unread_count},
+                event_id=notification['notif_id']
+            )
+        yield f'retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n' + format_event(
+            'unread', {'unread_count': unread_count}
+        )
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    channel_layer.receive(channel),
+                    timeout=settings.NOTIFICATION_STREAM_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            name = EVENT_NAMES.get(event.get('type'))
+            if name is None:
+                continue
+            data = {key: value for key, value in event.items() if key != 'type'}
+            event_id = data['notification']['notif_id'] if name == 'notification' else None
+            yield format_event(name, data, event_id=event_id)
+    finally:
+        # Runs when the client disconnects and the server cancels the stream
+        await channel_layer.group_discard(group, channel)
+
+
+@require_GET
+async def notification_stream(request):
+    token = get_token(request)
+    user = await get_user_for_token(token) if token else None
+    if user is None or not user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided or are invalid.'},
+            status=401
+        )
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    except (TypeError, ValueError):
+        last_event_id = None
+
+    response = StreamingHttpResponse(event_stream(user, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
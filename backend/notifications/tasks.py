@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from .outbox import deliverer
+
+
+@shared_task
+def deliver_outbox_task():
+    """Send due outbox messages (queued after commit and scheduled in CELERY_BEAT_SCHEDULE)"""
+    sent, failed = deliverer.deliver_pending()
+    return {'sent': sent, 'failed': failed}
+
+
+@shared_task
+def flush_message_digests_task():
+    """Send digests whose coalescing window has passed (scheduled in CELERY_BEAT_SCHEDULE)"""
+    from .digests import flush_due_digests
+
+    return flush_due_digests()
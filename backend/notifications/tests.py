@@ -1,3 +1,374 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from listings.models import Category, Listing
+from messaging.models import Chat
+from users.models import User
+from .counters import adjust, reconcile
+from .digests import flush_due_digests
+from .models import MessageDigest, Notification, OutboxMessage, UnreadCounter
+from .outbox import OutboxDeliverer, deliverer, enqueue_email, enqueue_sms
+from .sms import LocMemBackend
+from .utils import create_notification
+
+
+class FailingSMSBackend:
+    """SMS backend whose provider is always down"""
+
+    def send(self, phone_number, message):
+        raise ConnectionError('provider unavailable')
+
+    def close(self):
+        pass
+
+
+@override_settings(
+    SMS_BACKEND='notifications.sms.LocMemBackend',
+    CELERY_TASK_ALWAYS_EAGER=True,
+    OUTBOX_RETRY_DELAY=30,
+    OUTBOX_RETRY_MAX_DELAY=3600,
+    OUTBOX_MAX_ATTEMPTS=3,
+)
+class OutboxTests(TestCase):
+    """Email/SMS outbox and its delivery worker"""
+
+    def setUp(self):
+        LocMemBackend.outbox = []
+        deliverer.close()
+
+    def tearDown(self):
+        deliverer.close()
+
+    def test_registration_queues_sms_until_commit(self):
+        client = APIClient()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = client.post('/api/auth/register/', {
+                'user_firstname': 'Jean',
+                'user_lastname': 'Ndayishimiye',
+                'email': 'jean@example.com',
+                'phone_number': '+25779000001',
+                'password': 'SecurePass123',
+                'password_confirm': 'SecurePass123',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        # Nothing went out during the request
+        self.assertEqual(LocMemBackend.outbox, [])
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.channel, 'sms')
+        self.assertEqual(message.outbox_status, 'pending')
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(len(LocMemBackend.outbox), 1)
+        self.assertEqual(LocMemBackend.outbox[0]['to'], '+25779000001')
+        message.refresh_from_db()
+        self.assertEqual(message.outbox_status, 'sent')
+        self.assertEqual(message.attempts, 1)
+
+    def test_rolled_back_change_sends_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue_sms('+25779000001', 'Your code is 123456')
+                raise RuntimeError('registration failed')
+
+        self.assertFalse(OutboxMessage.objects.exists())
+        OutboxDeliverer().deliver_pending()
+        self.assertEqual(LocMemBackend.outbox, [])
+
+    def test_emails_share_one_connection(self):
+        for i in range(3):
+            enqueue_email(f'user{i}@example.com', 'Hello', 'Plain body', html_body='<p>Hello</p>')
+
+        worker = OutboxDeliverer()
+        with mock.patch('notifications.outbox.get_connection', wraps=mail.get_connection) as get_connection:
+            self.assertEqual(worker.deliver_pending(), (3, 0))
+            enqueue_email('user3@example.com', 'Hello again', 'Plain body')
+            self.assertEqual(worker.deliver_pending(), (1, 0))
+        worker.close()
+
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>Hello</p>')
+        self.assertEqual(OutboxMessage.objects.filter(outbox_status='sent').count(), 4)
+
+    @override_settings(SMS_BACKEND='notifications.tests.FailingSMSBackend')
+    def test_failed_sends_back_off_then_give_up(self):
+        message = enqueue_sms('+25779000001', 'Your code is 123456')
+        worker = OutboxDeliverer()
+
+        before = timezone.now()
+        self.assertEqual(worker.deliver_pending(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.outbox_status, 'pending')
+        self.assertEqual(message.attempts, 1)
+        self.assertIn('provider unavailable', message.last_error)
+        self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=30))
+
+        # Not due yet
+        self.assertEqual(worker.deliver_pending(), (0, 0))
+
+        OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        worker.deliver_pending()
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 2)
+        self.assertGreaterEqual(message.next_attempt_at, timezone.now() + timedelta(seconds=59))
+
+        OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        worker.deliver_pending()
+        message.refresh_from_db()
+        self.assertEqual(message.outbox_status, 'failed')
+        self.assertEqual(message.attempts, 3)
+
+
+@override_settings(
+    MESSAGE_DIGEST_WINDOW=300,
+    MESSAGE_DIGEST_CHANNEL='email',
+    CELERY_TASK_ALWAYS_EAGER=True,
+)
+class MessageDigestTests(TestCase):
+    """Chat message notifications coalesced per recipient and chat"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user(
+            'buyer@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Buyer', user_lastname='One'
+        )
+        cls.seller = User.objects.create_user(
+            'seller@example.com', '+25779000002', 'SecurePass123',
+            user_firstname='Seller', user_lastname='Two'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        listing = Listing.objects.create(
+            userid=cls.seller, cat_id=category, listing_title='House',
+            list_description='3 bedrooms', listing_price=1000, list_location='Bujumbura',
+            listing_status='active'
+        )
+        cls.chat = Chat.objects.create(userid=cls.buyer, listing_id=listing, userid_as_seller=cls.seller)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def send(self, count):
+        for i in range(count):
+            response = self.client.post(
+                f'/api/chats/{self.chat.chat_id}/messages/send/', {'content': f'Message {i}'}, format='json'
+            )
+            self.assertEqual(response.status_code, 201)
+
+    def flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return flush_due_digests(now=timezone.now() + timedelta(seconds=301))
+
+    def test_burst_makes_one_notification_and_one_email(self):
+        self.send(20)
+
+        notification = Notification.objects.get(userid=self.seller)
+        self.assertEqual(MessageDigest.objects.get().message_count, 20)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        # Still inside the window
+        self.assertEqual(flush_due_digests(), 0)
+        self.assertEqual(self.flush(), 1)
+
+        notification.refresh_from_db()
+        self.assertIn('sent you 20 messages', notification.notif_message)
+        self.assertFalse(MessageDigest.objects.exists())
+
+        email = OutboxMessage.objects.get()
+        self.assertEqual(email.recipient, 'seller@example.com')
+        self.assertIn('20 new messages', email.subject)
+        self.assertIn('Message 19', email.body)
+
+    def test_next_burst_opens_a_new_digest(self):
+        self.send(2)
+        self.flush()
+        self.send(1)
+
+        self.assertEqual(Notification.objects.filter(userid=self.seller).count(), 2)
+        self.assertEqual(MessageDigest.objects.get().message_count, 1)
+
+    def test_no_alert_once_chat_is_read(self):
+        self.send(3)
+
+        self.client.force_authenticate(self.seller)
+        notification = Notification.objects.get(userid=self.seller)
+        self.client.put(f'/api/notifications/{notification.pk}/read/')
+        self.client.put(f'/api/chats/{self.chat.chat_id}/mark-read/')
+        self.flush()
+
+        self.assertFalse(OutboxMessage.objects.exists())
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_read)
+        self.assertIn('sent you 3 messages', notification.notif_message)
+
+
+class UnreadCounterTests(TestCase):
+    """Badge counts served from UNREAD_COUNTERS"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user(
+            'buyer@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Buyer', user_lastname='One'
+        )
+        cls.seller = User.objects.create_user(
+            'seller@example.com', '+25779000002', 'SecurePass123',
+            user_firstname='Seller', user_lastname='Two'
+        )
+        category = Category.objects.create(cat_name='Houses', slug='houses')
+        listing = Listing.objects.create(
+            userid=cls.seller, cat_id=category, listing_title='House',
+            list_description='3 bedrooms', listing_price=1000, list_location='Bujumbura',
+            listing_status='active'
+        )
+        cls.chat = Chat.objects.create(userid=cls.buyer, listing_id=listing, userid_as_seller=cls.seller)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def badges(self):
+        with self.assertNumQueries(1):
+            notifications = self.client.get('/api/notifications/unread-count/').data['unread_count']
+        with self.assertNumQueries(1):
+            messages = self.client.get('/api/chats/unread-count/').data['unread_count']
+        return notifications, messages
+
+    def test_notifications_are_counted(self):
+        first = create_notification(self.seller, 'Listing approved', 'Your listing is live', 'listing')
+        create_notification(self.seller, 'Payment received', 'Thanks', 'payment')
+        self.assertEqual(self.badges(), (2, 0))
+
+        self.client.put(f'/api/notifications/{first.notif_id}/read/')
+        self.client.put(f'/api/notifications/{first.notif_id}/read/')
+        self.assertEqual(self.badges(), (1, 0))
+
+        self.client.put('/api/notifications/read-all/')
+        self.assertEqual(self.badges(), (0, 0))
+
+    def test_delete_decrements_only_for_unread_rows_it_removed(self):
+        read = create_notification(self.seller, 'Listing approved', 'Your listing is live', 'listing')
+        unread = create_notification(self.seller, 'Payment received', 'Thanks', 'payment')
+        racing = create_notification(self.seller, 'Listing expired', 'Renew it', 'listing')
+        self.client.put(f'/api/notifications/{read.notif_id}/read/')
+        self.assertEqual(self.badges(), (2, 0))
+
+        self.client.delete(f'/api/notifications/{read.notif_id}/delete/')
+        self.assertEqual(self.badges(), (2, 0))
+
+        # Marked read by another request (as notification_mark_read does) after
+        # the delete loaded it as unread
+        def get_then_mark_read(*args, **kwargs):
+            notification = get_object_or_404(*args, **kwargs)
+            Notification.objects.filter(pk=notification.pk).update(is_read=True, read_at=timezone.now())
+            adjust(self.seller.pk, notifications=-1)
+            return notification
+
+        with mock.patch('notifications.views.get_object_or_404', side_effect=get_then_mark_read):
+            response = self.client.delete(f'/api/notifications/{racing.notif_id}/delete/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Notification.objects.filter(pk=racing.pk).exists())
+        self.assertEqual(self.badges(), (1, 0))
+
+        self.client.delete(f'/api/notifications/{unread.notif_id}/delete/')
+        self.assertEqual(self.badges(), (0, 0))
+
+    def test_messages_are_counted_for_the_recipient(self):
+        buyer = APIClient()
+        buyer.force_authenticate(self.buyer)
+        for i in range(3):
+            buyer.post(f'/api/chats/{self.chat.chat_id}/messages/send/', {'content': f'Hi {i}'}, format='json')
+
+        # One coalesced notification, three unread messages
+        self.assertEqual(self.badges(), (1, 3))
+        self.client.put(f'/api/chats/{self.chat.chat_id}/mark-read/')
+        self.assertEqual(self.badges(), (1, 0))
+
+    def test_reconcile_repairs_drift(self):
+        create_notification(self.seller, 'Listing approved', 'Your listing is live', 'listing')
+        UnreadCounter.objects.filter(pk=self.seller.pk).update(notifications=7, messages=4)
+        # Changed behind the counters' back
+        Notification.objects.create(
+            userid=self.buyer, notif_title='Welcome', notif_message='Hello', notif_type='system'
+        )
+
+        self.assertEqual(reconcile(), 2)
+        self.assertEqual(self.badges(), (1, 0))
+        self.assertEqual(UnreadCounter.objects.get(pk=self.buyer.pk).notifications, 1)
+        self.assertEqual(reconcile(), 0)
+
+
+@override_settings(NOTIFICATION_STREAM_HEARTBEAT=1)
+class NotificationStreamTests(TransactionTestCase):
+    """GET /api/notifications/stream/ (Server-Sent Events)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'user@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Stream', user_lastname='User'
+        )
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def open_stream(self, **headers):
+        response = await self.async_client.get(
+            '/api/notifications/stream/', {'token': self.token}, headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.streaming_content
+
+    async def next_event(self, stream):
+        return (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+
+    async def test_requires_token(self):
+        response = await self.async_client.get('/api/notifications/stream/', {'token': 'invalid'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_pushes_notifications_and_unread_count(self):
+        stream = await self.open_stream()
+        self.assertIn('"unread_count": 0', await self.next_event(stream))
+
+        notification = await sync_to_async(create_notification)(
+            self.user, 'Listing approved', 'Your listing is live', 'listing'
+        )
+        event = await self.next_event(stream)
+        self.assertTrue(event.startswith('event: notification\n'))
+        self.assertIn(f'id: {notification.notif_id}', event)
+        self.assertIn('"unread_count": 1', event)
+        self.assertIn('Your listing is live', event)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        await sync_to_async(client.put)(f'/api/notifications/{notification.notif_id}/read/')
+        event = await self.next_event(stream)
+        self.assertTrue(event.startswith('event: unread\n'))
+        self.assertIn('"unread_count": 0', event)
+
+        # Idle streams get keepalive comments
+        self.assertEqual(await self.next_event(stream), ': keepalive\n\n')
+        await stream.aclose()
+
+    async def test_replays_missed_notifications(self):
+        first = await sync_to_async(create_notification)(self.user, 'One', 'First', 'system')
+        await sync_to_async(create_notification)(self.user, 'Two', 'Second', 'system')
+
+        stream = await self.open_stream(last_event_id=str(first.notif_id))
+        event = await self.next_event(stream)
+        self.assertIn('Second', event)
+        self.assertNotIn('First', event)
+        self.assertIn('"unread_count": 2', await self.next_event(stream))
+        await stream.aclose()
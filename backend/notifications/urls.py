@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import stream, views
 
 urlpatterns = [
     path('notifications/', views.notification_list, name='notification-list'),
@@ -8,4 +8,5 @@ urlpatterns = [
     path('notifications/<int:pk>/delete/', views.notification_delete, name='notification-delete'),
     path('notifications/clear-all/', views.notification_clear_all, name='notification-clear-all'),
     path('notifications/unread-count/', views.notification_unread_count, name='notification-unread-count'),
+    path('notifications/stream/', stream.notification_stream, name='notification-stream'),
 ]
\ No newline at end of file
@@ -1,28 +1,32 @@
+from django.db import transaction
+
+from .counters import adjust
 from .models import Notification
+from .realtime import broadcast_notification
 
 
 def create_notification(user, title, message, notif_type, link_url=None):
     """
     Helper function to create notifications
     """
-    return Notification.objects.create(
-        userid=user,
-        notif_title=title,
-        notif_message=message,
-        notif_type=notif_type,
-        link_url=link_url
-    )
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            userid=user,
+            notif_title=title,
+            notif_message=message,
+            notif_type=notif_type,
+            link_url=link_url
+        )
+        adjust(user.pk, notifications=1)
+        broadcast_notification(notification)
+    return notification
 
 
-def notify_new_message(recipient, sender, listing_title, chat_id):
-    """Notify user of new message"""
-    create_notification(
-        user=recipient,
-        title='New Message',
-        message=f'{sender.full_name} sent you a message about "{listing_title}"',
-        notif_type='chat',
-        link_url=f'/chats/{chat_id}'
-    )
+def notify_new_message(recipient, message, listing_title):
+    """Notify user of new message, coalesced per chat (see notifications/digests.py)"""
+    from .digests import record_message
+
+    return record_message(recipient, message, listing_title)
 
 
 def notify_listing_status(user, listing_title, status):
@@ -4,9 +4,12 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.utils import timezone
 
+from .counters import adjust, get_unread_counts
 from .models import Notification
+from .realtime import broadcast_unread_count
 from .serializers import NotificationSerializer
 
 
@@ -26,7 +29,7 @@ def notification_list(request):
     read = notifications.filter(is_read=True)[:20]  # Limit read notifications
     
     return Response({
-        'unread_count': unread.count(),
+        'unread_count': get_unread_counts(request.user).notifications,
         'unread': NotificationSerializer(unread, many=True).data,
         'read': NotificationSerializer(read, many=True).data
     })
@@ -42,9 +45,15 @@ def notification_mark_read(request, pk):
     notification = get_object_or_404(Notification, pk=pk, userid=request.user)
     
     if not notification.is_read:
-        notification.is_read = True
-        notification.read_at = timezone.now()
-        notification.save(update_fields=['is_read', 'read_at'])
+        # Conditional update so a double click only decrements the badge once
+        with transaction.atomic():
+            updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(
+                is_read=True,
+                read_at=timezone.now()
+            )
+            adjust(request.user.pk, notifications=-updated)
+            if updated:
+                broadcast_unread_count(request.user.pk)
     
     return Response({
         'message': 'Notification marked as read'
@@ -58,13 +67,17 @@ def notification_mark_all_read(request):
     Mark all notifications as read
     PUT /api/notifications/read-all/
     """
-    updated = Notification.objects.filter(
-        userid=request.user,
-        is_read=False
-    ).update(
-        is_read=True,
-        read_at=timezone.now()
-    )
+    with transaction.atomic():
+        updated = Notification.objects.filter(
+            userid=request.user,
+            is_read=False
+        ).update(
+            is_read=True,
+            read_at=timezone.now()
+        )
+        adjust(request.user.pk, notifications=-updated)
+        if updated:
+            broadcast_unread_count(request.user.pk)
     
     return Response({
         'message': f'{updated} notifications marked as read'
@@ -79,7 +92,16 @@ def notification_delete(request, pk):
     DELETE /api/notifications/{id}/
     """
     notification = get_object_or_404(Notification, pk=pk, userid=request.user)
-    notification.delete()
+    with transaction.atomic():
+        # Count what the delete itself removed: a concurrent mark-read may have
+        # decremented the badge for this notification already
+        _, deleted = Notification.objects.filter(pk=notification.pk, is_read=False).delete()
+        unread_deleted = deleted.get(Notification._meta.label, 0)
+        if unread_deleted:
+            adjust(request.user.pk, notifications=-unread_deleted)
+            broadcast_unread_count(request.user.pk)
+        else:
+            Notification.objects.filter(pk=notification.pk).delete()
     
     return Response({
         'message': 'Notification deleted'
@@ -110,11 +132,6 @@ def notification_unread_count(request):
     Get unread notifications count
     GET /api/notifications/unread-count/
     """
-    count = Notification.objects.filter(
-        userid=request.user,
-        is_read=False
-    ).count()
-    
     return Response({
-        'unread_count': count
+        'unread_count': get_unread_counts(request.user).notifications
     })
\ No newline at end of file
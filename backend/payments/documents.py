@@ -0,0 +1,64 @@
+"""
+Dealer (KYC) documents.
+
+Identity papers and business licences must never be publicly reachable, so
+uploads go to the 'private' storage (settings.STORAGES, under
+PRIVATE_MEDIA_ROOT, outside MEDIA_ROOT) and are only served to staff by
+GET /api/admin/dealer-documents/{id}/file/.
+
+The type is read from the file's leading bytes rather than the client's
+Content-Type or filename, and the stored file is named after it.
+"""
+
+from django.core.files.storage import storages
+from django.urls import reverse
+
+from umuhuza_api.uploads import store_upload
+
+MAX_DOCUMENT_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Leading bytes -> (extension, content type)
+DOCUMENT_SIGNATURES = [
+    (b'%PDF-', ('.pdf', 'application/pdf')),
+    (b'\x89PNG\r\n\x1a\n', ('.png', 'image/png')),
+    (b'\xff\xd8\xff', ('.jpg', 'image/jpeg')),
+]
+
+CONTENT_TYPES = dict(file_type for _, file_type in DOCUMENT_SIGNATURES)
+
+
+class InvalidDocument(Exception):
+    pass
+
+
+def get_document_storage():
+    return storages['private']
+
+
+def sniff_document_type(upload):
+    """(extension, content type) of a PDF, PNG or JPEG upload, from its content"""
+    header = upload.read(16)
+    upload.seek(0)
+    for signature, file_type in DOCUMENT_SIGNATURES:
+        if header.startswith(signature):
+            return file_type
+    raise InvalidDocument('Invalid file type. Only PDF, JPEG and PNG are allowed')
+
+
+def store_document(upload, application):
+    """Validate an uploaded document and save it privately. Returns the storage path"""
+    if upload.size > MAX_DOCUMENT_SIZE:
+        raise InvalidDocument('File too large. Maximum size is 10MB')
+
+    extension, _ = sniff_document_type(upload)
+    # Streamed from the upload's temp file, never read into memory
+    return store_upload(
+        upload, f"dealer_documents/{application.dealerapp_id}", extension, storage=get_document_storage()
+    )
+
+
+def document_url(document):
+    """Where the document can be read: the staff-only view for stored files"""
+    if document.file_path:
+        return reverse('admin-dealer-document-file', args=[document.dealerdoc_id])
+    return document.file_url
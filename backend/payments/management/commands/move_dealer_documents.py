@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from payments.documents import InvalidDocument, get_document_storage, sniff_document_type
+from payments.models import DealerDocument
+from umuhuza_api.uploads import store_upload
+
+
+def public_path(url):
+    """Storage path of a default_storage.url(), None for documents hosted elsewhere"""
+    for prefix in (settings.MEDIA_URL, '/' + settings.MEDIA_URL.lstrip('/')):
+        if url.startswith(prefix):
+            return url[len(prefix):]
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Move dealer documents uploaded to public media into the private document storage'
+
+    def handle(self, *args, **options):
+        moved = 0
+        for document in DealerDocument.objects.filter(file_path__isnull=True).order_by('dealerdoc_id'):
+            path = public_path(document.file_url)
+            if path is None:
+                continue
+            if not default_storage.exists(path):
+                self.stdout.write(self.style.WARNING(f'Document {document.dealerdoc_id}: {path} is missing'))
+                continue
+
+            with default_storage.open(path, 'rb') as public_file:
+                try:
+                    extension, _ = sniff_document_type(public_file)
+                except InvalidDocument:
+                    self.stdout.write(self.style.WARNING(
+                        f'Document {document.dealerdoc_id}: {path} is not a PDF, JPEG or PNG, left in place'
+                    ))
+                    continue
+                document.file_path = store_upload(
+                    public_file, f"dealer_documents/{document.dealerapp_id_id}", extension,
+                    storage=get_document_storage()
+                )
+
+            document.file_url = ''
+            document.save(update_fields=['file_path', 'file_url'])
+            default_storage.delete(path)
+            moved += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Moved {moved} dealer documents to private storage'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dealerdocument',
+            name='file_path',
+            field=models.CharField(blank=True, db_column='FILE_PATH', max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dealerdocument',
+            name='file_url',
+            field=models.CharField(blank=True, db_column='FILE_URL', max_length=255),
+        ),
+    ]
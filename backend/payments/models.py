@@ -118,7 +118,10 @@ class DealerDocument(models.Model):
         related_name='documents'
     )
     doc_type = models.CharField(max_length=255, db_column='DOC_TYPE')
-    file_url = models.CharField(max_length=255, db_column='FILE_URL')
+    file_url = models.CharField(max_length=255, blank=True, db_column='FILE_URL')
+    # Uploaded file in the private storage (payments/documents.py); file_url
+    # is only used for documents stored elsewhere
+    file_path = models.CharField(max_length=255, null=True, blank=True, db_column='FILE_PATH')
     file_size = models.IntegerField(null=True, blank=True, db_column='FILE_SIZE')
     verified = models.BooleanField(default=False, db_column='VERIFIED')
     uploadedat = models.DateTimeField(auto_now_add=True, db_column='UPLOADEDAT')
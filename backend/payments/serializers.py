@@ -5,6 +5,7 @@ from .models import (
     DealerApplication, DealerDocument
 )
 from listings.models import PricingPlan
+from .documents import document_url
 
 User = get_user_model()
 
@@ -43,10 +44,15 @@ class PaymentCreateSerializer(serializers.Serializer):
 # ============================================================================
 
 class DealerDocumentSerializer(serializers.ModelSerializer):
+    file_url = serializers.SerializerMethodField()
+
     class Meta:
         model = DealerDocument
         fields = ['dealerdoc_id', 'doc_type', 'file_url', 'verified', 'uploadedat']
 
+    def get_file_url(self, obj):
+        return document_url(obj)
+
 
 class DealerApplicationSerializer(serializers.ModelSerializer):
     documents = DealerDocumentSerializer(many=True, read_only=True)
@@ -1,3 +1,117 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.models import User
+from .models import DealerApplication, DealerDocument
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PRIVATE_MEDIA_ROOT = tempfile.mkdtemp()
+
+PDF = b'%PDF-1.4\n1 0 obj << >> endobj\n%%EOF\n'
+
+
+@override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': MEDIA_ROOT, 'base_url': '/media/'},
+        },
+        'private': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': PRIVATE_MEDIA_ROOT},
+        },
+    },
+)
+class DealerDocumentTests(TestCase):
+    """KYC uploads through /api/dealer-applications/documents/, served to staff only"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.applicant = User.objects.create_user(
+            'dealer@example.com', '+25779000021', 'SecurePass123',
+            user_firstname='Dealer', user_lastname='Applicant'
+        )
+        cls.staff = User.objects.create_user(
+            'staff@example.com', '+25779000022', 'SecurePass123',
+            user_firstname='Staff', user_lastname='Member', is_staff=True
+        )
+        cls.application = DealerApplication.objects.create(
+            userid=cls.applicant, business_name='Premium Real Estate',
+            business_type='real_estate', business_address='Bujumbura'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(PRIVATE_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.applicant)
+
+    def upload(self, content, name='licence.pdf', content_type='application/pdf'):
+        return self.client.post('/api/dealer-applications/documents/', {
+            'doc_type': 'business_license',
+            'file': SimpleUploadedFile(name, content, content_type=content_type),
+        }, format='multipart')
+
+    def test_upload_is_stored_privately(self):
+        response = self.upload(PDF, name='licence.html')
+        self.assertEqual(response.status_code, 201)
+
+        document = DealerDocument.objects.get(pk=response.data['document']['dealerdoc_id'])
+        self.assertTrue(document.file_path.endswith('.pdf'))
+        self.assertTrue(os.path.exists(os.path.join(PRIVATE_MEDIA_ROOT, document.file_path)))
+        self.assertFalse(default_storage.exists(document.file_path))
+        self.assertEqual(
+            response.data['document']['file_url'],
+            f'/api/admin/dealer-documents/{document.dealerdoc_id}/file/'
+        )
+
+    def test_type_is_read_from_the_content(self):
+        response = self.upload(b'<html><script>alert(1)</script></html>', name='licence.pdf')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DealerDocument.objects.exists())
+
+    def test_file_is_served_to_staff_only(self):
+        response = self.upload(PDF)
+        url = response.data['document']['file_url']
+
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(b''.join(response.streaming_content), PDF)
+
+    def test_move_public_documents(self):
+        path = default_storage.save('dealer_documents/old.pdf', ContentFile(PDF))
+        document = DealerDocument.objects.create(
+            dealerapp_id=self.application, doc_type='id_card', file_url=default_storage.url(path)
+        )
+        external = DealerDocument.objects.create(
+            dealerapp_id=self.application, doc_type='tax', file_url='https://docs.example.com/tax.pdf'
+        )
+
+        call_command('move_dealer_documents', stdout=StringIO())
+        document.refresh_from_db()
+        external.refresh_from_db()
+        self.assertFalse(default_storage.exists(path))
+        self.assertTrue(os.path.exists(os.path.join(PRIVATE_MEDIA_ROOT, document.file_path)))
+        self.assertEqual(document.file_url, '')
+        self.assertIsNone(external.file_path)
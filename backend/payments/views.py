@@ -8,6 +8,7 @@ from django.utils import timezone
 from datetime import timedelta
 import uuid
 
+from .documents import InvalidDocument, store_document
 from .models import Payment, DealerApplication, DealerDocument
 from .serializers import (
     PaymentSerializer, PaymentCreateSerializer,
@@ -84,12 +85,13 @@ def dealer_application_status(request):
 @permission_classes([IsAuthenticated])
 def dealer_document_upload(request):
     """
-    Upload dealer documents (placeholder - actual file upload later)
+    Upload dealer documents
     POST /api/dealer-applications/documents/
-    {
-        "doc_type": "business_license",
-        "file_url": "path/to/file.pdf"
-    }
+    Form-data: doc_type, file (PDF, JPEG or PNG, max 10MB)
+
+    Files are kept in private storage and only served to staff (see
+    payments/documents.py). A JSON body with "file_url" instead of "file" is
+    still accepted for documents stored elsewhere.
     """
     try:
         application = DealerApplication.objects.get(userid=request.user)
@@ -99,17 +101,32 @@ def dealer_document_upload(request):
         }, status=status.HTTP_404_NOT_FOUND)
     
     doc_type = request.data.get('doc_type')
-    file_url = request.data.get('file_url')  # Will be actual file upload later
+    upload = request.FILES.get('file')
+    file_url = request.data.get('file_url')
+    file_path = None
+    file_size = None
     
-    if not doc_type or not file_url:
+    if not doc_type or not (upload or file_url):
         return Response({
-            'error': 'doc_type and file_url are required'
+            'error': 'doc_type and file (or file_url) are required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
+    if upload:
+        try:
+            file_path = store_document(upload, application)
+        except InvalidDocument as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        file_url = ''
+        file_size = upload.size
+    
     document = DealerDocument.objects.create(
         dealerapp_id=application,
         doc_type=doc_type,
-        file_url=file_url
+        file_url=file_url,
+        file_path=file_path,
+        file_size=file_size
     )
     
     return Response({
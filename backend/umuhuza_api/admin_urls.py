@@ -4,6 +4,7 @@ from . import admin_views
 urlpatterns = [
     # Dashboard Statistics
     path('stats/', admin_views.dashboard_stats, name='admin-stats'),
+    path('stats/timeseries/', admin_views.stats_timeseries, name='admin-stats-timeseries'),
 
     # Category Management
     path('categories/', admin_views.categories_admin, name='admin-categories'),
@@ -20,6 +21,7 @@ urlpatterns = [
     # Dealer Applications
     path('dealer-applications/', admin_views.dealer_applications_admin, name='admin-dealer-applications'),
     path('dealer-applications/<int:dealerapp_id>/', admin_views.dealer_application_review_admin, name='admin-dealer-application-review'),
+    path('dealer-documents/<int:dealerdoc_id>/file/', admin_views.dealer_document_file_admin, name='admin-dealer-document-file'),
 
     # Reports Management
     path('reports/', admin_views.reports_admin, name='admin-reports'),
@@ -7,15 +7,22 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Count, Avg, Q, Sum
+from django.db.models import Count, Max, Q
+from django.http import FileResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 
 from users.models import User, VerificationCode
-from listings.models import Listing, Category, RatingReview, Favorite, ReportMisconduct, UserSubscription
-from payments.models import Payment, DealerApplication, DealerDocument
-from messaging.models import Chat, Message
+from listings.models import Listing, Category, ReportMisconduct, UserSubscription
+from payments.documents import CONTENT_TYPES, get_document_storage
+from payments.models import DealerApplication, DealerDocument
+from payments.serializers import DealerDocumentSerializer
+from messaging.models import Chat
 from notifications.models import Notification
+from analytics.models import RollupWatermark
+from analytics.rollups import get_timeseries
+from .dashboard import get_dashboard_stats
 
 
 def is_admin(user):
@@ -39,94 +46,50 @@ def dashboard_stats(request):
             'error': 'Admin access required'
         }, status=status.HTTP_403_FORBIDDEN)
 
-    # Calculate date ranges
-    now = timezone.now()
-    last_30_days = now - timedelta(days=30)
-    last_7_days = now - timedelta(days=7)
-    today = now.date()
-
-    # User statistics
-    total_users = User.objects.count()
-    new_users_30d = User.objects.filter(date_joined__gte=last_30_days).count()
-    verified_users = User.objects.filter(is_verified=True).count()
-    sellers = User.objects.filter(is_seller=True).count()
-    dealers = User.objects.filter(is_dealer=True).count()
-
-    # Listing statistics
-    total_listings = Listing.objects.count()
-    active_listings = Listing.objects.filter(listing_status='active').count()
-    pending_listings = Listing.objects.filter(listing_status='pending').count()
-    new_listings_30d = Listing.objects.filter(createdat__gte=last_30_days).count()
-    featured_listings = Listing.objects.filter(is_featured=True).count()
-
-    # Payment statistics
-    total_payments = Payment.objects.count()
-    successful_payments = Payment.objects.filter(payment_status='successful').count()
-    total_revenue = Payment.objects.filter(
-        payment_status='successful'
-    ).aggregate(total=Sum('payment_amount'))['total'] or 0
-    revenue_30d = Payment.objects.filter(
-        payment_status='successful',
-        createdat__gte=last_30_days
-    ).aggregate(total=Sum('payment_amount'))['total'] or 0
-
-    # Dealer applications
-    pending_dealer_apps = DealerApplication.objects.filter(appli_status='pending').count()
-    approved_dealers = DealerApplication.objects.filter(appli_status='approved').count()
-
-    # Reports
-    pending_reports = ReportMisconduct.objects.filter(report_status='pending').count()
-    total_reports = ReportMisconduct.objects.count()
-
-    # Engagement metrics
-    total_messages = Message.objects.count()
-    total_favorites = Favorite.objects.count()
-    total_reviews = RatingReview.objects.count()
-    avg_rating = RatingReview.objects.aggregate(avg=Avg('rating'))['avg'] or 0
-
-    # Recent activity (last 7 days)
-    recent_users = User.objects.filter(date_joined__gte=last_7_days).count()
-    recent_listings = Listing.objects.filter(createdat__gte=last_7_days).count()
-    recent_messages = Message.objects.filter(sent_at__gte=last_7_days).count()
+    # Cached snapshot, see umuhuza_api/dashboard.py. ?refresh=1 recomputes it now
+    force_refresh = request.query_params.get('refresh') in ('1', 'true')
+    return Response(get_dashboard_stats(force_refresh=force_refresh))
 
+
+MAX_TIMESERIES_DAYS = 731
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stats_timeseries(request):
+    """
+    Daily counts for charts, read from the rollup tables (analytics/rollups.py)
+    GET /api/admin/stats/timeseries/?start=2025-01-01&end=2025-01-31
+    Defaults to the last 30 days.
+    """
+    if not is_admin(request.user):
+        return Response({
+            'error': 'Admin access required'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    today = timezone.localdate()
+    try:
+        end = parse_date(request.query_params['end']) if 'end' in request.query_params else today
+        start = parse_date(request.query_params['start']) if 'start' in request.query_params else end - timedelta(days=29)
+    except ValueError:
+        start = end = None
+
+    if start is None or end is None:
+        return Response({
+            'error': 'start and end must be dates (YYYY-MM-DD)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if start > end or (end - start).days >= MAX_TIMESERIES_DAYS:
+        return Response({
+            'error': f'start must be before end, at most {MAX_TIMESERIES_DAYS} days apart'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    data = get_timeseries(start, end)
+    data['rolled_up_at'] = RollupWatermark.objects.aggregate(latest=Max('updatedat'))['latest']
     return Response({
-        'users': {
-            'total': total_users,
-            'new_30d': new_users_30d,
-            'verified': verified_users,
-            'sellers': sellers,
-            'dealers': dealers,
-            'recent_7d': recent_users,
-        },
-        'listings': {
-            'total': total_listings,
-            'active': active_listings,
-            'pending': pending_listings,
-            'featured': featured_listings,
-            'new_30d': new_listings_30d,
-            'recent_7d': recent_listings,
-        },
-        'payments': {
-            'total': total_payments,
-            'successful': successful_payments,
-            'total_revenue': float(total_revenue),
-            'revenue_30d': float(revenue_30d),
-        },
-        'dealers': {
-            'pending_applications': pending_dealer_apps,
-            'approved': approved_dealers,
-        },
-        'reports': {
-            'pending': pending_reports,
-            'total': total_reports,
-        },
-        'engagement': {
-            'messages': total_messages,
-            'favorites': total_favorites,
-            'reviews': total_reviews,
-            'avg_rating': round(float(avg_rating), 2),
-            'recent_messages_7d': recent_messages,
-        },
+        'start': start,
+        'end': end,
+        **data,
     })
 
 
@@ -543,7 +506,7 @@ def dealer_applications_admin(request):
             'error': 'Admin access required'
         }, status=status.HTTP_403_FORBIDDEN)
 
-    applications = DealerApplication.objects.all().select_related('userid')
+    applications = DealerApplication.objects.all().select_related('userid').prefetch_related('documents')
 
     # Filters
     appli_status = request.GET.get('status')
@@ -579,6 +542,7 @@ def dealer_applications_admin(request):
             'email': app.userid.email,
             'phone_number': app.userid.phone_number,
         },
+        'documents': DealerDocumentSerializer(app.documents.all(), many=True).data,
     } for app in apps_page]
 
     return Response({
@@ -659,6 +623,42 @@ def dealer_application_review_admin(request, dealerapp_id):
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dealer_document_file_admin(request, dealerdoc_id):
+    """
+    Download an uploaded dealer document (private storage, staff only)
+    GET /api/admin/dealer-documents/{dealerdoc_id}/file/
+    """
+    if not is_admin(request.user):
+        return Response({
+            'error': 'Admin access required'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        document = DealerDocument.objects.get(dealerdoc_id=dealerdoc_id, file_path__isnull=False)
+    except DealerDocument.DoesNotExist:
+        return Response({
+            'error': 'Document not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    storage = get_document_storage()
+    if not storage.exists(document.file_path):
+        return Response({
+            'error': 'Document file is missing'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # The extension was set from the sniffed type when the file was stored
+    extension = document.file_path[document.file_path.rfind('.'):]
+    response = FileResponse(
+        storage.open(document.file_path, 'rb'),
+        content_type=CONTENT_TYPES.get(extension, 'application/octet-stream'),
+        filename=f"dealer-document-{document.dealerdoc_id}{extension}"
+    )
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
 # ============================================================================
 # REPORTS MANAGEMENT
 # ============================================================================
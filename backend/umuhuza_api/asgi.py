@@ -2,6 +2,8 @@
 ASGI config for umuhuza_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django as usual; WebSocket connections are routed by
+Channels (see messaging/routing.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'umuhuza_api.settings')
 
-application = get_asgi_application()
+# Initialize Django before importing anything that touches models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from messaging.routing import websocket_urlpatterns  # noqa: E402
+from umuhuza_api.ws_auth import AppOriginValidator, JWTAuthMiddleware  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    # Same origins as the REST API (CORS_ALLOWED_ORIGINS); clients that send
+    # no Origin (mobile apps) only need their token
+    'websocket': AppOriginValidator(
+        JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+        settings.CORS_ALLOWED_ORIGINS
+    ),
+})
@@ -0,0 +1,16 @@
+"""
+Celery app for background jobs.
+
+Run a worker with:
+    celery -A umuhuza_api worker -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'umuhuza_api.settings')
+
+app = Celery('umuhuza_api')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,179 @@
+"""
+Admin dashboard statistics.
+
+Every figure on the dashboard comes from one conditional aggregate per table
+(`COUNT(*) FILTER (WHERE ...)`), so a refresh is 8 queries instead of ~25.
+
+The result is cached as a snapshot. Within DASHBOARD_STATS_TTL seconds it is
+served as-is; after that it is still served (up to DASHBOARD_STATS_MAX_AGE)
+while it is recomputed in the background, so admin page loads never wait on
+the database. The response says how old the snapshot is.
+
+The background refresh runs as a Celery job only when the cache is shared
+between processes (Redis, REDIS_CACHE_URL). With the per-process LocMemCache
+a worker would write the snapshot into its own memory, so the web process
+refreshes it in a thread instead.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from listings.models import Favorite, Listing, RatingReview, ReportMisconduct
+from messaging.models import Message
+from payments.models import DealerApplication, Payment
+from users.models import User
+
+SNAPSHOT_KEY = 'admin:dashboard_stats'
+REFRESH_LOCK_KEY = 'admin:dashboard_stats:refreshing'
+
+# Cache backends that keep data inside the process
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def compute_dashboard_stats():
+    """Fresh statistics, one query per table"""
+    now = timezone.now()
+    last_30_days = now - timedelta(days=30)
+    last_7_days = now - timedelta(days=7)
+
+    users = User.objects.aggregate(
+        total=Count('pk'),
+        new_30d=Count('pk', filter=Q(date_joined__gte=last_30_days)),
+        verified=Count('pk', filter=Q(is_verified=True)),
+        sellers=Count('pk', filter=Q(is_seller=True)),
+        dealers=Count('pk', filter=Q(is_dealer=True)),
+        recent_7d=Count('pk', filter=Q(date_joined__gte=last_7_days)),
+    )
+
+    listings = Listing.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(listing_status='active')),
+        pending=Count('pk', filter=Q(listing_status='pending')),
+        featured=Count('pk', filter=Q(is_featured=True)),
+        new_30d=Count('pk', filter=Q(createdat__gte=last_30_days)),
+        recent_7d=Count('pk', filter=Q(createdat__gte=last_7_days)),
+    )
+
+    successful = Q(payment_status='successful')
+    payments = Payment.objects.aggregate(
+        total=Count('pk'),
+        successful=Count('pk', filter=successful),
+        total_revenue=Sum('payment_amount', filter=successful),
+        revenue_30d=Sum('payment_amount', filter=successful & Q(createdat__gte=last_30_days)),
+    )
+
+    dealers = DealerApplication.objects.aggregate(
+        pending_applications=Count('pk', filter=Q(appli_status='pending')),
+        approved=Count('pk', filter=Q(appli_status='approved')),
+    )
+
+    reports = ReportMisconduct.objects.aggregate(
+        pending=Count('pk', filter=Q(report_status='pending')),
+        total=Count('pk'),
+    )
+
+    messages = Message.objects.aggregate(
+        total=Count('pk'),
+        recent_7d=Count('pk', filter=Q(sentat__gte=last_7_days)),
+    )
+
+    reviews = RatingReview.objects.aggregate(total=Count('pk'), avg=Avg('rating'))
+
+    return {
+        'users': users,
+        'listings': listings,
+        'payments': {
+            'total': payments['total'],
+            'successful': payments['successful'],
+            'total_revenue': float(payments['total_revenue'] or 0),
+            'revenue_30d': float(payments['revenue_30d'] or 0),
+        },
+        'dealers': dealers,
+        'reports': reports,
+        'engagement': {
+            'messages': messages['total'],
+            'favorites': Favorite.objects.count(),
+            'reviews': reviews['total'],
+            'avg_rating': round(float(reviews['avg'] or 0), 2),
+            'recent_messages_7d': messages['recent_7d'],
+        },
+    }
+
+
+def refresh_snapshot():
+    snapshot = {'stats': compute_dashboard_stats(), 'generated_at': time.time()}
+    # Kept past MAX_AGE so a slow refresh still has something to serve
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=settings.DASHBOARD_STATS_MAX_AGE * 2)
+    return snapshot
+
+
+def cache_is_shared():
+    """Whether other processes (Celery workers) see what this one caches"""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+@shared_task
+def refresh_dashboard_stats_task():
+    try:
+        refresh_snapshot()
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+
+
+def refresh_in_background():
+    def run():
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            print(f"Error refreshing dashboard stats: {e}")
+        finally:
+            cache.delete(REFRESH_LOCK_KEY)
+            # The thread's own database connection
+            connection.close()
+
+    thread = threading.Thread(target=run, name='dashboard-stats-refresh', daemon=True)
+    thread.start()
+    return thread
+
+
+def get_dashboard_stats(force_refresh=False):
+    """
+    Statistics plus snapshot metadata:
+    {..., 'snapshot': {'generated_at', 'age_seconds', 'refreshing'}}
+    """
+    snapshot = None if force_refresh else cache.get(SNAPSHOT_KEY)
+    age = time.time() - snapshot['generated_at'] if snapshot else None
+    refreshing = False
+
+    if snapshot is None or age >= settings.DASHBOARD_STATS_MAX_AGE:
+        # Nothing usable: compute now
+        snapshot = refresh_snapshot()
+        age = 0
+    elif age >= settings.DASHBOARD_STATS_TTL:
+        # Serve the stale snapshot; one request starts the refresh
+        refreshing = True
+        if cache.add(REFRESH_LOCK_KEY, True, timeout=settings.DASHBOARD_STATS_TTL):
+            if cache_is_shared():
+                refresh_dashboard_stats_task.delay()
+            else:
+                refresh_in_background()
+
+    return {
+        **snapshot['stats'],
+        'snapshot': {
+            'generated_at': datetime.fromtimestamp(snapshot['generated_at'], tz=dt_timezone.utc),
+            'age_seconds': int(age),
+            'refreshing': refreshing,
+        },
+    }
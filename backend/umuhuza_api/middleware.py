@@ -1,4 +1,6 @@
-from users.models import ActivityLog
+from django.utils import timezone
+
+from users.activity import activity_log
 
 
 def get_client_ip(request):
@@ -11,9 +13,22 @@ def get_client_ip(request):
     return ip
 
 
+# Loggable actions, matched on the exact request path
+ACTION_ROUTES = {
+    '/api/auth/login/': 'user_login',
+    '/api/auth/register/': 'user_register',
+    '/api/listings/create/': 'listing_create',
+    '/api/payments/initiate/': 'payment_initiate',
+    '/api/dealer-applications/create/': 'dealer_application',
+    '/api/reports/create/': 'report_submit',
+}
+
+
 class ActivityLogMiddleware:
     """
-    Middleware to log important user actions
+    Middleware to log important user actions.
+    Entries are queued and written in batches by a background thread
+    (users/activity.py), so logging adds no query to the request.
     """
     def __init__(self, get_response):
         self.get_response = get_response
@@ -22,41 +37,22 @@ class ActivityLogMiddleware:
         response = self.get_response(request)
         
         # Log specific actions after response
-        if request.user.is_authenticated and request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
-            self.log_action(request, response)
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+            action_type = ACTION_ROUTES.get(request.path)
+            if action_type and request.user.is_authenticated:
+                self.log_action(request, response, action_type)
         
         return response
     
-    def log_action(self, request, response):
+    def log_action(self, request, response, action_type):
         """Log user actions"""
-        path = request.path
-        
-        # Define loggable actions
-        actions = {
-            '/api/auth/login/': 'user_login',
-            '/api/auth/register/': 'user_register',
-            '/api/listings/create/': 'listing_create',
-            '/api/payments/initiate/': 'payment_initiate',
-            '/api/dealer-applications/create/': 'dealer_application',
-            '/api/reports/create/': 'report_submit',
-        }
-        
-        action_type = None
-        for pattern, action in actions.items():
-            if pattern in path:
-                action_type = action
-                break
-        
-        # Log if it's a tracked action and response is successful
-        if action_type and 200 <= response.status_code < 300:
-            try:
-                ActivityLog.objects.create(
-                    userid=request.user,
-                    action_type=action_type,
-                    description=f"{request.method} {path}",
-                    ip_address=get_client_ip(request),
-                    user_agent=request.META.get('HTTP_USER_AGENT', '')[:500]
-                )
-            except Exception as e:
-                # Don't let logging errors break the app
-                print(f"Activity log error: {e}")
\ No newline at end of file
+        # Log if the response is successful
+        if 200 <= response.status_code < 300:
+            activity_log.log(
+                userid_id=request.user.pk,
+                action_type=action_type,
+                description=f"{request.method} {request.path}",
+                ip_address=get_client_ip(request),
+                user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
+                createdat=timezone.now()
+            )
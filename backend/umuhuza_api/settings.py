@@ -20,18 +20,21 @@ ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1').split(','
 
 # Application definition
 INSTALLED_APPS = [
+    'daphne',  # ASGI server; makes runserver serve WebSockets too
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
     'django_filters',
+    'channels',
     
     # Local apps
     'users.apps.UsersConfig',
@@ -39,6 +42,7 @@ INSTALLED_APPS = [
     'payments.apps.PaymentsConfig',
     'messaging.apps.MessagingConfig',
     'notifications.apps.NotificationsConfig',
+    'analytics.apps.AnalyticsConfig',
 ]
 
 MIDDLEWARE = [
@@ -72,6 +76,27 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'umuhuza_api.wsgi.application'
+ASGI_APPLICATION = 'umuhuza_api.asgi.application'
+
+# Channel layer for WebSocket fan-out (see messaging/realtime.py)
+# In-memory works for a single process and tests; set REDIS_CHANNEL_LAYER_URL
+# when running more than one ASGI worker or node.
+REDIS_CHANNEL_LAYER_URL = config('REDIS_CHANNEL_LAYER_URL', default='')
+if REDIS_CHANNEL_LAYER_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_CHANNEL_LAYER_URL],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
 
 # Database
 DATABASES = {
@@ -121,6 +146,23 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Private files (dealer KYC documents): outside MEDIA_ROOT, never served by the
+# web server, only through staff-only views (see payments/documents.py)
+PRIVATE_MEDIA_ROOT = config('PRIVATE_MEDIA_ROOT', default=str(BASE_DIR / 'private_media'))
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'private': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': PRIVATE_MEDIA_ROOT},
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -222,12 +264,153 @@ AFRICAS_TALKING_SENDER_ID = os.environ.get('AFRICAS_TALKING_SENDER_ID', 'UMUHUZA
 #    - AFRICAS_TALKING_API_KEY=your_api_key
 #    - AFRICAS_TALKING_SENDER_ID=UMUHUZA (optional)
 
-# Celery settings (we'll configure later)
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+# SMS backend (see notifications/sms.py): ConsoleBackend prints, LocMemBackend
+# keeps messages in memory for tests, AfricasTalkingBackend sends
+SMS_BACKEND = config(
+    'SMS_BACKEND',
+    default='notifications.sms.ConsoleBackend' if DEBUG else 'notifications.sms.AfricasTalkingBackend'
+)
+
+# Email/SMS outbox (see notifications/outbox.py)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=50, cast=int)  # messages claimed at a time
+OUTBOX_LEASE_SECONDS = config('OUTBOX_LEASE_SECONDS', default=300, cast=int)  # before a claimed message is retried
+OUTBOX_RETRY_DELAY = config('OUTBOX_RETRY_DELAY', default=30, cast=int)  # seconds, doubled per attempt
+OUTBOX_RETRY_MAX_DELAY = config('OUTBOX_RETRY_MAX_DELAY', default=3600, cast=int)  # seconds
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+
+# Chat message notifications (see notifications/digests.py): messages in the
+# same chat are coalesced for this long into one notification and one alert
+MESSAGE_DIGEST_WINDOW = config('MESSAGE_DIGEST_WINDOW', default=300, cast=int)  # seconds
+MESSAGE_DIGEST_CHANNEL = config('MESSAGE_DIGEST_CHANNEL', default='email')  # 'email', 'sms' or 'none'
+
+# Notification SSE stream (see notifications/stream.py)
+NOTIFICATION_STREAM_HEARTBEAT = config('NOTIFICATION_STREAM_HEARTBEAT', default=25, cast=int)  # seconds between keepalives
+NOTIFICATION_STREAM_RETRY_MS = config('NOTIFICATION_STREAM_RETRY_MS', default=5000, cast=int)  # browser reconnect delay
+
+# Celery settings (see umuhuza_api/celery.py)
+# Worker: celery -A umuhuza_api worker -l info
+# CELERY_TASK_ALWAYS_EAGER runs jobs in-process instead of on a worker (default
+# in DEBUG, and in tests). CELERY_BROKER_URL=memory:// gives a local in-process
+# broker stand-in when no Redis is available.
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=DEBUG, cast=bool)
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Listing images are processed by a thread pool inside the job (listings/images.py)
+LISTING_IMAGE_WORKERS = config('LISTING_IMAGE_WORKERS', default=4, cast=int)
+LISTING_IMAGE_TIMEOUT = config('LISTING_IMAGE_TIMEOUT', default=30, cast=int)  # seconds per image
+
+# Resumable image uploads (see listings/upload_sessions.py)
+IMAGE_UPLOAD_CHUNK_SIZE = config('IMAGE_UPLOAD_CHUNK_SIZE', default=524288, cast=int)  # 512KB, advertised to clients
+IMAGE_UPLOAD_SESSION_TTL = config('IMAGE_UPLOAD_SESSION_TTL', default=24, cast=int)  # hours without activity
+
+# Task modules outside the apps' tasks.py
+CELERY_IMPORTS = ['umuhuza_api.dashboard']
+
+# Admin dashboard snapshot (see umuhuza_api/dashboard.py)
+DASHBOARD_STATS_TTL = config('DASHBOARD_STATS_TTL', default=60, cast=int)  # seconds before a background refresh
+DASHBOARD_STATS_MAX_AGE = config('DASHBOARD_STATS_MAX_AGE', default=900, cast=int)  # seconds before recomputing inline
+
+# Activity log writer (see users/activity.py)
+ACTIVITY_LOG_QUEUE_SIZE = config('ACTIVITY_LOG_QUEUE_SIZE', default=10000, cast=int)  # entries; extra ones are dropped
+ACTIVITY_LOG_BATCH_SIZE = config('ACTIVITY_LOG_BATCH_SIZE', default=200, cast=int)
+ACTIVITY_LOG_FLUSH_INTERVAL = config('ACTIVITY_LOG_FLUSH_INTERVAL', default=1.0, cast=float)  # seconds
+
+# Activity log retention (see users/activity_partitions.py)
+ACTIVITY_LOG_RETENTION_MONTHS = config('ACTIVITY_LOG_RETENTION_MONTHS', default=6, cast=int)  # current month included
+ACTIVITY_LOG_PARTITIONS_AHEAD = config('ACTIVITY_LOG_PARTITIONS_AHEAD', default=3, cast=int)  # months
+ACTIVITY_LOG_ARCHIVE_DIR = config('ACTIVITY_LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'archives' / 'activity_logs'))
+
+# Daily rollups (see analytics/rollups.py): rows younger than this are left
+# for the next run
+ROLLUP_LAG_SECONDS = config('ROLLUP_LAG_SECONDS', default=120, cast=int)
+
+# Periodic jobs, run by `celery -A umuhuza_api beat`
+CELERY_BEAT_SCHEDULE = {
+    'cleanup-image-upload-sessions': {
+        'task': 'listings.tasks.cleanup_upload_sessions_task',
+        'schedule': 60 * 60,  # hourly
+    },
+    'update-daily-rollups': {
+        'task': 'analytics.tasks.update_rollups_task',
+        'schedule': 5 * 60,
+    },
+    'deliver-outbox': {
+        'task': 'notifications.tasks.deliver_outbox_task',
+        'schedule': 60,
+    },
+    'flush-message-digests': {
+        'task': 'notifications.tasks.flush_message_digests_task',
+        'schedule': 60,
+    },
+    'rebuild-similar-listings': {
+        'task': 'listings.tasks.rebuild_similar_listings_task',
+        'schedule': 24 * 60 * 60,  # daily
+    },
+    'maintain-activity-logs': {
+        'task': 'users.tasks.maintain_activity_logs_task',
+        'schedule': 24 * 60 * 60,  # daily
+    },
+}
+
+# Similar listings (see listings/similarity.py)
+SIMILAR_LISTINGS_COUNT = config('SIMILAR_LISTINGS_COUNT', default=12, cast=int)  # neighbours stored per listing
+
+# Listing view counter (see listings/view_counter.py)
+# 'local' buffers views per process; 'redis' shares one buffer between workers
+# and needs `python manage.py flush_listing_views --loop` running
+LISTING_VIEW_BUFFER_BACKEND = config('LISTING_VIEW_BUFFER_BACKEND', default='local')
+LISTING_VIEW_BUFFER_REDIS_URL = config('LISTING_VIEW_BUFFER_REDIS_URL', default='redis://localhost:6379/1')
+LISTING_VIEW_FLUSH_INTERVAL = config('LISTING_VIEW_FLUSH_INTERVAL', default=30, cast=int)  # seconds
+LISTING_VIEW_FLUSH_SIZE = config('LISTING_VIEW_FLUSH_SIZE', default=500, cast=int)  # listings per batch
+
+# Cache
+# Local memory (per process) by default: entries expire after TIMEOUT and the
+# least recently used ones are evicted past MAX_ENTRIES. Set REDIS_CACHE_URL to
+# share the cache between workers (configure `maxmemory-policy allkeys-lru`
+# on the Redis server for LRU eviction).
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'TIMEOUT': 300,
+            'KEY_PREFIX': 'umuhuza',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'umuhuza',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+            },
+        }
+    }
+
+# Response cache for anonymous listing reads (see listings/cache.py)
+LISTING_CACHE_ENABLED = config('LISTING_CACHE_ENABLED', default=True, cast=bool)
+LISTING_CACHE_TIMEOUT = config('LISTING_CACHE_TIMEOUT', default=60, cast=int)  # seconds
+LISTING_CACHE_MAX_PAGE = 3  # ListingListView pages cached for anonymous visitors
+LISTING_FACETS_CACHE_TIMEOUT = config('LISTING_FACETS_CACHE_TIMEOUT', default=300, cast=int)  # seconds, per filter set
+# Invalidated through the cache: needs REDIS_CACHE_URL when running several workers
+LOCATION_AUTOCOMPLETE_CACHE_TIMEOUT = config('LOCATION_AUTOCOMPLETE_CACHE_TIMEOUT', default=3600, cast=int)  # seconds
+LOCATION_INDEX_TTL = config('LOCATION_INDEX_TTL', default=600, cast=int)  # seconds, per-process name index (listings/locations.py)
+LOCATION_AUTOCOMPLETE_LIMIT = 10  # suggestions per query
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
+# Uploaded files above FILE_UPLOAD_MAX_MEMORY_SIZE are streamed to a temp file
+# in FILE_UPLOAD_TEMP_DIR instead of being kept in memory (see
+# umuhuza_api/uploads.py). DATA_UPLOAD_MAX_MEMORY_SIZE caps the non-file part
+# of a request body.
+FILE_UPLOAD_MAX_MEMORY_SIZE = config('FILE_UPLOAD_MAX_MEMORY_SIZE', default=262144, cast=int)  # 256KB
+FILE_UPLOAD_TEMP_DIR = config('FILE_UPLOAD_TEMP_DIR', default=None)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 
 # Security settings (for production later)
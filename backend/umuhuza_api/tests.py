@@ -0,0 +1,74 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .dashboard import (
+    REFRESH_LOCK_KEY, SNAPSHOT_KEY, cache_is_shared, get_dashboard_stats, refresh_dashboard_stats_task
+)
+
+# What a Celery worker sees when the default cache is LocMemCache: its own memory
+WORKER_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'celery-worker',
+    }
+}
+
+
+@override_settings(DASHBOARD_STATS_TTL=60, DASHBOARD_STATS_MAX_AGE=900)
+class DashboardStatsRefreshTests(TestCase):
+    """Stale-while-revalidate refresh of the admin dashboard snapshot"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def store_stale_snapshot(self):
+        generated_at = time.time() - 120
+        cache.set(SNAPSHOT_KEY, {'stats': {'users': {'total': -1}}, 'generated_at': generated_at})
+        return generated_at
+
+    def wait_for_refresh(self):
+        for thread in threading.enumerate():
+            if thread.name == 'dashboard-stats-refresh':
+                thread.join(timeout=10)
+
+    def test_worker_with_its_own_cache_cannot_refresh_the_snapshot(self):
+        generated_at = self.store_stale_snapshot()
+
+        with override_settings(CACHES=WORKER_CACHE):
+            refresh_dashboard_stats_task()
+            self.assertIsNotNone(cache.get(SNAPSHOT_KEY))
+
+        # The web process still has the stale one
+        self.assertEqual(cache.get(SNAPSHOT_KEY)['generated_at'], generated_at)
+
+    def test_refreshes_in_process_without_a_shared_cache(self):
+        generated_at = self.store_stale_snapshot()
+        self.assertFalse(cache_is_shared())
+
+        with mock.patch('umuhuza_api.dashboard.refresh_dashboard_stats_task.delay') as delay:
+            stats = get_dashboard_stats()
+            self.wait_for_refresh()
+
+        delay.assert_not_called()
+        self.assertTrue(stats['snapshot']['refreshing'])
+        self.assertEqual(stats['users']['total'], -1)  # stale data served meanwhile
+
+        snapshot = cache.get(SNAPSHOT_KEY)
+        self.assertGreater(snapshot['generated_at'], generated_at)
+        self.assertNotEqual(snapshot['stats']['users']['total'], -1)
+        self.assertIsNone(cache.get(REFRESH_LOCK_KEY))
+
+    def test_enqueues_once_with_a_shared_cache(self):
+        self.store_stale_snapshot()
+
+        with mock.patch('umuhuza_api.dashboard.cache_is_shared', return_value=True), \
+                mock.patch('umuhuza_api.dashboard.refresh_dashboard_stats_task.delay') as delay:
+            get_dashboard_stats()
+            get_dashboard_stats()
+
+        delay.assert_called_once_with()
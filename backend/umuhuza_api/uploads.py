@@ -0,0 +1,37 @@
+"""
+Streaming file uploads.
+
+FILE_UPLOAD_MAX_MEMORY_SIZE is kept small, so Django's upload handlers spool
+anything bigger to a temporary file in 64KB chunks instead of holding the
+whole body in memory. store_upload() hands that file straight to storage:
+FileSystemStorage moves the temp file into place and remote backends stream
+it chunk by chunk. Nothing reads an upload into a bytes object.
+"""
+
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+
+def store_upload(upload, directory, ext, storage=default_storage):
+    """
+    Save an UploadedFile under `directory` with a random name and `ext`.
+    Returns the storage path. `ext` must come from the validated content
+    (e.g. the format Pillow detected), never from the client's filename.
+    """
+    return storage.save(f"{directory}/{uuid.uuid4().hex}{ext}", upload)
+
+
+def spooled_file():
+    """
+    Scratch file for generated content (e.g. encoded images): stays in memory
+    while small, rolls over to disk past FILE_UPLOAD_MAX_MEMORY_SIZE. Wrapped in
+    a Django File so it can be passed to storage as-is.
+    """
+    return File(tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        dir=settings.FILE_UPLOAD_TEMP_DIR
+    ))
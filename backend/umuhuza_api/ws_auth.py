@@ -0,0 +1,55 @@
+"""
+JWT authentication for WebSocket connections.
+
+Browsers can't set an Authorization header on a WebSocket handshake, so the
+SimpleJWT access token is passed in the query string instead:
+
+    ws://api.umuhuza.bi/ws/chats/?token=<access token>
+
+Handshakes are also checked against CORS_ALLOWED_ORIGINS (AppOriginValidator).
+Browsers always send an Origin header on a WebSocket handshake; native mobile
+apps usually don't, and are let through on their token alone.
+"""
+
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from channels.security.websocket import OriginValidator
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+
+@database_sync_to_async
+def get_user_for_token(raw_token):
+    authentication = JWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Populates scope['user'] from the ?token= query parameter"""
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+
+        scope['user'] = await get_user_for_token(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+class AppOriginValidator(OriginValidator):
+    """
+    OriginValidator that also accepts handshakes without an Origin header
+    (mobile apps). Pages on other sites are still rejected, since browsers
+    can't omit the header.
+    """
+
+    def valid_origin(self, parsed_origin):
+        if parsed_origin is None:
+            return True
+        return super().valid_origin(parsed_origin)
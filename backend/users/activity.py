@@ -0,0 +1,114 @@
+"""
+Asynchronous activity logging.
+
+ActivityLogMiddleware used to INSERT into ACTIVITY_LOGS inside the response
+path. Entries now go on an in-process queue and a background thread writes
+them with bulk_create, up to ACTIVITY_LOG_BATCH_SIZE rows at a time and at
+least every ACTIVITY_LOG_FLUSH_INTERVAL seconds.
+
+The queue is bounded by ACTIVITY_LOG_QUEUE_SIZE. If the database falls
+behind, new entries are dropped and counted (`activity_log.dropped`) rather
+than growing memory or slowing requests down.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import ActivityLog
+
+
+class ActivityLogWriter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue = None
+        self.thread = None
+        self.pid = None
+        self.dropped = 0
+        self.written = 0
+
+    def ensure_started(self):
+        # Threads don't survive a fork (gunicorn --preload), so each worker
+        # process starts its own
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=settings.ACTIVITY_LOG_QUEUE_SIZE)
+            self.thread = threading.Thread(target=self.run, name='activity-log-writer', daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def log(self, **fields):
+        """Queue an ActivityLog row. Never blocks and never touches the database"""
+        self.ensure_started()
+        try:
+            self.queue.put_nowait(ActivityLog(**fields))
+        except queue.Full:
+            self.count_dropped(1)
+
+    def count_dropped(self, count):
+        with self.lock:
+            self.dropped += count
+            dropped = self.dropped
+        # Don't flood the logs: report the first drop, then every 1000
+        if dropped == count or dropped // 1000 != (dropped - count) // 1000:
+            print(f"Activity log queue full or failing: {dropped} entries dropped so far")
+
+    def run(self):
+        batch_size = settings.ACTIVITY_LOG_BATCH_SIZE
+        interval = settings.ACTIVITY_LOG_FLUSH_INTERVAL
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + interval
+            while len(batch) < batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            # This thread keeps its own connection; drop it if it went stale
+            close_old_connections()
+            self.write(batch)
+
+    def write(self, batch):
+        try:
+            ActivityLog.objects.bulk_create(batch)
+        except Exception as e:
+            # Don't let logging errors break the app
+            print(f"Activity log error: {e}")
+            self.count_dropped(len(batch))
+            return
+        with self.lock:
+            self.written += len(batch)
+
+    def flush(self):
+        """
+        Write whatever is queued from the calling thread (process exit, tests),
+        on that thread's connection and inside its transaction if it has one
+        """
+        if self.queue is None or self.pid != os.getpid():
+            return
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= settings.ACTIVITY_LOG_BATCH_SIZE:
+                self.write(batch)
+                batch = []
+        if batch:
+            self.write(batch)
+
+
+activity_log = ActivityLogWriter()
+atexit.register(activity_log.flush)
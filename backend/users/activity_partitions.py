@@ -0,0 +1,189 @@
+"""
+ActivityLog retention.
+
+ACTIVITY_LOGS is range-partitioned by month on CREATEDAT (migration
+0004_partition_activity_logs), one table per month named
+ACTIVITY_LOGS_YYYY_MM. The parent keeps the user, action, entity and date
+indexes, so queries through ActivityLog.objects work unchanged and only scan
+the months they need when they filter on createdat.
+
+Months are created ahead of time by ensure_partitions(). Rows for a month
+without a partition land in the DEFAULT partition ACTIVITY_LOGS_default
+instead of failing; create_partition() moves them out when their month gets
+its own partition.
+
+Old months are archived with archive_partition(): the rows are copied to a
+gzip-compressed CSV in ACTIVITY_LOG_ARCHIVE_DIR, then the partition is
+detached and dropped, which frees its space and index pages at once instead of
+a slow DELETE that leaves bloat behind. Expired months found in the default
+partition are split into their own partitions first, then archived the same
+way.
+"""
+
+import gzip
+import os
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+TABLE = 'ACTIVITY_LOGS'
+DEFAULT_PARTITION = 'ACTIVITY_LOGS_default'
+PARTITION_NAME = re.compile(r'^ACTIVITY_LOGS_(\d{4})_(\d{2})$')
+
+
+def add_months(day, months):
+    """First day of the month `months` after `day`'s month"""
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_{month:%Y_%m}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass',
+            [f'"{TABLE}"']
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """Monthly partitions as sorted (month, table name) pairs"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass',
+            [f'"{TABLE}"']
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((date(int(match[1]), int(match[2]), 1), name))
+    return sorted(partitions)
+
+
+def default_partition_months(before=None):
+    """Months with rows in the default partition (only those before `before` if given)"""
+    query = f'SELECT DISTINCT date_trunc(\'month\', "CREATEDAT") FROM "{DEFAULT_PARTITION}"'
+    params = []
+    if before is not None:
+        query += ' WHERE "CREATEDAT" < %s'
+        params.append(before.isoformat())
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        return sorted(row[0].date() for row in cursor.fetchall())
+
+
+def create_partition(month):
+    """
+    Create the partition holding `month`'s rows if it doesn't exist yet,
+    moving any of them out of the default partition. Returns whether it was
+    created.
+    """
+    start = add_months(month, 0)
+    end = add_months(month, 1)
+    name = partition_name(start)
+    bounds = [start.isoformat(), end.isoformat()]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Attaching the partition locks the default one anyway; locking it
+        # first keeps rows for this month from landing there after the move
+        cursor.execute(f'LOCK TABLE "{DEFAULT_PARTITION}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute('SELECT to_regclass(%s)', [f'"{name}"'])
+        if cursor.fetchone()[0] is not None:
+            return False
+
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}")')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+            f'WHERE "CREATEDAT" >= %s AND "CREATEDAT" < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved',
+            bounds
+        )
+        # Attaching builds the parent's indexes and foreign key on the new table
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+            bounds
+        )
+    return True
+
+
+def ensure_partitions(months_ahead=None):
+    """Make sure this month and the next `months_ahead` months have partitions"""
+    if months_ahead is None:
+        months_ahead = settings.ACTIVITY_LOG_PARTITIONS_AHEAD
+    this_month = add_months(timezone.now().date(), 0)
+    existing = {month for month, name in list_partitions()}
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(this_month, offset)
+        if month not in existing and create_partition(month):
+            created.append(partition_name(month))
+    return created
+
+
+def archive_partition(name, output_dir=None):
+    """
+    Copy a partition's rows to {output_dir}/{name}.csv.gz, then drop it.
+    Returns (archive path, row count).
+    """
+    output_dir = output_dir or settings.ACTIVITY_LOG_ARCHIVE_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f'{name}.csv.gz')
+    partial_path = path + '.partial'
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+        count = cursor.fetchone()[0]
+
+        # COPY streams rows straight from PostgreSQL to the file, without
+        # building model instances
+        with gzip.open(partial_path, 'wb') as archive:
+            cursor.copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', archive)
+
+    # Only drop the rows once the archive is complete on disk
+    os.replace(partial_path, path)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+        cursor.execute(f'DROP TABLE "{name}"')
+
+    return path, count
+
+
+def archive_old_partitions(keep_months=None, output_dir=None, dry_run=False):
+    """
+    Archive and drop every partition older than the last `keep_months`
+    months (the current month included), after splitting expired months out
+    of the default partition. Returns [(name, path, rows)].
+    """
+    if keep_months is None:
+        keep_months = settings.ACTIVITY_LOG_RETENTION_MONTHS
+    cutoff = add_months(timezone.now().date(), -(keep_months - 1))
+
+    expired = {month: name for month, name in list_partitions() if month < cutoff}
+    for month in default_partition_months(before=cutoff):
+        if dry_run or create_partition(month):
+            expired[month] = partition_name(month)
+
+    archived = []
+    for month, name in sorted(expired.items()):
+        if dry_run:
+            archived.append((name, None, None))
+            continue
+        path, count = archive_partition(name, output_dir)
+        archived.append((name, path, count))
+    return archived
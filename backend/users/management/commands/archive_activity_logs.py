@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.activity_partitions import archive_old_partitions, ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Archive monthly ACTIVITY_LOGS partitions past the retention period to .csv.gz and drop them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months',
+            type=int,
+            default=settings.ACTIVITY_LOG_RETENTION_MONTHS,
+            help='Months to keep in the database, current month included',
+        )
+        parser.add_argument(
+            '--output-dir',
+            default=settings.ACTIVITY_LOG_ARCHIVE_DIR,
+            help='Directory for the compressed archives',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the partitions that would be archived without touching them',
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError('ACTIVITY_LOGS is not partitioned (run migrations on PostgreSQL first)')
+        if options['keep_months'] < 1:
+            raise CommandError('--keep-months must be at least 1')
+
+        if not options['dry_run']:
+            for name in ensure_partitions():
+                self.stdout.write(f'  Created partition {name}')
+
+        archived = archive_old_partitions(
+            keep_months=options['keep_months'],
+            output_dir=options['output_dir'],
+            dry_run=options['dry_run'],
+        )
+
+        for name, path, count in archived:
+            if options['dry_run']:
+                self.stdout.write(f'  Would archive {name}')
+            else:
+                self.stdout.write(f'  {name}: {count} rows -> {path}')
+
+        if not archived:
+            self.stdout.write('No partitions older than the retention period')
+        elif not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'✓ Archived {len(archived)} partition(s)'))
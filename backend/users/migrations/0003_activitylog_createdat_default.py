@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_add_role_flags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='createdat',
+            field=models.DateTimeField(db_column='CREATEDAT', default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,97 @@
+"""
+Turn ACTIVITY_LOGS into a table partitioned by month on CREATEDAT
+(see users/activity_partitions.py). Existing rows are copied into monthly
+partitions, with a DEFAULT partition for months that don't have one.
+PostgreSQL only; other databases keep the plain table.
+"""
+
+from datetime import date
+
+from django.db import migrations
+from django.utils import timezone
+
+# Same names as the indexes Django created in 0001_initial, so its
+# migration state still matches the database
+INDEXES = [
+    ('ACTIVITY_LO_USERID_778fcd_idx', '"USERID"'),
+    ('ACTIVITY_LO_ACTION__0642b9_idx', '"ACTION_TYPE"'),
+    ('ACTIVITY_LO_ENTITY__c6dadb_idx', '"ENTITY_TYPE", "ENTITY_ID"'),
+    ('ACTIVITY_LO_CREATED_2f8afa_idx', '"CREATEDAT"'),
+]
+FOREIGN_KEY = (
+    'ALTER TABLE "ACTIVITY_LOGS" ADD CONSTRAINT "ACTIVITY_LOGS_USERID_9704599d_fk_USERS_USERID" '
+    'FOREIGN KEY ("USERID") REFERENCES "USERS" ("USERID") DEFERRABLE INITIALLY DEFERRED'
+)
+MONTHS_AHEAD = 3
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def rebuild(schema_editor, partitioned):
+    execute = schema_editor.execute
+    cursor = schema_editor.connection.cursor()
+
+    if partitioned:
+        execute(
+            'CREATE TABLE "ACTIVITY_LOGS_NEW" (LIKE "ACTIVITY_LOGS" INCLUDING DEFAULTS INCLUDING IDENTITY, '
+            'PRIMARY KEY ("LOG_ID", "CREATEDAT")) PARTITION BY RANGE ("CREATEDAT")'
+        )
+        cursor.execute('SELECT MIN("CREATEDAT") FROM "ACTIVITY_LOGS"')
+        oldest = cursor.fetchone()[0]
+        this_month = add_months(timezone.now().date(), 0)
+        month = add_months(oldest.date(), 0) if oldest else this_month
+        while month <= add_months(this_month, MONTHS_AHEAD):
+            following = add_months(month, 1)
+            execute(
+                f'CREATE TABLE "ACTIVITY_LOGS_{month:%Y_%m}" PARTITION OF "ACTIVITY_LOGS_NEW" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            )
+            month = following
+        execute('CREATE TABLE "ACTIVITY_LOGS_default" PARTITION OF "ACTIVITY_LOGS_NEW" DEFAULT')
+    else:
+        execute(
+            'CREATE TABLE "ACTIVITY_LOGS_NEW" (LIKE "ACTIVITY_LOGS" INCLUDING DEFAULTS INCLUDING IDENTITY, '
+            'PRIMARY KEY ("LOG_ID"))'
+        )
+
+    execute('INSERT INTO "ACTIVITY_LOGS_NEW" SELECT * FROM "ACTIVITY_LOGS"')
+    execute(
+        'SELECT setval(pg_get_serial_sequence(\'"ACTIVITY_LOGS_NEW"\', \'LOG_ID\'), '
+        'COALESCE((SELECT MAX("LOG_ID") FROM "ACTIVITY_LOGS_NEW"), 0) + 1, false)'
+    )
+    # Dropping the old table also drops its indexes and frees their names
+    execute('DROP TABLE "ACTIVITY_LOGS" CASCADE')
+    execute('ALTER TABLE "ACTIVITY_LOGS_NEW" RENAME TO "ACTIVITY_LOGS"')
+    execute('ALTER TABLE "ACTIVITY_LOGS" RENAME CONSTRAINT "ACTIVITY_LOGS_NEW_pkey" TO "ACTIVITY_LOGS_pkey"')
+    # The identity sequence was named after ACTIVITY_LOGS_NEW; look it up rather than guess
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', ['"ACTIVITY_LOGS"', 'LOG_ID'])
+    sequence = cursor.fetchone()[0]
+    execute(f'ALTER SEQUENCE {sequence} RENAME TO "ACTIVITY_LOGS_LOG_ID_seq"')
+
+    for name, columns in INDEXES:
+        execute(f'CREATE INDEX "{name}" ON "ACTIVITY_LOGS" ({columns})')
+    execute(FOREIGN_KEY)
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        rebuild(schema_editor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_activitylog_createdat_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
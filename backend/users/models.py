@@ -220,7 +220,8 @@ class ActivityLog(models.Model):
     description = models.TextField(null=True, blank=True, db_column='DESCRIPTION')
     ip_address = models.GenericIPAddressField(null=True, blank=True, db_column='IP_ADDRESS')
     user_agent = models.TextField(null=True, blank=True, db_column='USER_AGENT')
-    createdat = models.DateTimeField(auto_now_add=True, db_column='CREATEDAT')
+    # Set when the action happens, not when the batch is written (users/activity.py)
+    createdat = models.DateTimeField(default=timezone.now, db_column='CREATEDAT')
     
     class Meta:
         db_table = 'ACTIVITY_LOGS'
@@ -0,0 +1,13 @@
+from celery import shared_task
+
+from .activity_partitions import archive_old_partitions, ensure_partitions, is_partitioned
+
+
+@shared_task
+def maintain_activity_logs_task():
+    """Create upcoming ACTIVITY_LOGS partitions and archive expired ones (scheduled in CELERY_BEAT_SCHEDULE)"""
+    if not is_partitioned():
+        return {'created': [], 'archived': []}
+    created = ensure_partitions()
+    archived = archive_old_partitions()
+    return {'created': created, 'archived': [name for name, path, count in archived]}
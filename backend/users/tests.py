@@ -1,3 +1,211 @@
-from django.test import TestCase
+import csv
+import gzip
+import os
+import queue
+import shutil
+import tempfile
+from datetime import date, datetime
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from notifications.models import OutboxMessage
+from umuhuza_api.middleware import ACTION_ROUTES, ActivityLogMiddleware
+from .activity import ActivityLogWriter
+from .activity_partitions import (
+    DEFAULT_PARTITION, add_months, archive_old_partitions, create_partition,
+    ensure_partitions, list_partitions, partition_name,
+)
+from .models import ActivityLog, User, VerificationCode
+
+PASSWORD_RESET_URL = '/api/auth/password-reset/request/'
+ARCHIVE_DIR = tempfile.mkdtemp()
+
+
+class PasswordResetRequestTests(TestCase):
+    """POST /api/auth/password-reset/request/: the code and its email commit together"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'user@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Reset', user_lastname='User'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def request_reset(self):
+        return self.client.post(PASSWORD_RESET_URL, {'email': 'user@example.com'}, format='json')
+
+    def test_code_and_email_are_queued(self):
+        response = self.request_reset()
+        self.assertEqual(response.status_code, 200)
+
+        code = VerificationCode.objects.get(userid=self.user, code_type='password_reset', is_used=False)
+        email = OutboxMessage.objects.get(recipient='user@example.com')
+        self.assertIn(f'code={code.code}', email.body)
+
+    def test_failed_enqueue_fails_the_request(self):
+        with mock.patch('users.utils.enqueue_email', side_effect=DatabaseError('outbox unavailable')):
+            with self.assertRaises(DatabaseError):
+                self.request_reset()
+
+        self.assertFalse(VerificationCode.objects.filter(userid=self.user, code_type='password_reset').exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class ActivityLogPartitionTests(TestCase):
+    """Monthly ACTIVITY_LOGS partitions: creation, the default partition and archiving"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(ARCHIVE_DIR, ignore_errors=True)
+
+    def log(self, day, description='old'):
+        createdat = timezone.make_aware(datetime(day.year, day.month, day.day, 12))
+        return ActivityLog.objects.create(action_type='VIEW_LISTING', description=description, createdat=createdat)
+
+    def table_of(self, log):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM "ACTIVITY_LOGS" WHERE "LOG_ID" = %s', [log.log_id])
+            return cursor.fetchone()[0].strip('"')
+
+    def partition_names(self):
+        return [name for month, name in list_partitions()]
+
+    def test_month_without_partition_goes_to_default_until_created(self):
+        log = self.log(date(2001, 3, 15))
+        self.assertEqual(self.table_of(log), DEFAULT_PARTITION)
+
+        self.assertTrue(create_partition(date(2001, 3, 1)))
+        self.assertEqual(self.table_of(log), 'ACTIVITY_LOGS_2001_03')
+        self.assertFalse(create_partition(date(2001, 3, 1)))
+        self.assertEqual(ActivityLog.objects.get().description, 'old')
+
+    def test_ensure_partitions_creates_missing_months_once(self):
+        this_month = add_months(timezone.now().date(), 0)
+        furthest = partition_name(add_months(this_month, 6))
+        self.assertNotIn(furthest, self.partition_names())
+
+        created = ensure_partitions(months_ahead=6)
+        self.assertIn(furthest, created)
+        self.assertIn(furthest, self.partition_names())
+        self.assertEqual(ensure_partitions(months_ahead=6), [])
+
+    def test_expired_months_are_archived_and_dropped(self):
+        create_partition(date(2001, 4, 1))
+        self.log(date(2001, 3, 15), 'in default')
+        self.log(date(2001, 4, 15), 'in partition')
+        recent = self.log(timezone.now().date(), 'recent')
+        # Run the deferred foreign key checks, as a commit would have long
+        # before these rows expire; DROP TABLE refuses pending ones
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        archived = archive_old_partitions(keep_months=1, output_dir=ARCHIVE_DIR)
+
+        self.assertEqual([(name, count) for name, path, count in archived],
+                         [('ACTIVITY_LOGS_2001_03', 1), ('ACTIVITY_LOGS_2001_04', 1)])
+        self.assertNotIn('ACTIVITY_LOGS_2001_03', self.partition_names())
+        self.assertNotIn('ACTIVITY_LOGS_2001_04', self.partition_names())
+        self.assertEqual(list(ActivityLog.objects.values_list('log_id', flat=True)), [recent.log_id])
+
+        with gzip.open(archived[1][1], 'rt', newline='') as archive:
+            rows = list(csv.DictReader(archive))
+        self.assertEqual([row['DESCRIPTION'] for row in rows], ['in partition'])
+
+    def test_dry_run_archives_nothing(self):
+        create_partition(date(2001, 4, 1))
+        old = self.log(date(2001, 3, 15))
+        self.log(date(2001, 4, 15))
+        output_dir = os.path.join(ARCHIVE_DIR, 'dry-run')
+        out = StringIO()
+
+        call_command('archive_activity_logs', '--keep-months=1', f'--output-dir={output_dir}', '--dry-run', stdout=out)
+
+        self.assertIn('Would archive ACTIVITY_LOGS_2001_03', out.getvalue())
+        self.assertIn('Would archive ACTIVITY_LOGS_2001_04', out.getvalue())
+        self.assertEqual(ActivityLog.objects.count(), 2)
+        self.assertEqual(self.table_of(old), DEFAULT_PARTITION)
+        self.assertIn('ACTIVITY_LOGS_2001_04', self.partition_names())
+        self.assertFalse(os.path.exists(output_dir))
+
+
+class ActivityLogWriterTests(TestCase):
+    """Queued activity logging (users/activity.py) and the routes that feed it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            'user@example.com', '+25779000001', 'SecurePass123',
+            user_firstname='Active', user_lastname='User'
+        )
+
+    def writer(self, queue_size=100):
+        # Marked as started without its thread, which would write through its
+        # own connection outside the test transaction
+        writer = ActivityLogWriter()
+        writer.queue = queue.Queue(maxsize=queue_size)
+        writer.pid = os.getpid()
+        return writer
+
+    def test_flush_writes_the_queue_in_batches(self):
+        writer = self.writer()
+        for action_type in ('user_login', 'listing_create', 'report_submit'):
+            writer.log(userid_id=self.user.pk, action_type=action_type)
+
+        with self.assertNumQueries(1):
+            writer.flush()
+        self.assertEqual(
+            sorted(ActivityLog.objects.values_list('action_type', flat=True)),
+            ['listing_create', 'report_submit', 'user_login']
+        )
+        self.assertEqual(writer.written, 3)
+
+        for _ in range(3):
+            writer.log(userid_id=self.user.pk, action_type='user_login')
+        with override_settings(ACTIVITY_LOG_BATCH_SIZE=2), self.assertNumQueries(2):
+            writer.flush()
+        self.assertEqual(ActivityLog.objects.count(), 6)
+
+    def test_full_queue_drops_entries(self):
+        writer = self.writer(queue_size=2)
+        with mock.patch('builtins.print') as report:
+            for _ in range(5):
+                writer.log(userid_id=self.user.pk, action_type='user_login')
+
+        self.assertEqual(writer.queue.qsize(), 2)
+        self.assertEqual(writer.dropped, 3)
+        report.assert_called_once()  # only the first drop is reported
+
+        writer.flush()
+        self.assertEqual(ActivityLog.objects.count(), 2)
+
+    def test_middleware_logs_mapped_routes(self):
+        factory = RequestFactory()
+        middleware = ActivityLogMiddleware(lambda request: HttpResponse(status=201))
+
+        def call(method, path):
+            request = getattr(factory, method)(path)
+            request.user = self.user
+            middleware(request)
+
+        with mock.patch('umuhuza_api.middleware.activity_log') as activity_log:
+            for path, action_type in ACTION_ROUTES.items():
+                call('post', path)
+                self.assertEqual(activity_log.log.call_args.kwargs['action_type'], action_type)
+                self.assertEqual(activity_log.log.call_args.kwargs['userid_id'], self.user.pk)
+            self.assertEqual(activity_log.log.call_count, len(ACTION_ROUTES))
+
+            activity_log.reset_mock()
+            call('get', '/api/auth/login/')
+            call('post', '/api/listings/')
+            activity_log.log.assert_not_called()
@@ -1,8 +1,8 @@
 from django.utils import timezone
 from datetime import timedelta
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
+from notifications.outbox import enqueue_email, enqueue_sms
 from .models import UserBadge
 
 
@@ -72,45 +72,13 @@ def revoke_badge(user, badge_type):
 
 def send_sms(phone_number, message):
     """
-    Send SMS using Africa's Talking API
+    Queue an SMS in the outbox (see notifications/outbox.py)
 
-    For development, SMS content is printed to console.
-    For production, configure Africa's Talking credentials.
+    The message is sent by the outbox worker once the current transaction
+    commits, through settings.SMS_BACKEND (console in development,
+    Africa's Talking in production).
     """
-    # Development mode - print to console
-    if settings.DEBUG or not hasattr(settings, 'AFRICAS_TALKING_USERNAME'):
-        print(f"\n{'='*60}")
-        print(f"📱 SMS MESSAGE")
-        print(f"{'='*60}")
-        print(f"To: {phone_number}")
-        print(f"Message: {message}")
-        print(f"{'='*60}\n")
-        return True
-
-    # Production mode - use Africa's Talking
-    try:
-        import africastalking
-
-        # Initialize SDK
-        africastalking.initialize(
-            username=settings.AFRICAS_TALKING_USERNAME,
-            api_key=settings.AFRICAS_TALKING_API_KEY
-        )
-
-        # Get SMS service
-        sms = africastalking.SMS
-
-        # Send SMS
-        response = sms.send(
-            message=message,
-            recipients=[phone_number],
-            sender_id=getattr(settings, 'AFRICAS_TALKING_SENDER_ID', None)
-        )
-
-        return True
-    except Exception as e:
-        print(f"Error sending SMS: {str(e)}")
-        return False
+    return enqueue_sms(phone_number, message)
 
 
 def send_phone_verification_sms(user, code):
@@ -158,11 +126,16 @@ If you didn't request this, please ignore.
     return send_sms(user.phone_number, message)
 
 
-def send_message_notification_sms(recipient, sender_name):
+def send_message_notification_sms(recipient, sender_name, message_count=1):
     """
-    Notify user of new message via SMS
+    Notify user of new message(s) via SMS
     """
-    message = f"""New message from {sender_name} on Umuhuza!
+    if message_count > 1:
+        headline = f"{message_count} new messages from {sender_name} on Umuhuza!"
+    else:
+        headline = f"New message from {sender_name} on Umuhuza!"
+
+    message = f"""{headline}
 
 Login to view and reply: umuhuza.bi/messages
 
@@ -187,13 +160,11 @@ def send_welcome_email(user, verification_url):
 
     html_message = render_to_string('emails/welcome.html', context)
 
-    send_mail(
+    enqueue_email(
+        recipient=user.email,
         subject='Welcome to Umuhuza!',
-        message=f'Welcome {user.full_name}! Please verify your email: {verification_url}',
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        html_message=html_message,
-        fail_silently=False,
+        body=f'Welcome {user.full_name}! Please verify your email: {verification_url}',
+        html_body=html_message,
     )
 
 
@@ -210,13 +181,11 @@ def send_verification_email(user, verification_url, verification_code):
 
     html_message = render_to_string('emails/verify_email.html', context)
 
-    send_mail(
+    enqueue_email(
+        recipient=user.email,
         subject='Verify Your Email - Umuhuza',
-        message=f'Hi {user.full_name}, please verify your email: {verification_url}',
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        html_message=html_message,
-        fail_silently=False,
+        body=f'Hi {user.full_name}, please verify your email: {verification_url}',
+        html_body=html_message,
     )
 
 
@@ -232,19 +201,17 @@ def send_password_reset_email(user, reset_url):
 
     html_message = render_to_string('emails/password_reset.html', context)
 
-    send_mail(
+    enqueue_email(
+        recipient=user.email,
         subject='Reset Your Password - Umuhuza',
-        message=f'Hi {user.full_name}, reset your password: {reset_url}',
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        html_message=html_message,
-        fail_silently=False,
+        body=f'Hi {user.full_name}, reset your password: {reset_url}',
+        html_body=html_message,
     )
 
 
-def send_new_message_email(recipient, sender, message_content, listing=None, chat_url=None):
+def send_new_message_email(recipient, sender, message_content, listing=None, chat_url=None, message_count=1):
     """
-    Notify user of new message
+    Notify user of new message(s). message_content is the latest one
     """
     from datetime import datetime
 
@@ -253,6 +220,7 @@ def send_new_message_email(recipient, sender, message_content, listing=None, cha
         'sender_name': sender.full_name,
         'sender_initials': f'{sender.user_firstname[0]}{sender.user_lastname[0]}'.upper(),
         'message_content': message_content,
+        'message_count': message_count,
         'sent_time': datetime.now().strftime('%B %d, %Y at %I:%M %p'),
         'listing_title': listing.listing_title if listing else None,
         'listing_price': listing.listing_price if listing else None,
@@ -262,13 +230,14 @@ def send_new_message_email(recipient, sender, message_content, listing=None, cha
 
     html_message = render_to_string('emails/new_message.html', context)
 
-    send_mail(
-        subject=f'New message from {sender.full_name} - Umuhuza',
-        message=f'{sender.full_name} sent you a message: {message_content[:100]}...',
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[recipient.email],
-        html_message=html_message,
-        fail_silently=True,  # Don't break if email fails
+    enqueue_email(
+        recipient=recipient.email,
+        subject=(
+            f'{message_count} new messages from {sender.full_name} - Umuhuza' if message_count > 1
+            else f'New message from {sender.full_name} - Umuhuza'
+        ),
+        body=f'{sender.full_name} sent you a message: {message_content[:100]}...',
+        html_body=html_message,
     )
 
 
@@ -296,11 +265,9 @@ def send_new_review_email(recipient, reviewer, rating, comment, average_rating,
 
     html_message = render_to_string('emails/new_review.html', context)
 
-    send_mail(
+    enqueue_email(
+        recipient=recipient.email,
         subject=f'New {rating}-star review from {reviewer.full_name} - Umuhuza',
-        message=f'{reviewer.full_name} left you a {rating}-star review!',
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[recipient.email],
-        html_message=html_message,
-        fail_silently=True,  # Don't break if email fails
+        body=f'{reviewer.full_name} left you a {rating}-star review!',
+        html_body=html_message,
     )
\ No newline at end of file
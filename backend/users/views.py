@@ -9,6 +9,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 import random
@@ -55,30 +56,32 @@ def register_view(request):
     serializer = UserRegistrationSerializer(data=request.data)
     
     if serializer.is_valid():
-        user = serializer.save()
+        # The user, the codes and the queued SMS commit (or roll back) together
+        with transaction.atomic():
+            user = serializer.save()
         
-        # Always generate BOTH codes
-        email_code = generate_code()
-        VerificationCode.objects.create(
-            userid=user,
-            code=email_code,
-            code_type='email',
-            contact_info=user.email,
-            expires_at=timezone.now() + timedelta(minutes=15)
-        )
+            # Always generate BOTH codes
+            email_code = generate_code()
+            VerificationCode.objects.create(
+                userid=user,
+                code=email_code,
+                code_type='email',
+                contact_info=user.email,
+                expires_at=timezone.now() + timedelta(minutes=15)
+            )
         
-        phone_code = generate_code()
-        VerificationCode.objects.create(
-            userid=user,
-            code=phone_code,
-            code_type='phone',
-            contact_info=user.phone_number,
-            expires_at=timezone.now() + timedelta(minutes=10)
-        )
+            phone_code = generate_code()
+            VerificationCode.objects.create(
+                userid=user,
+                code=phone_code,
+                code_type='phone',
+                contact_info=user.phone_number,
+                expires_at=timezone.now() + timedelta(minutes=10)
+            )
         
-        # Send verification codes
-        from .utils import send_phone_verification_sms
-        send_phone_verification_sms(user, phone_code)
+            # Send verification codes
+            from .utils import send_phone_verification_sms
+            send_phone_verification_sms(user, phone_code)
 
         # Email sending will be implemented later
         print(f"📧 Email verification code for {user.email}: {email_code}")
@@ -301,34 +304,36 @@ def resend_code_view(request):
             'error': 'Phone already verified'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Invalidate old codes
-    VerificationCode.objects.filter(
-        userid=request.user,
-        code_type=code_type,
-        is_used=False
-    ).update(is_used=True)
+    # The new code and its queued SMS commit together
+    with transaction.atomic():
+        # Invalidate old codes
+        VerificationCode.objects.filter(
+            userid=request.user,
+            code_type=code_type,
+            is_used=False
+        ).update(is_used=True)
     
-    # Generate new code
-    new_code = generate_code()
-    contact_info = request.user.email if code_type == 'email' else request.user.phone_number
-    expires_minutes = 15 if code_type == 'email' else 10
+        # Generate new code
+        new_code = generate_code()
+        contact_info = request.user.email if code_type == 'email' else request.user.phone_number
+        expires_minutes = 15 if code_type == 'email' else 10
     
-    VerificationCode.objects.create(
-        userid=request.user,
-        code=new_code,
-        code_type=code_type,
-        contact_info=contact_info,
-        expires_at=timezone.now() + timedelta(minutes=expires_minutes)
-    )
+        VerificationCode.objects.create(
+            userid=request.user,
+            code=new_code,
+            code_type=code_type,
+            contact_info=contact_info,
+            expires_at=timezone.now() + timedelta(minutes=expires_minutes)
+        )
     
-    # Send verification code
-    from .utils import send_phone_verification_sms
+        # Send verification code
+        from .utils import send_phone_verification_sms
 
-    if code_type == 'phone':
-        send_phone_verification_sms(request.user, new_code)
-    else:
-        # Email sending will be implemented later
-        print(f"📧 Email verification code for {request.user.email}: {new_code}")
+        if code_type == 'phone':
+            send_phone_verification_sms(request.user, new_code)
+        else:
+            # Email sending will be implemented later
+            print(f"📧 Email verification code for {request.user.email}: {new_code}")
 
     return Response({
         'message': f'Verification code sent to your {code_type}',
@@ -526,28 +531,27 @@ def request_password_reset(request):
     # Generate 6-digit code
     code = generate_code(6)
 
-    # Create verification code
-    VerificationCode.objects.filter(
-        userid=user,
-        code_type='password_reset',
-        is_used=False
-    ).update(is_used=True)  # Invalidate old codes
+    # The new code and its queued email commit together
+    with transaction.atomic():
+        # Create verification code
+        VerificationCode.objects.filter(
+            userid=user,
+            code_type='password_reset',
+            is_used=False
+        ).update(is_used=True)  # Invalidate old codes
 
-    verification = VerificationCode.objects.create(
-        userid=user,
-        code=code,
-        code_type='password_reset',
-        contact_info=email,
-        expires_at=timezone.now() + timedelta(minutes=15)
-    )
+        verification = VerificationCode.objects.create(
+            userid=user,
+            code=code,
+            code_type='password_reset',
+            contact_info=email,
+            expires_at=timezone.now() + timedelta(minutes=15)
+        )
 
-    # Send email with code
-    try:
-        # For now, use the URL-based reset template (we'll send the code in the URL)
+        # Queue the email with the code (uses the URL-based reset template).
+        # Not caught: a failed insert must roll the code back and fail the request
         reset_url = f"{settings.FRONTEND_URL}/reset-password?code={code}&email={email}"
         send_password_reset_email(user, reset_url)
-    except Exception as e:
-        print(f"Error sending reset email: {str(e)}")
 
     # In development, return the code
     response_data = {